@@ -1,5 +1,14 @@
 from ursina import *
-import random
+import os
+
+from conveyor_twin import load_line
+from conveyor_twin.hmi import Field
+from conveyor_twin.pool import Pool
+
+# La ligne (tapis, capteur, point de bourrage) est décrite dans conveyor_twin/lines/app.toml
+ligne = load_line(os.environ.get("TWIN_LINE", "app"))
+simulation = ligne.sim()
+debut, fin = ligne.config.spawn_x, ligne.config.exit_x
 
 app = Ursina()
 
@@ -8,68 +17,56 @@ camera.position = (5, 5, -15)
 camera.look_at((5, 0, 0))
 
 # Le convoyeur (simple rectangle gris)
-convoyeur = Entity(model='cube', scale=(20, 1, 3), color=color.gray, position=(5, -1, 0))
+convoyeur = Entity(model='cube', scale=(fin - debut, 1, 3), color=color.gray, position=((debut + fin) / 2, -1, 0))
 
-# Le Capteur (une petite sphère qui changera de couleur)
-capteur_visuel = Entity(model='sphere', scale=0.5, color=color.green, position=(8, 1, -2))
+# Les capteurs (une petite sphère qui changera de couleur)
+capteurs_visuels = [Entity(model='sphere', scale=0.5, color=color.green, position=(capteur.x, 1, -2))
+                    for capteur in ligne.sensors]
 Text(text="CAPTEUR OPTIQUE", position=(-0.1, 0.4), scale=1)
 
-# Liste pour gérer les bouteilles
-bouteilles = []
-vitesse_tapis = 4
-en_bourrage = False
-
-# Fonction pour faire apparaître des bouteilles
-def spawn_bouteille():
-    if not en_bourrage:
-        bouteille = Entity(model='cube', color=color.cyan, scale=(0.8, 1.5, 0.8), position=(-5, 0.5, 0))
-        bouteilles.append(bouteille)
-    invoke(spawn_bouteille, delay=1.5) # Une nouvelle bouteille toutes les 1.5 sec
+# Bouteilles affichées, par identifiant de bouteille de la simulation
+bouteilles = {}
+# Bouteilles recyclées au lieu d'être recréées puis détruites à chaque passage
+reserve = Pool(lambda: Entity(model='cube', color=color.cyan, scale=(0.8, 1.5, 0.8)), capacity=16, discard=destroy)
 
-spawn_bouteille()
+def synchro_bouteilles():
+    store = simulation.bottles
+    ids = store.ids.tolist()
+    for id_bouteille, x, z in zip(ids, store.x.tolist(), store.z.tolist()):
+        bouteille = bouteilles.get(id_bouteille)
+        if bouteille is None:
+            bouteille = bouteilles[id_bouteille] = reserve.acquire()
+            bouteille.position = (x, 0.5, z)
+        bouteille.x = x
+    # Les bouteilles sortent dans l'ordre: tout identifiant sous le plus ancien a quitté le tapis
+    plus_ancien = ids[0] if ids else simulation.next_id
+    for id_bouteille in [i for i in bouteilles if i < plus_ancien]:
+        reserve.release(bouteilles.pop(id_bouteille))
 
 # --- LOGIQUE IA / DÉTECTION ---
 status_text = Text(text="SYSTEME: NORMAL", position=(-0.65, 0.45), scale=1.5, color=color.green)
+# Texte et couleurs liés à l'alerte: regénérés seulement quand elle change
+alerte = Field(status_text, render={True: ("ALERTE: BOURRAGE DETECTÉ !", color.red),
+                                    False: ("SYSTEME: NORMAL", color.green)}.get, attrs=("text", "color"))
+voyants = [Field(visuel, render={True: color.red, False: color.green}.get, attrs=("color",))
+           for visuel in capteurs_visuels]
 
 def update():
-    global en_bourrage
-    
-    # Simulation du mouvement
-    for b in bouteilles:
-        # Si pas de bourrage, ça avance
-        if not en_bourrage:
-            b.x += time.dt * vitesse_tapis
-        # Si bourrage, la bouteille qui a dépassé x=6 se bloque, les autres avancent jusqu'à la toucher
-        else:
-            if b.x < 6: 
-                b.x += time.dt * vitesse_tapis
-        
-        # Nettoyage: si la bouteille sort de l'écran, on la supprime
-        if b.x > 15:
-            bouteilles.remove(b)
-            destroy(b)
+    # Mouvement, file d'attente au point de bourrage et sortie: calculés par la simulation
+    simulation.advance(time.dt)
+    synchro_bouteilles()
 
     # --- SIMULATION CAPTEUR ---
-    # Si une bouteille reste trop longtemps devant le capteur (zone x entre 7 et 9)
-    detection = False
-    for b in bouteilles:
-        if 7 < b.x < 9 and en_bourrage:
-            detection = True
-    
-    if detection:
-        capteur_visuel.color = color.red
-        status_text.text = "ALERTE: BOURRAGE DETECTÉ !"
-        status_text.color = color.red
-    else:
-        capteur_visuel.color = color.green
-        status_text.text = "SYSTEME: NORMAL"
-        status_text.color = color.green
+    # Alerte si une bouteille reste devant un capteur pendant le bourrage (passages calculés par la simulation)
+    occupes = simulation.sensors.occupied & (simulation.status == "JAM")
+    alerte.set(bool(occupes.any()))
+    for voyant, occupe in zip(voyants, occupes.tolist()):
+        voyant.set(occupe)
 
 # --- CONTRÔLES CLAVIER POUR LA DÉMO ---
 def input(key):
-    global en_bourrage
     if key == 'b': # Appuie sur B pour simuler la panne
-        en_bourrage = not en_bourrage
-        print(f"Simulation Bourrage: {en_bourrage}")
+        simulation.set_status("NORMAL" if simulation.status == "JAM" else "BOURRAGE")
+        print(f"Simulation Bourrage: {simulation.status == 'JAM'}")
 
 app.run()
\ No newline at end of file
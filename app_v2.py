@@ -1,6 +1,13 @@
 from ursina import *
+import os
 import random
 
+from conveyor_twin import Telemetry, load_line
+from conveyor_twin.detect import DetectorConfig, FaultDetector
+from conveyor_twin.hmi import Panel
+from conveyor_twin.pool import Pool
+from conveyor_twin.widgets import Sparkline
+
 app = Ursina()
 window.title = "Simulateur Supervision Convoyeur - Hackathon 2025"
 window.color = color.black
@@ -11,28 +18,39 @@ camera.rotation_x = 20
 camera.look_at((5, 0, 0))
 
 # --- VARIABLES SYSTÈME (Données Capteurs) ---
-sys_state = "NORMAL" # NORMAL, USURE, BOURRAGE
-motor_speed = 5
-vibration_level = 1.0 # En mm/s
-motor_amps = 2.5 # En Ampères
-bouteilles_count = 0
+# La ligne (vitesses, bourrage, capteur, signaux par état) est décrite dans conveyor_twin/lines/app_v2.toml;
+# la simulation calcule la vibration (mm/s), le courant moteur (A), la vitesse et le comptage optique
+ligne = load_line(os.environ.get("TWIN_LINE", "app_v2"))
+simulation = ligne.sim()
+debut, fin = ligne.config.spawn_x, ligne.config.exit_x
+# Historique des capteurs (10 min à 60 Hz), au lieu de jeter les valeurs après affichage
+telemetrie = Telemetry(("vibration", "courant", "vitesse", "production"))
+# L'IA ne voit que les capteurs (vibration, courant, comptage optique), pas la touche pressée
+detecteur = FaultDetector(DetectorConfig(vibration_nominal=1.0, current_nominal=2.5))
+AFFICHAGE_IA = {
+    "NORMAL": ("ÉTAT: OPTIMAL", color.green),
+    "WEAR": ("ALERTE: DÉSYNCHRO (IA PREDICT)", color.orange),
+    "JAM": ("STOP: BOURRAGE DÉTECTÉ", color.red),
+}
 
 # --- DÉCORS ET MÉCANIQUE ---
 # Le sol
 Entity(model='plane', scale=50, color=color.dark_gray, y=-2, texture='white_cube')
 
-# Le Convoyeur (Structure métal)
-convoyeur_body = Entity(model='cube', scale=(24, 1, 4), color=color.gray, position=(5, -1, 0))
-tapis = Entity(model='cube', scale=(24, 0.1, 3), color=color.black, position=(5, -0.45, 0))
+# Le Convoyeur (Structure métal), de l'arrivée des bouteilles à la sortie
+longueur, milieu = fin - debut + 1, (debut + fin) / 2
+convoyeur_body = Entity(model='cube', scale=(longueur, 1, 4), color=color.gray, position=(milieu, -1, 0))
+tapis = Entity(model='cube', scale=(longueur, 0.1, 3), color=color.black, position=(milieu, -0.45, 0))
 
 # Rails de guidage (Partie Conception Mécanique)
-rail_front = Entity(model='cube', scale=(24, 0.5, 0.1), color=color.light_gray, position=(5, 0.5, -1.6))
-rail_back = Entity(model='cube', scale=(24, 0.5, 0.1), color=color.light_gray, position=(5, 0.5, 1.6))
+rail_front = Entity(model='cube', scale=(longueur, 0.5, 0.1), color=color.light_gray, position=(milieu, 0.5, -1.6))
+rail_back = Entity(model='cube', scale=(longueur, 0.5, 0.1), color=color.light_gray, position=(milieu, 0.5, 1.6))
 
 # --- CAPTEURS VISUELS ---
 # 1. Capteur Optique (Arche au dessus du tapis)
-arche = Entity(model='cube', scale=(0.5, 3, 4.5), color=color.dark_gray, position=(8, 1, 0))
-laser_beam = Entity(model='cube', scale=(0.1, 0.1, 4), color=color.red, position=(8, 1, 0), alpha=0.5)
+capteur = ligne.counter
+arche = Entity(model='cube', scale=(0.5, 3, 4.5), color=color.dark_gray, position=(capteur.x, 1, 0))
+laser_beam = Entity(model='cube', scale=(0.1, 0.1, 4), color=color.red, position=(capteur.x, 1, 0), alpha=0.5)
 Text(text="CPT. OPTIQUE", position=(0.25, 0.2), scale=0.8, color=color.white)
 
 # 2. Capteur Vibration/Moteur (Boitier sur le côté)
@@ -49,88 +67,69 @@ txt_vibe = Text(text="Vibration: 1.2 mm/s", position=(0.40, 0.28), scale=1)
 txt_amps = Text(text="Conso Moteur: 2.5 A", position=(0.40, 0.23), scale=1)
 txt_cnt = Text(text="Prod: 0 Bouteilles", position=(0.40, 0.18), scale=1)
 
-# --- LOGIQUE BOUTEILLES ---
-bouteilles = []
-def spawn_bouteille():
-    if sys_state != "BOURRAGE":
-        # Bouteille d'eau un peu transparente
-        b = Entity(model='cube', color=color.rgba(0, 255, 255, 200), scale=(0.6, 1.5, 0.6), position=(-8, 0.4, 0))
-        bouteilles.append(b)
-        # Randomise un peu l'espacement pour faire réaliste
-        invoke(spawn_bouteille, delay=random.uniform(1.2, 1.8))
+# Valeurs liées: un texte n'est regénéré que si sa valeur affichée change
+ihm = Panel()
+ihm.bind(txt_etat, lambda: detecteur.state, AFFICHAGE_IA.get, attrs=("text", "color"))
+ihm.bind(txt_vibe, lambda: simulation.vibration, "Vibration: {:.2f} mm/s".format, hz=10)
+ihm.bind(txt_amps, lambda: simulation.current, "Conso Moteur: {:.2f} A".format, hz=10)
+ihm.bind(txt_cnt, lambda: simulation.bottle_count, "Prod: {} Bouteilles".format)
+# Flash vert quand une bouteille coupe le faisceau
+ihm.bind(laser_beam, lambda: simulation.laser_on, {True: color.green, False: color.red}.get, attrs=("color",))
 
-spawn_bouteille()
+# Tendances sur la dernière minute (un point toutes les demi-secondes)
+Sparkline(telemetrie, "vibration", value_range=(0, 6), size=(0.4, 0.04), position=(0.6, 0.12), line_color=color.orange)
+Sparkline(telemetrie, "courant", value_range=(0, 10), size=(0.4, 0.04), position=(0.6, 0.07), line_color=color.yellow)
+
+# --- LOGIQUE BOUTEILLES ---
+bouteilles = {}  # identifiant de bouteille de la simulation -> Entity
+# Bouteilles d'eau un peu transparentes, recyclées au lieu d'être recréées puis détruites
+reserve = Pool(lambda: Entity(model='cube', color=color.rgba(0, 255, 255, 200), scale=(0.6, 1.5, 0.6)),
+               capacity=24, discard=destroy)
+
+def synchro_bouteilles():
+    store = simulation.bottles
+    ids = store.ids.tolist()
+    # Pendant le bourrage, les bouteilles empilées devant le point de blocage tremblent un peu
+    coincees = (store.x >= 6).tolist() if simulation.status == "JAM" else [False] * len(ids)
+    for id_bouteille, x, z, coincee in zip(ids, store.x.tolist(), store.z.tolist(), coincees):
+        b = bouteilles.get(id_bouteille)
+        if b is None:
+            b = bouteilles[id_bouteille] = reserve.acquire()
+            b.position = (x, 0.4, z)
+        b.x = x + random.uniform(-0.01, 0.01) if coincee else x
+    # Les bouteilles sortent dans l'ordre: tout identifiant sous le plus ancien a quitté le tapis
+    plus_ancien = ids[0] if ids else simulation.next_id
+    for id_bouteille in [i for i in bouteilles if i < plus_ancien]:
+        reserve.release(bouteilles.pop(id_bouteille))
 
 def update():
-    global vibration_level, motor_amps, bouteilles_count, motor_speed
-    
-    # 1. SIMULATION DES DONNÉES CAPTEURS SELON L'ÉTAT
-    if sys_state == "NORMAL":
-        target_vibe = 1.0 + random.uniform(-0.1, 0.1)
-        target_amps = 2.5 + random.uniform(-0.1, 0.1)
-        motor_speed = 6
-        txt_etat.text = "ÉTAT: OPTIMAL"
-        txt_etat.color = color.green
+    # 1. SIMULATION: convoyeur, file au point de bourrage, capteurs (lissés) et comptage optique
+    simulation.advance(time.dt)
+
+    if simulation.status == "NORMAL":
         motor_box.color = color.azure
-        
-    elif sys_state == "USURE":
-        # Vibration augmente, Ampérage normal
-        target_vibe = 4.5 + random.uniform(-0.5, 0.5) # HAUTE VIBRATION
-        target_amps = 2.8 + random.uniform(-0.1, 0.1)
-        motor_speed = 6
-        txt_etat.text = "ALERTE: DÉSYNCHRO (IA PREDICT)"
-        txt_etat.color = color.orange
+    elif simulation.status == "WEAR":
         # Effet visuel: le moteur secoue
         motor_box.x = -6 + random.uniform(-0.05, 0.05)
-        
-    elif sys_state == "BOURRAGE":
-        # Moteur force (Ampérage haut), Vitesse nulle
-        target_vibe = 0.2 # Plus de vibration car à l'arrêt
-        target_amps = 8.5 + random.uniform(-0.5, 0.5) # PIC D'INTENSITÉ
-        motor_speed = 0
-        txt_etat.text = "STOP: BOURRAGE DÉTECTÉ"
-        txt_etat.color = color.red
+    elif simulation.status == "JAM":
         motor_box.color = color.red
 
-    # Lissage des valeurs pour l'affichage (Lerp)
-    vibration_level = lerp(vibration_level, target_vibe, time.dt * 2)
-    motor_amps = lerp(motor_amps, target_amps, time.dt * 2)
-
-    # Mise à jour Textes
-    txt_vibe.text = f"Vibration: {vibration_level:.2f} mm/s"
-    txt_amps.text = f"Conso Moteur: {motor_amps:.2f} A"
+    telemetrie.record(time.time(), (simulation.vibration, simulation.current, simulation.speed, simulation.bottle_count))
     
-    # 2. PHYSIQUE DU CONVOYEUR
-    for b in bouteilles:
-        # Avance
-        if b.x < 7 or sys_state != "BOURRAGE":
-             b.x += time.dt * motor_speed
-        
-        # Simulation bourrage physique : les bouteilles s'empilent
-        if sys_state == "BOURRAGE" and b.x >= 6:
-            # Elles tremblent un peu car elles sont coincées
-            b.x += random.uniform(-0.01, 0.01)
-
-        # Détection passage capteur optique
-        if 7.9 < b.x < 8.1 and motor_speed > 0:
-            laser_beam.color = color.green # Flash vert
-        else:
-            laser_beam.color = color.red
-
-        # Nettoyage
-        if b.x > 15:
-            bouteilles.remove(b)
-            destroy(b)
-            if sys_state != "BOURRAGE":
-                bouteilles_count += 1
-                txt_cnt.text = f"Prod: {bouteilles_count} Bouteilles"
+    # Diagnostic IA à partir des signaux
+    detecteur.update(time.time(), simulation.vibration, simulation.current, simulation.bottle_count)
+    
+    # 2. AFFICHAGE DU CONVOYEUR
+    synchro_bouteilles()
+
+    # Mise à jour des textes qui ont changé
+    ihm.refresh()
 
 # --- CONTRÔLES DÉMO ---
 def input(key):
-    global sys_state
-    if key == '1': sys_state = "NORMAL"
-    if key == '2': sys_state = "USURE"
-    if key == '3': sys_state = "BOURRAGE"
+    if key == '1': simulation.set_status("NORMAL")
+    if key == '2': simulation.set_status("USURE")
+    if key == '3': simulation.set_status("BOURRAGE")
 
 # Instructions à l'écran
 Text(text="CONTROLES: [1] Normal  [2] Désynchro/Usure  [3] Bourrage", position=(-0.5, -0.45), color=color.gray)
@@ -1,7 +1,19 @@
 from ursina import *
+import atexit
+import os
 import random
 
+from conveyor_twin import Telemetry, load_line
+from conveyor_twin.gateway import Gateway
+from conveyor_twin.hmi import Panel
+from conveyor_twin.pool import Pool
+from conveyor_twin.profiler import Profiler
+from conveyor_twin.runner import SimThread
+from conveyor_twin.widgets import ProfileOverlay, Sparkline
+
 # --- CONFIGURATION & SETUP ---
+# Belt, sensors and jam points come from the line description (TWIN_LINE: preset name or .toml file)
+line = load_line(os.environ.get("TWIN_LINE", "digital_twin"))
 app = Ursina()
 window.title = "Digital Twin: Smart Conveyor System"
 window.color = color.rgb(20, 20, 30) # Dark premium background
@@ -31,27 +43,31 @@ AmbientLight(color=color.rgba(100, 100, 100, 100))
 
 # 3. The Conveyor Belt System
 class ConveyorBelt(Entity):
-    def __init__(self):
+    def __init__(self, start=-5, end=25):
         super().__init__()
+        length, mid = end - start, (start + end) / 2
         # Main Structure
-        self.body = Entity(parent=self, model='cube', scale=(30, 1, 4), color=color.rgb(50, 50, 60), position=(10, -1, 0))
+        self.body = Entity(parent=self, model='cube', scale=(length, 1, 4), color=color.rgb(50, 50, 60), position=(mid, -1, 0))
         
         # Moving Belt Surface
-        self.belt = Entity(parent=self, model='cube', scale=(30, 0.1, 3.2), color=color.rgb(20, 20, 20), position=(10, -0.45, 0))
+        self.belt = Entity(parent=self, model='cube', scale=(length, 0.1, 3.2), color=color.rgb(20, 20, 20), position=(mid, -0.45, 0))
         
         # Rails
-        self.rail_front = Entity(parent=self, model='cube', scale=(30, 0.5, 0.2), color=color.rgb(200, 200, 0), position=(10, 0.5, -1.8))
-        self.rail_back = Entity(parent=self, model='cube', scale=(30, 0.5, 0.2), color=color.rgb(200, 200, 0), position=(10, 0.5, 1.8))
+        self.rail_front = Entity(parent=self, model='cube', scale=(length, 0.5, 0.2), color=color.rgb(200, 200, 0), position=(mid, 0.5, -1.8))
+        self.rail_back = Entity(parent=self, model='cube', scale=(length, 0.5, 0.2), color=color.rgb(200, 200, 0), position=(mid, 0.5, 1.8))
         
         # Legs
-        for x in [0, 10, 20]:
+        for x in [start + 5, mid, end - 5]:
             Entity(parent=self, model='cube', scale=(1, 4, 3), color=color.rgb(40, 40, 50), position=(x, -3, 0))
 
-conveyor = ConveyorBelt()
+conveyor = ConveyorBelt(line.config.spawn_x, line.config.exit_x)
 
 # 4. Sensors
-# Optical Sensor (Arch)
-sensor_arch = Entity(model='cube', scale=(0.5, 4, 5), color=color.dark_gray, position=(15, 1, 0))
+# Optical Sensor (Arch) on the counting sensor; the line's other sensors get a plain arch
+for sensor in line.sensors:
+    arch = Entity(model='cube', scale=(0.5, 4, 5), color=color.dark_gray, position=(sensor.x, 1, 0))
+    if sensor.counter:
+        sensor_arch = arch
 sensor_laser = Entity(parent=sensor_arch, model='cube', scale=(0.1, 0.1, 0.9), color=color.red, y=0, alpha=0.6)
 Text(text="OPTICAL", parent=sensor_arch, scale=2, y=0.6, x=-0.6, rotation_y=90)
 
@@ -60,70 +76,53 @@ iot_box = Entity(model='cube', scale=(1.5, 2, 1.5), color=color.azure, position=
 Text(text="IoT HUB", parent=iot_box, scale=2, y=0.6, x=-0.6, color=color.black)
 
 # --- SIMULATION STATE ---
-class SimulationState:
-    def __init__(self):
-        self.status = "NORMAL" # NORMAL, WEAR, JAM
-        self.speed = 6.0
-        self.vibration = 0.5
-        self.current = 2.0
-        self.bottle_count = 0
-        self.last_spawn = 0
-
-sim_state = SimulationState()
-
-# --- BOTTLE LOGIC ---
-bottles = []
+# Physics run headless in conveyor_twin; this script only renders them.
+sim_state = line.sim()
+telemetry = Telemetry()  # Last 10 min of every channel, kept for trends and fault analysis
+sim_state.observers.append(telemetry.sample)
+
+# IoT gateway, off unless TWIN_MQTT and/or TWIN_WS (host:port) are set:
+# streams the twin out and lets real sensors or remote commands drive it
+gateway = Gateway.from_env()
+if gateway:
+    sim_state.observers.append(gateway.sample)
+
+# The sim steps on its own thread at a fixed rate, so a slow frame or a minimized window
+# doesn't slow the plant; the views draw `view`, its latest snapshot interpolated to the
+# frame's time
+runner = SimThread(sim_state)
+if gateway:
+    runner.controllers.append(gateway.apply)
+view = runner.latest
+
+# --- BOTTLE VIEWS ---
+bottles = {}  # sim bottle id -> Entity
 
 class Bottle(Entity):
-    def __init__(self):
+    def __init__(self, z):
         super().__init__(
             model='cylinder',
             color=color.rgba(0, 255, 255, 200),
             scale=(0.8, 2, 0.8),
-            position=(-5, 0.5, random.uniform(-0.5, 0.5)),
-            collider='box'
+            position=(-5, 0.5, z),
         )
-        self.velocity = 0
-
-    def update(self):
-        # Movement Logic
-        if sim_state.status == "JAM":
-            # In a JAM, only move if not blocked by another bottle
-            blocked = False
-            hit_info = self.intersects()
-            if hit_info.hit and hit_info.entity in bottles:
-                # Simple check: if the bottle in front is stopped, I stop
-                if hit_info.entity.x > self.x:
-                    blocked = True
-            
-            if not blocked and self.x < 12: # Pile up at x=12
-                 self.x += time.dt * sim_state.speed
-        else:
-            # Normal movement
-            self.x += time.dt * sim_state.speed
-
-        # Sensor Logic (Passing the arch)
-        if 14.9 < self.x < 15.1:
-            sensor_laser.color = color.green
-            if not hasattr(self, 'counted'):
-                sim_state.bottle_count += 1
-                self.counted = True
-        elif 15.1 < self.x < 15.3:
-             sensor_laser.color = color.red
-
-        # Cleanup
-        if self.x > 25:
-            bottles.remove(self)
-            destroy(self)
-
-def spawn_manager():
-    if sim_state.status == "JAM":
-        return # Don't spawn new bottles if jammed to avoid infinite pileup at start
-
-    if time.time() - sim_state.last_spawn > 1.5: # Spawn every 1.5s
-        b = Bottle()
-        bottles.append(b)
-        sim_state.last_spawn = time.time()
+
+# Bottles are recycled instead of built and destroyed for each one (a full belt is ~40)
+bottle_pool = Pool(lambda: Bottle(0), capacity=48, discard=destroy)
+
+def sync_bottles():
+    store = view.bottles
+    ids = store.ids.tolist()
+    for bottle_id, x, z in zip(ids, store.x.tolist(), store.z.tolist()):
+        entity = bottles.get(bottle_id)
+        if entity is None:
+            entity = bottles[bottle_id] = bottle_pool.acquire()
+            entity.z = z
+        entity.x = x
+    # Ids only grow, so everything below the oldest live id has left the belt
+    oldest = ids[0] if ids else view.next_id
+    for bottle_id in [i for i in bottles if i < oldest]:
+        bottle_pool.release(bottles.pop(bottle_id))
 
 # --- DASHBOARD UI ---
 class Dashboard(Entity):
@@ -138,58 +137,53 @@ class Dashboard(Entity):
         self.cur_txt = Text(text="Current: 2.0 A", parent=self.panel, position=(-0.45, 0.0), scale=1)
         self.cnt_txt = Text(text="Bottles: 0", parent=self.panel, position=(-0.45, -0.1), scale=1)
         
-        self.help_txt = Text(text="[1] NORMAL  [2] WEAR  [3] JAM", parent=self, position=(-0.85, -0.45), color=color.gray)
+        self.help_txt = Text(text="[1] NORMAL  [2] WEAR  [3] JAM  [F3] PROFILER", parent=self, position=(-0.85, -0.45), color=color.gray)
 
 dashboard = Dashboard()
 
+# Bound values: a widget is only re-rendered when its formatted value changes
+STATUS_STYLE = {
+    "NORMAL": ("STATUS: NORMAL", color.green),
+    "WEAR": ("WARNING: BEARING WEAR", color.orange),
+    "JAM": ("CRITICAL: JAM DETECTED", color.red),
+}
+IOT_COLOR = {"NORMAL": color.azure, "WEAR": color.orange, "JAM": color.red}
+hmi = Panel()
+hmi.bind(dashboard.status_txt, lambda: view.status, STATUS_STYLE.get, attrs=("text", "color"))
+hmi.bind(iot_box, lambda: view.status, IOT_COLOR.get, attrs=("color",))
+hmi.bind(sensor_laser, lambda: view.laser_on, {True: color.green, False: color.red}.get, attrs=("color",))
+hmi.bind(dashboard.vib_txt, lambda: view.vibration, "Vibration: {:.2f} mm/s".format, hz=10)
+hmi.bind(dashboard.cur_txt, lambda: view.current, "Current: {:.2f} A".format, hz=10)
+hmi.bind(dashboard.cnt_txt, lambda: view.bottle_count, "Bottles: {}".format)
+
+# Trends over the last minute (one point every half second)
+vib_trend = Sparkline(telemetry, "vibration", value_range=(0, 6), position=(0.70, 0.12), line_color=color.orange)
+cur_trend = Sparkline(telemetry, "current", value_range=(0, 10), position=(0.70, 0.04), line_color=color.yellow)
+
+# Phase timings, shown with [F3]
+profiler = Profiler()
+profiler.instrument(sim_state, runner)
+ProfileOverlay(profiler, extra=(bottle_pool.report,))
+runner.start()  # Last, once the sim is fully wired
+atexit.register(runner.stop)
+
 # --- MAIN LOOP ---
 def update():
-    spawn_manager()
-    
-    # Update Sensor Data based on State
-    target_vib = 0.5
-    target_cur = 2.0
-    
-    if sim_state.status == "NORMAL":
-        sim_state.speed = 6.0
-        target_vib = 0.5 + random.uniform(-0.1, 0.1)
-        target_cur = 2.0 + random.uniform(-0.1, 0.1)
-        dashboard.status_txt.text = "STATUS: NORMAL"
-        dashboard.status_txt.color = color.green
-        iot_box.color = color.azure
-        
-    elif sim_state.status == "WEAR":
-        sim_state.speed = 5.5
-        target_vib = 4.5 + random.uniform(-0.5, 0.5) # High vibration
-        target_cur = 2.5 + random.uniform(-0.1, 0.1)
-        dashboard.status_txt.text = "WARNING: BEARING WEAR"
-        dashboard.status_txt.color = color.orange
-        iot_box.color = color.orange
-        # Visual shake effect
-        iot_box.x = -2 + random.uniform(-0.05, 0.05)
-        
-    elif sim_state.status == "JAM":
-        sim_state.speed = 0 # Belt stopped
-        target_vib = 0.1 # No movement
-        target_cur = 8.0 + random.uniform(-0.5, 0.5) # Stalled motor current spike
-        dashboard.status_txt.text = "CRITICAL: JAM DETECTED"
-        dashboard.status_txt.color = color.red
-        iot_box.color = color.red
-
-    # Smooth data transitions
-    sim_state.vibration = lerp(sim_state.vibration, target_vib, time.dt * 5)
-    sim_state.current = lerp(sim_state.current, target_cur, time.dt * 5)
-    
-    # Update UI
-    dashboard.vib_txt.text = f"Vibration: {sim_state.vibration:.2f} mm/s"
-    dashboard.cur_txt.text = f"Current: {sim_state.current:.2f} A"
-    dashboard.cnt_txt.text = f"Bottles: {sim_state.bottle_count}"
+    global view
+    view = runner.frame()
+    with profiler.phase("ui"):
+        sync_bottles()
+
+        if view.status == "WEAR":
+            # Visual shake effect
+            iot_box.x = -2 + random.uniform(-0.05, 0.05)
+        hmi.refresh()
 
 # --- INPUTS ---
 def input(key):
-    if key == '1': sim_state.status = "NORMAL"
-    if key == '2': sim_state.status = "WEAR"
-    if key == '3': sim_state.status = "JAM"
+    if key == '1': runner.set_status("NORMAL")
+    if key == '2': runner.set_status("WEAR")
+    if key == '3': runner.set_status("JAM")
     if key == 'escape': application.quit()
 
 app.run()
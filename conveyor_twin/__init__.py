@@ -0,0 +1,10 @@
+"""Digital twin of the bottling conveyor: headless engine and Ursina views."""
+from .bottles import BottleStore
+from .lanes import AccumulationZone, LaneIndex, SegmentTable
+from .sensors import Sensor, SensorArray
+from .sim import STATES, ConveyorSim, SimConfig
+from .line import LineModel, load_line
+from .telemetry import SIM_CHANNELS, RingBuffer, Telemetry
+
+__all__ = ["STATES", "AccumulationZone", "BottleStore", "LaneIndex", "SegmentTable", "Sensor", "SensorArray",
+           "ConveyorSim", "SimConfig", "LineModel", "load_line", "SIM_CHANNELS", "RingBuffer", "Telemetry"]
@@ -0,0 +1,131 @@
+"""Entry point for the kiosks.
+
+Runs one of the views (the scripts at the root of the repo) or, with
+--headless, the twin without any window: the graphics stack is never
+imported, and the usual TWIN_* variables (gateway, web dashboard, recording,
+history, time-series store) work the same. --line picks the line description (a preset from
+conveyor_twin/lines/ or a .toml file) instead of the view's own. --timing
+prints how long each startup step took, up to the first rendered frame.
+
+    python -m conveyor_twin                          # conveyor_v2_stable view
+    python -m conveyor_twin twin --timing            # another view, with the startup report
+    python -m conveyor_twin --headless --speed 60 --seconds 3600
+    python -m conveyor_twin --line my_line.toml
+"""
+import argparse
+import atexit
+import os
+import runpy
+import sys
+import time
+from pathlib import Path
+
+from . import startup
+
+ROOT = Path(__file__).resolve().parent.parent
+VIEWS = {"v2": "conveyor_v2_stable.py", "twin": "conveyor_digital_twin.py",
+         "app": "app.py", "app_v2": "app_v2.py"}
+
+
+def run_view(name, timing=False, argv=()):
+    script = ROOT / VIEWS[name]
+    startup.watch_first_frame((lambda: print(startup.report(), flush=True)) if timing else None)
+    sys.argv = [str(script), *argv]
+    runpy.run_path(str(script), run_name="__main__")
+
+
+def run_headless(seconds=None, speed=1.0, timing=False, line="v2"):
+    """Step the twin in real time (`speed` times faster, or flat out if 0)."""
+    from .line import load_line
+    from .telemetry import Telemetry
+
+    line = load_line(line)
+    sim = line.sim()
+    telemetry = Telemetry()
+    sim.observers.append(telemetry.sample)
+    gateway = web = history = store = None
+    if os.environ.get("TWIN_STORE"):
+        from .store import TimeSeriesStore
+        store = TimeSeriesStore.from_env()
+        sim.observers.append(store.observer(line.name))
+        atexit.register(store.close)
+    if os.environ.get("TWIN_MQTT") or os.environ.get("TWIN_WS"):
+        from .gateway import Gateway
+        gateway = Gateway.from_env()
+        sim.observers.append(gateway.sample)
+        atexit.register(gateway.stop)
+    if os.environ.get("TWIN_WEB"):
+        from .web import WebDashboard
+        web = WebDashboard.from_env(line=line, store=store, conveyor=line.name)
+        sim.observers.append(web.sample)
+        atexit.register(web.stop)
+    if os.environ.get("TWIN_RECORD"):
+        from .replay import Recorder
+        recorder = Recorder(os.environ["TWIN_RECORD"], sim.config)
+        sim.observers.append(recorder)
+        atexit.register(recorder.close)
+    if os.environ.get("TWIN_HISTORY"):
+        from .ingest import HistoryFeed, open_log
+        history = HistoryFeed(open_log(os.environ["TWIN_HISTORY"]), speed=speed or 1.0)
+    startup.mark("ready")
+    if timing:
+        print(startup.report(), flush=True)
+
+    status, last = None, time.perf_counter()
+    try:
+        while seconds is None or sim.time < seconds:
+            if speed:
+                time.sleep(sim.config.dt / speed)
+                now = time.perf_counter()
+                sim.advance((now - last) * speed, max_steps=1000)
+                if history:
+                    history.advance(now - last)
+                last = now
+            else:
+                sim.step()
+                if history:
+                    history.advance(sim.config.dt)
+            if gateway:
+                gateway.apply(sim)
+            if web:
+                web.apply(sim)
+            if history:
+                history.apply(sim)
+            if sim.status != status:
+                status = sim.status
+                print(f"{sim.time:10.1f} s  {status:6s}  bottles {sim.bottle_count}", flush=True)
+    except KeyboardInterrupt:
+        pass
+    print(f"{sim.time:10.1f} s  {sim.status:6s}  bottles {sim.bottle_count}  ({sim.tick:,} ticks)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m conveyor_twin", description="Start the conveyor twin")
+    parser.add_argument("view", nargs="?", default="v2", choices=sorted(VIEWS))
+    parser.add_argument("--headless", action="store_true", help="no window, no graphics imports")
+    parser.add_argument("--seconds", type=float, help="headless: stop after this much simulated time")
+    parser.add_argument("--speed", type=float, default=1.0, help="headless: times real time (0: flat out)")
+    parser.add_argument("--line", help="line preset or .toml/.yaml file (default: the view's own)")
+    parser.add_argument("--timing", action="store_true", help="print the startup timing report")
+    parser.add_argument("--rebuild-scene", action="store_true", help="drop the cached static scenes first")
+    args, rest = parser.parse_known_args(argv)
+    startup.mark("arguments")
+
+    if args.rebuild_scene:
+        for path in startup.CACHE_DIR.glob("*.bam"):
+            path.unlink()
+    if args.line:
+        from .line import load_line
+        try:
+            load_line(args.line)  # Report a bad description here rather than from inside a view
+        except ValueError as error:
+            raise SystemExit(f"{args.line}: {error}")
+        os.environ["TWIN_LINE"] = args.line  # Read by the views
+    if args.headless:
+        run_headless(args.seconds, args.speed, args.timing, args.line or "v2")
+    else:
+        run_view(args.view, args.timing, rest)
+
+
+if __name__ == "__main__":
+    main()
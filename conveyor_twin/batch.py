@@ -0,0 +1,164 @@
+"""Faster-than-real-time scenario sweeps.
+
+Runs a grid of headless simulations across a process pool and writes one row
+of KPIs per run to CSV or Parquet, e.g.:
+
+    python -m conveyor_twin.batch --spawn 1.2:1.8:0.1 --speed 5.5,6.0 \\
+        --fault JAM --onset 600,1800 --duration 30,120 --replicas 20 \\
+        --horizon 3600 --out sweep.csv
+"""
+import argparse
+import csv
+import itertools
+import os
+import sys
+import time
+from dataclasses import asdict, dataclass
+from multiprocessing import Pool
+
+import numpy as np
+
+from .sim import STATES, ConveyorSim, SimConfig
+
+
+@dataclass(frozen=True)
+class Scenario:
+    run: int
+    seed: int
+    spawn_interval: float = 1.2
+    spawn_jitter: float = 0.0
+    speed: float = 6.0
+    fault: str = "NONE"             # NONE, WEAR or JAM
+    fault_onset: float = 0.0
+    fault_duration: float = 0.0
+    horizon: float = 3600.0
+
+
+def run_scenario(scn):
+    cfg = SimConfig(spawn_interval=scn.spawn_interval, spawn_jitter=scn.spawn_jitter)
+    cfg.speed["NORMAL"] = scn.speed
+    sim = ConveyorSim(cfg, seed=scn.seed)
+    if scn.fault != "NONE":
+        sim.schedule(scn.fault_onset, scn.fault)
+        sim.schedule(scn.fault_onset + scn.fault_duration, "NORMAL")
+
+    steps = round(scn.horizon / cfg.dt)
+    state_ticks = dict.fromkeys(STATES, 0)
+    max_on_belt = 0
+    peak_current = vib_sum = 0.0
+    started = time.perf_counter()
+    for _ in range(steps):
+        sim.step()
+        state_ticks[sim.status] += 1
+        max_on_belt = max(max_on_belt, sim.bottles.n)
+        peak_current = max(peak_current, sim.current)
+        vib_sum += sim.vibration
+
+    row = asdict(scn)
+    row.update(
+        bottle_count=sim.bottle_count,
+        spawned=sim.next_id,
+        throughput_per_h=sim.bottle_count * 3600.0 / scn.horizon,
+        jam_s=state_ticks["JAM"] * cfg.dt,
+        wear_s=state_ticks["WEAR"] * cfg.dt,
+        on_belt_end=sim.bottles.n,
+        max_on_belt=max_on_belt,
+        mean_vibration=vib_sum / max(steps, 1),
+        peak_current=peak_current,
+        wall_s=time.perf_counter() - started,
+    )
+    return row
+
+
+def build_grid(spawn, jitter, speed, faults, onsets, durations, horizon, replicas, seed):
+    points = []
+    for fault in faults:
+        # Onset and duration are meaningless without a fault, don't repeat those runs
+        timing = [(0.0, 0.0)] if fault == "NONE" else itertools.product(onsets, durations)
+        for (on, du), sp, ji, v in itertools.product(timing, spawn, jitter, speed):
+            points += [(sp, ji, v, fault, on, du)] * replicas
+    # Independent, reproducible streams: run i always gets the same seed
+    seeds = [int(s.generate_state(1)[0]) for s in np.random.SeedSequence(seed).spawn(len(points))]
+    return [
+        Scenario(run=i, seed=seeds[i], spawn_interval=sp, spawn_jitter=ji, speed=v, fault=f,
+                 fault_onset=on, fault_duration=du, horizon=horizon)
+        for i, (sp, ji, v, f, on, du) in enumerate(points)
+    ]
+
+
+# --- OUTPUT ---
+def write_csv(path, rows):
+    with open(path, "w", newline="") as fh:
+        writer = None
+        for row in rows:
+            if writer is None:
+                writer = csv.DictWriter(fh, fieldnames=list(row))
+                writer.writeheader()
+            writer.writerow(row)
+            fh.flush()  # Keep partial results if an overnight sweep dies
+            yield row
+
+
+def write_parquet(path, rows):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise SystemExit("Parquet output needs pyarrow (pip install pyarrow), or use a .csv path")
+    collected = []
+    for row in rows:
+        collected.append(row)
+        yield row
+    if collected:
+        pq.write_table(pa.Table.from_pylist(collected), path)
+
+
+# --- CLI ---
+def _values(text, cast=float):
+    """'1.2,1.5' -> [1.2, 1.5]; '1.2:1.8:0.1' -> [1.2, 1.3, ..., 1.8]."""
+    if ":" in text:
+        start, stop, step = (float(v) for v in text.split(":"))
+        return [round(v, 9) for v in np.arange(start, stop + step / 2, step)]
+    return [cast(v) for v in text.split(",")]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m conveyor_twin.batch", description=__doc__.splitlines()[0])
+    parser.add_argument("--spawn", default="1.2", help="spawn intervals (s): list a,b or range start:stop:step")
+    parser.add_argument("--jitter", default="0", help="random extra spawn spacing (s)")
+    parser.add_argument("--speed", default="6.0", help="NORMAL belt speeds")
+    parser.add_argument("--fault", default="NONE", help="fault kinds: NONE, WEAR, JAM")
+    parser.add_argument("--onset", default="600", help="fault onset times (s)")
+    parser.add_argument("--duration", default="60", help="fault durations (s)")
+    parser.add_argument("--horizon", type=float, default=3600.0, help="simulated seconds per run")
+    parser.add_argument("--replicas", type=int, default=1, help="seeded repetitions of each grid point")
+    parser.add_argument("--seed", type=int, default=0, help="base seed of the sweep")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="worker processes")
+    parser.add_argument("--out", default="sweep.csv", help="output file (.csv or .parquet)")
+    args = parser.parse_args(argv)
+
+    faults = [f.strip().upper() for f in args.fault.split(",")]
+    for f in faults:
+        if f != "NONE" and f not in STATES:
+            parser.error(f"unknown fault {f!r}")
+    scenarios = build_grid(
+        _values(args.spawn), _values(args.jitter), _values(args.speed), faults,
+        _values(args.onset), _values(args.duration), args.horizon, args.replicas, args.seed,
+    )
+    writer = write_parquet if args.out.endswith(".parquet") else write_csv
+
+    started = time.perf_counter()
+    chunksize = max(1, len(scenarios) // (8 * max(args.workers, 1)))
+    with Pool(args.workers) as pool:
+        rows = pool.imap_unordered(run_scenario, scenarios, chunksize=chunksize)
+        for done, _ in enumerate(writer(args.out, rows), 1):
+            if done % 50 == 0 or done == len(scenarios):
+                print(f"{done}/{len(scenarios)} runs", file=sys.stderr)
+    elapsed = time.perf_counter() - started
+    simulated = len(scenarios) * args.horizon
+    print(f"{len(scenarios)} runs, {simulated / 3600:.1f} h of line time in {elapsed:.1f} s "
+          f"({simulated / max(elapsed, 1e-9):.0f}x real time) -> {args.out}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""Batched bottle rendering for the Ursina views.
+
+Every bottle (body + cap) is baked into one dynamic Geom, so the whole line
+costs a single draw call whatever the bottle count. Positions are copied
+straight from the BottleStore arrays into the vertex buffer each frame.
+
+This is CPU batching rather than GPU instancing on purpose: the demo boxes
+run Panda3D's software renderer, which has no shader support.
+"""
+import numpy as np
+from panda3d.core import (
+    Geom, GeomEnums, GeomNode, GeomTriangles, GeomVertexArrayFormat,
+    GeomVertexData, GeomVertexFormat, OmniBoundingVolume,
+)
+from ursina import Entity
+
+# Unit cube: 8 corners, 12 triangles (flat-shaded, so no normals needed),
+# wound like ursina's own 'cube' model for its y-up-left coordinate system.
+_CUBE_CORNERS = np.array(
+    [(x, y, z) for x in (-0.5, 0.5) for y in (-0.5, 0.5) for z in (-0.5, 0.5)],
+    dtype=np.float32,
+)
+_CUBE_TRIANGLES = np.array([
+    0, 3, 1, 0, 2, 3,   # -x
+    4, 7, 6, 4, 5, 7,   # +x
+    0, 5, 4, 0, 1, 5,   # -y
+    2, 7, 3, 2, 6, 7,   # +y
+    0, 6, 2, 0, 4, 6,   # -z
+    1, 7, 5, 1, 3, 7,   # +z
+], dtype=np.uint32)
+
+# (scale, offset, rgba) of each part, matching the per-Entity Bottle
+BOTTLE_PARTS = (
+    ((0.8, 1.5, 0.8), (0, 0, 0), (0, 200, 255, 255)),    # Body (opaque: blending is the slow path)
+    ((0.4, 0.3, 0.4), (0, 0.9, 0), (255, 255, 255, 255)),  # Cap
+)
+
+
+def _format():
+    vertex = GeomVertexArrayFormat()
+    vertex.add_column("vertex", 3, Geom.NT_float32, Geom.C_point)
+    rgba = GeomVertexArrayFormat()
+    rgba.add_column("color", 4, Geom.NT_uint8, Geom.C_color)
+    fmt = GeomVertexFormat()
+    fmt.add_array(vertex)
+    fmt.add_array(rgba)
+    return GeomVertexFormat.register_format(fmt)
+
+
+class BatchedBottles(Entity):
+    def __init__(self, parts=BOTTLE_PARTS, y=0.5, capacity=1024, **kwargs):
+        super().__init__(**kwargs)
+        self.y_offset = y
+        # Template of one bottle, centered on its (x, y, z) position
+        verts, tris, colors = [], [], []
+        for scale, offset, rgba in parts:
+            tris.append(_CUBE_TRIANGLES + 8 * len(verts))
+            verts.append(_CUBE_CORNERS * scale + offset)
+            colors.append(np.tile(np.array(rgba, dtype=np.uint8), (8, 1)))
+        self._template = np.concatenate(verts)
+        self._tris = np.concatenate(tris)
+        self._colors = np.concatenate(colors)
+        self._n = -1
+        self._node = GeomNode("bottles")
+        self._np = self.attach_new_node(self._node)
+        self._np.node().set_bounds(OmniBoundingVolume())  # Skip per-frame bounds
+        self._np.node().set_final(True)
+        if any(rgba[3] < 255 for _, _, rgba in parts):
+            self._np.set_transparency(True)
+        self._allocate(capacity)
+
+    def _allocate(self, capacity):
+        self.capacity = capacity
+        per_bottle = len(self._template)
+        self._vdata = GeomVertexData("bottles", _format(), GeomEnums.UH_dynamic)
+        self._vdata.set_num_rows(capacity * per_bottle)
+        memoryview(self._vdata.modify_array(1)).cast("B")[:] = np.tile(self._colors, (capacity, 1)).tobytes()
+
+        offsets = (np.arange(capacity, dtype=np.uint32) * per_bottle)[:, None]
+        self._indices = (self._tris[None, :] + offsets).ravel()
+        self._prim = GeomTriangles(GeomEnums.UH_dynamic)
+        self._prim.set_index_type(GeomEnums.NT_uint32)
+        geom = Geom(self._vdata)
+        geom.add_primitive(self._prim)
+        self._node.remove_all_geoms()
+        self._node.add_geom(geom)
+        self._geom_index = 0
+        self._positions = np.zeros((capacity, per_bottle, 3), dtype=np.float32)
+        self._n = -1
+
+    def sync(self, store):
+        """Copy the store positions into the vertex buffer."""
+        n = store.n
+        if n > self.capacity:
+            self._allocate(max(n, 2 * self.capacity))
+        geom = self._node.modify_geom(self._geom_index)
+        if n != self._n:
+            prim = geom.modify_primitive(0)
+            indices = prim.modify_vertices()
+            indices.set_num_rows(n * len(self._tris))
+            memoryview(indices).cast("B").cast("I")[:] = self._indices[:n * len(self._tris)]
+            self._n = n
+        if n == 0:
+            return
+        pos = self._positions[:n]
+        pos[:] = self._template
+        pos[:, :, 0] += store.x[:, None]
+        pos[:, :, 1] += self.y_offset
+        pos[:, :, 2] += store.z[:, None]
+        vdata = geom.modify_vertex_data()
+        memoryview(vdata.modify_array(0)).cast("B").cast("f")[:n * pos.shape[1] * 3] = pos.ravel()
@@ -0,0 +1,279 @@
+"""Benchmark suite for the simulation and rendering paths.
+
+Each benchmark runs at 100, 1k and 10k bottles and reports a rate (higher is
+better), the best of a few timed repeats:
+
+    sim.ticks     ticks/s of ConveyorSim on a running line
+    sim.jam       ticks/s while a JAM queue piles up on an accumulation table
+    sim.churn     bottles/s spawned and destroyed, one of each per tick
+    render.batched  offscreen frames/s with the batched bottle mesh
+    render.entities offscreen frames/s with one Entity per bottle, one
+                    bottle recycled per frame as in the scripts
+
+Results are compared with the stored baseline (bench_baseline.json next to
+this file) and a benchmark slower than its threshold fails the run, so this
+is the check to pass before shipping a new version to the plant screens.
+Baselines are per machine: --save after a change of hardware.
+
+    python -m conveyor_twin.bench                       # run and compare
+    python -m conveyor_twin.bench --headless --sizes 100,1000
+    python -m conveyor_twin.bench --save                # store a new baseline
+"""
+import argparse
+import json
+import platform
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+from .bottles import BottleStore
+from .lanes import AccumulationZone
+from .sim import ConveyorSim, SimConfig
+
+BASELINE = Path(__file__).with_name("bench_baseline.json")
+SIZES = (100, 1000, 10000)
+# Allowed slowdown against the baseline before a benchmark fails
+THRESHOLDS = {"sim": 0.25, "render": 0.35}
+
+
+# --- TIMING ---
+def measure(setup, min_time=0.5, repeat=3):
+    """Best rate over `repeat` runs; setup() returns a callable doing one
+    unit of work per call and returning how many units it did."""
+    best = 0.0
+    for _ in range(repeat):
+        work = setup()
+        done, started = 0, time.perf_counter()
+        while True:
+            done += work()
+            elapsed = time.perf_counter() - started
+            if elapsed >= min_time:
+                break
+        best = max(best, done / elapsed)
+    return best
+
+
+# --- SIMULATION ---
+def loaded(n, pitch, **config):
+    """ConveyorSim with n bottles `pitch` apart on a belt just long enough to
+    hold them, so spawning and exits keep the count steady."""
+    cfg = SimConfig(**config)
+    cfg.exit_x = cfg.spawn_x + n * pitch
+    cfg.sensor_x = cfg.spawn_x + n * pitch / 2
+    cfg.jam_points = (cfg.sensor_x,)
+    cfg.accumulation = (AccumulationZone(cfg.spawn_x, cfg.sensor_x),)
+    sim = ConveyorSim(cfg, seed=0)
+    rng = np.random.default_rng(0)
+    sim.bottles.load(np.arange(n), cfg.exit_x - pitch * (np.arange(n) + 0.5),
+                     rng.uniform(-cfg.spread_z, cfg.spread_z, n))
+    sim.next_id = n
+    return sim
+
+
+def _stepper(sim, ticks=60):
+    def work():
+        for _ in range(ticks):
+            sim.step()
+        return ticks
+    return work
+
+
+def bench_ticks(n):
+    cfg = SimConfig()
+    return lambda: _stepper(loaded(n, cfg.speed["NORMAL"] * cfg.spawn_interval))
+
+
+def bench_jam(n):
+    def setup():
+        cfg = SimConfig()
+        sim = loaded(n, cfg.speed["NORMAL"] * cfg.spawn_interval)
+        sim.set_status("JAM")
+        return _stepper(sim)
+    return setup
+
+
+def bench_churn(n):
+    # A bottle spawns every tick and moves 2 lengths per tick: one in, one out
+    dt = SimConfig.dt
+    return lambda: _stepper(loaded(n, 0.1, spawn_interval=dt, bottle_length=0.05,
+                                   speed={"NORMAL": 0.1 / dt, "WEAR": 0.1 / dt, "JAM": 0.0}))
+
+
+# --- RENDERING ---
+_app = None
+
+
+def _ursina(display=None):
+    """The offscreen Ursina app shared by the render benchmarks (None without a graphics stack)."""
+    global _app
+    if _app is None:
+        try:
+            from panda3d.core import loadPrcFileData
+            loadPrcFileData("", "window-type offscreen\naudio-library-name null")
+            if display:
+                loadPrcFileData("", f"load-display {display}")
+            from ursina import Ursina, camera
+        except ImportError:
+            return None
+        _app = Ursina(window_type="offscreen", development_mode=False)
+        camera.position = (8, 12, -22)  # Same view as the scripts
+        camera.look_at((8, 0, 0))
+    return _app
+
+
+def _grid(n):
+    """n bottles spread over the visible belt."""
+    store = BottleStore(n)
+    rows = max(1, int(np.sqrt(n / 8)))
+    i = np.arange(n)
+    store.load(i, -5.0 + 30.0 * (i // rows) / max(1, n // rows), -1.5 + 3.0 * (i % rows) / rows)
+    return store
+
+
+def bench_batched(n):
+    from .batched import BatchedBottles
+    from ursina import destroy
+    view = [None]
+
+    def setup():
+        if view[0] is not None:
+            destroy(view[0])
+        store, view[0] = _grid(n), BatchedBottles(capacity=n)
+
+        def work():
+            x = store.x
+            x += 0.1
+            x[x > 25.0] -= 30.0
+            view[0].sync(store)
+            _app.step()
+            return 1
+        return work
+    return setup, lambda: destroy(view[0])
+
+
+def bench_entities(n):
+    from ursina import Entity, color, destroy
+    live = []
+
+    def bottle(x, z):
+        entity = Entity(position=(x, 0.5, z))
+        Entity(parent=entity, model="cube", color=color.rgba(0, 200, 255, 220), scale=(0.8, 1.5, 0.8))
+        Entity(parent=entity, model="cube", color=color.white, scale=(0.4, 0.3, 0.4), y=0.9)
+        return entity
+
+    def clear():
+        for entity in live:
+            destroy(entity)
+        live.clear()
+
+    def setup():
+        clear()
+        store = _grid(n)
+        live.extend(bottle(x, z) for x, z in zip(store.x.tolist(), store.z.tolist()))
+
+        def work():
+            for entity in live:
+                entity.x = entity.x + 0.1 if entity.x < 25.0 else entity.x - 30.0
+            destroy(live.pop(0))  # Steady state of sync_bottles: one exits, one spawns
+            live.append(bottle(-5.0, 0.0))
+            _app.step()
+            return 1
+        return work
+    return setup, clear
+
+
+SIM_BENCHMARKS = {"sim.ticks": ("ticks/s", bench_ticks), "sim.jam": ("ticks/s", bench_jam),
+                  "sim.churn": ("bottles/s", bench_churn)}
+RENDER_BENCHMARKS = {"render.batched": ("frames/s", bench_batched),
+                     "render.entities": ("frames/s", bench_entities)}
+
+
+# --- SUITE ---
+def run(sizes=SIZES, only=None, headless=False, display=None, min_time=0.5, repeat=3,
+        max_entities=1000, report=print):
+    """{name[n]: {"value", "unit"}} for the selected benchmarks."""
+    results = {}
+    selected = dict(SIM_BENCHMARKS)
+    if not headless and not (only and not any(n.startswith(p) for p in only for n in RENDER_BENCHMARKS)):
+        if _ursina(display) is None:
+            report("render benchmarks skipped: no graphics stack (pip install ursina)")
+        else:
+            selected.update(RENDER_BENCHMARKS)
+    for name, (unit, bench) in selected.items():
+        if only and not any(name.startswith(prefix) for prefix in only):
+            continue
+        for n in sizes:
+            if name == "render.entities" and n > max_entities:
+                continue
+            key = f"{name}[{n}]"
+            setup, teardown = bench(n), None
+            if isinstance(setup, tuple):  # Render benchmarks also clean up their scene
+                setup, teardown = setup
+            value = measure(setup, min_time, repeat)
+            if teardown:
+                teardown()
+            results[key] = {"value": round(value, 1), "unit": unit}
+            report(f"{key:26s} {value:14,.1f} {unit}")
+    return results
+
+
+def compare(results, baseline, threshold=None):
+    """Lines of the comparison with the baseline and whether any benchmark regressed."""
+    lines, failed = [], False
+    for key, result in results.items():
+        stored = baseline.get("results", {}).get(key)
+        if not stored:
+            lines.append(f"{key:26s} {'new':>8s}")
+            continue
+        limit = threshold if threshold is not None else stored.get("threshold", THRESHOLDS[key.split(".")[0]])
+        ratio = result["value"] / stored["value"]
+        regressed = ratio < 1.0 - limit
+        failed |= regressed
+        lines.append(f"{key:26s} {ratio:8.2f}x  {'FAIL' if regressed else 'ok':4s} "
+                     f"(baseline {stored['value']:,.1f} {stored['unit']}, allowed -{limit:.0%})")
+    return lines, failed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m conveyor_twin.bench",
+                                     description="Benchmark the twin and check for regressions")
+    parser.add_argument("--sizes", default=",".join(map(str, SIZES)), help="bottle counts, comma separated")
+    parser.add_argument("--only", help="benchmark name prefixes, comma separated (e.g. sim.jam,render)")
+    parser.add_argument("--headless", action="store_true", help="skip the render benchmarks")
+    parser.add_argument("--display", help="Panda3D display module, e.g. p3tinydisplay without a GPU")
+    parser.add_argument("--min-time", type=float, default=0.5, help="seconds per timed repeat")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--max-entities", type=int, default=1000,
+                        help="largest bottle count for render.entities (10k entities take minutes)")
+    parser.add_argument("--baseline", type=Path, default=BASELINE)
+    parser.add_argument("--threshold", type=float, help="allowed slowdown for every benchmark, e.g. 0.2")
+    parser.add_argument("--save", action="store_true", help="store the results as the new baseline")
+    args = parser.parse_args(argv)
+
+    results = run(sizes=[int(n) for n in args.sizes.split(",")],
+                  only=args.only and args.only.split(","), headless=args.headless, display=args.display,
+                  min_time=args.min_time, repeat=args.repeat, max_entities=args.max_entities)
+    if args.save:
+        stored = json.loads(args.baseline.read_text()) if args.baseline.exists() else {"results": {}}
+        for key, result in results.items():
+            result["threshold"] = stored["results"].get(key, {}).get("threshold", THRESHOLDS[key.split(".")[0]])
+        stored["results"].update(results)
+        stored["machine"] = " ".join(filter(None, (platform.machine(), platform.processor(),
+                                                     f"Python {platform.python_version()}")))
+        stored["display"] = args.display or "default"
+        args.baseline.write_text(json.dumps(stored, indent=2) + "\n")
+        print(f"baseline saved to {args.baseline}")
+        return
+    if not args.baseline.exists():
+        print(f"no baseline at {args.baseline}, run with --save to create one")
+        return
+    lines, failed = compare(results, json.loads(args.baseline.read_text()), args.threshold)
+    print("\n".join(lines))
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""Structure-of-arrays bottle store.
+
+All bottles of a belt live in contiguous NumPy arrays, ordered front of the
+line first (spawn order), so a tick is a handful of vectorized passes
+instead of one Python callback per bottle.
+"""
+import numpy as np
+
+
+_FIELDS = ("_ids", "_x", "_z", "_v", "_lane")
+_NONE = np.empty(0)
+
+
+class BottleStore:
+    def __init__(self, capacity=64):
+        self.n = 0
+        self._ids = np.empty(capacity, dtype=np.int64)
+        self._x = np.empty(capacity, dtype=np.float64)
+        self._z = np.empty(capacity, dtype=np.float64)
+        self._v = np.zeros(capacity, dtype=np.float64)
+        self._lane = np.zeros(capacity, dtype=np.int8)
+
+    # --- VIEWS (length n, no copy) ---
+    @property
+    def ids(self):
+        return self._ids[:self.n]
+
+    @property
+    def x(self):
+        return self._x[:self.n]
+
+    @property
+    def z(self):
+        return self._z[:self.n]
+
+    @property
+    def v(self):
+        return self._v[:self.n]
+
+    @property
+    def lane(self):
+        return self._lane[:self.n]
+
+    def __len__(self):
+        return self.n
+
+    # --- ALLOCATION ---
+    def _grow(self, capacity):
+        for name in _FIELDS:
+            old = getattr(self, name)
+            new = np.zeros(capacity, dtype=old.dtype)
+            new[:self.n] = old[:self.n]
+            setattr(self, name, new)
+
+    def append(self, bottle_id, x, z, lane=0):
+        if self.n == len(self._x):
+            self._grow(2 * len(self._x))
+        i = self.n
+        self._ids[i] = bottle_id
+        self._x[i] = x
+        self._z[i] = z
+        self._v[i] = 0.0
+        self._lane[i] = lane
+        self.n += 1
+
+    def compact(self, keep):
+        """Drop every bottle whose `keep` flag is False, preserving order."""
+        m = int(np.count_nonzero(keep))
+        if m == self.n:
+            return
+        for name in _FIELDS:
+            arr = getattr(self, name)
+            arr[:m] = arr[:self.n][keep]
+        self.n = m
+
+    def clear(self):
+        self.n = 0
+
+    def load(self, ids, x, z):
+        """Replace the contents with the given bottles (e.g. a replayed frame)."""
+        n = len(ids)
+        if n > len(self._x):
+            self._grow(max(n, 2 * len(self._x)))
+        self._ids[:n] = ids
+        self._x[:n] = x
+        self._z[:n] = z
+        self._v[:n] = 0.0
+        self._lane[:n] = 0
+        self.n = n
+
+    # --- BATCHED PASSES ---
+    def cull(self, exit_x):
+        """Remove bottles past `exit_x`; returns the z of the removed ones."""
+        if self.n == 0 or self._x[0] <= exit_x:
+            return _NONE  # Front bottle is the furthest one
+        keep = self.x <= exit_x
+        gone = self.z[~keep].copy()
+        self.compact(keep)
+        return gone
@@ -0,0 +1,307 @@
+"""IoT gateway: streams the twin out over MQTT/WebSocket and takes commands in.
+
+The gateway runs its own asyncio loop on a background thread. The render
+loop only appends to and pops from deques, so network stalls never cost a
+frame. Samples are sent in batches. When a link can't keep up, the bounded
+sample queue drops the oldest rows rather than growing, and slow WebSocket
+viewers skip batches.
+
+Topics (MQTT) and messages (WebSocket, JSON) under twin/<line>:
+
+    telemetry   out  {"columns": [...], "rows": [[t, ...], ...]}
+    state       out  {"t": ..., "status": "JAM"}            (retained)
+    cmd         in   "NORMAL" | "WEAR" | "JAM"              (WS: {"cmd": ...})
+    sensors     in   {"t", "vibration", "current", "count"} (WS: {"sensors": {...}})
+
+Sensor messages go through a FaultDetector, so real measurements drive the
+twin's state in place of the keyboard.
+
+    python -m conveyor_twin.gateway --mqtt localhost:1883 --ws :8765
+    python -m conveyor_twin.gateway --bench 200000        # against an in-process broker
+"""
+import argparse
+import asyncio
+import json
+import os
+import threading
+import time
+from collections import deque
+
+from . import mqtt, ws
+from .detect import FaultDetector
+from .sim import ConveyorSim, canonical_state
+from .telemetry import SIM_CHANNELS
+
+
+def _address(text, default_port):
+    host, _, port = (text or "").rpartition(":")
+    return host or "127.0.0.1", int(port or default_port)
+
+
+class Gateway:
+    def __init__(self, line="line1", mqtt_address=None, ws_address=None, channels=SIM_CHANNELS,
+                 batch=250, interval=0.05, capacity=100_000, high_water=1 << 20, detector=None):
+        self.topic = f"twin/{line}"
+        self.mqtt_address = mqtt_address and _address(mqtt_address, 1883)
+        self.ws_address = ws_address and _address(ws_address, 8765)
+        self.columns = ("time",) + tuple(channels)
+        self.batch = batch
+        self.interval = interval            # Longest a sample waits for its batch (s)
+        self.high_water = high_water        # Bytes buffered per link before backpressure
+        self.detector = detector or FaultDetector()
+        self.samples = deque(maxlen=capacity)
+        self.states = deque()
+        self.inbox = deque()                # (kind, value) from the network, see poll()
+        self.sent = 0                       # Samples handed to the network
+        self.messages = 0                   # Packets/frames written
+        self.dropped = 0                    # Samples lost to a full queue or a slow viewer
+        self.rejected = 0                   # Malformed incoming messages
+        self.mqtt = None
+        self.viewers = set()
+        self._status = None
+        self._last_state = None             # Last state message, for late joiners
+        self._thread = self._loop = self._stop = None
+
+    @classmethod
+    def from_env(cls, **kwargs):
+        """A started gateway if TWIN_MQTT and/or TWIN_WS (host:port) are set, else None."""
+        mqtt_address, ws_address = os.environ.get("TWIN_MQTT"), os.environ.get("TWIN_WS")
+        if not (mqtt_address or ws_address):
+            return None
+        return cls(mqtt_address=mqtt_address, ws_address=ws_address, **kwargs).start()
+
+    # --- RENDER THREAD SIDE ---
+    def sample(self, sim):
+        """Tick observer for a ConveyorSim."""
+        if sim.status != self._status:
+            self._status = sim.status
+            self.states.append((sim.time, sim.status))
+        self.push((sim.time, sim.vibration, sim.current, sim.speed, sim.bottle_count, sim.bottles.n,
+                   float(sim.laser_on)))
+
+    def push(self, row):
+        """Queue one row (time first, then one value per channel)."""
+        if len(self.samples) == self.samples.maxlen:
+            self.dropped += 1
+        self.samples.append(row)
+
+    def poll(self):
+        """Pop every (kind, value) received since the last call."""
+        inbox = self.inbox
+        return [inbox.popleft() for _ in range(len(inbox))]
+
+    def apply(self, sim):
+        """Apply received commands and sensor readings to `sim`."""
+        for kind, value in self.poll():
+            if kind == "sensors":
+                value = self.detector.update(value["t"], value["vibration"], value["current"], value["count"])
+            if value != sim.status:
+                sim.set_status(value)
+
+    def start(self):
+        ready = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(ready,), name="twin-gateway", daemon=True)
+        self._thread.start()
+        ready.wait()
+        return self
+
+    def stop(self, timeout=2.0):
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._stop.set)
+            self._thread.join(timeout)
+
+    # --- GATEWAY THREAD ---
+    def _run(self, ready):
+        asyncio.run(self._main(ready))
+
+    async def _main(self, ready):
+        self._loop = asyncio.get_running_loop()
+        self._stop = asyncio.Event()
+        server = None
+        if self.ws_address:
+            server = await asyncio.start_server(self._viewer, *self.ws_address)
+            self.ws_address = server.sockets[0].getsockname()[:2]
+        tasks = [asyncio.ensure_future(self._pump())]
+        if self.mqtt_address:
+            tasks.append(asyncio.ensure_future(self._mqtt_link()))
+        ready.set()
+        await self._stop.wait()
+        await self._flush()
+        for task in tasks:
+            task.cancel()
+        if self.mqtt is not None:
+            await self.mqtt.close()
+        for viewer in list(self.viewers):
+            await viewer.close()
+        if server is not None:
+            server.close()
+
+    def _receive(self, kind, payload):
+        try:
+            if kind == "cmd":
+                self.inbox.append(("cmd", canonical_state(payload.strip().upper())))
+            else:
+                value = dict(payload)
+                value = {"t": float(value.get("t", time.monotonic())), "vibration": float(value["vibration"]),
+                         "current": float(value["current"]), "count": int(value["count"])}
+                self.inbox.append(("sensors", value))
+        except (KeyError, TypeError, ValueError):
+            self.rejected += 1
+
+    async def _mqtt_link(self):
+        delay = 0.5
+        while True:
+            client = mqtt.Client(f"twin-{self.topic.replace('/', '-')}")
+            try:
+                await client.connect(*self.mqtt_address)
+                await client.subscribe(f"{self.topic}/cmd", f"{self.topic}/sensors")
+                self.mqtt, delay = client, 0.5
+                if self._last_state is not None:
+                    client.publish(f"{self.topic}/state", json.dumps(self._last_state), retain=True)
+                while (message := await client.messages.get()) is not None:
+                    topic, payload = message
+                    if topic.endswith("/cmd"):
+                        self._receive("cmd", payload.decode(errors="replace"))
+                    else:
+                        try:
+                            self._receive("sensors", json.loads(payload))
+                        except ValueError:
+                            self.rejected += 1
+            except mqtt.LINK_ERRORS:
+                pass  # Refused, dropped mid-handshake or mid-packet: all retried the same way
+            self.mqtt = None
+            try:
+                await client.close()
+            except mqtt.LINK_ERRORS:
+                pass
+            await asyncio.sleep(delay)  # Reconnect with backoff; samples wait in the bounded queue
+            delay = min(delay * 2, 10.0)
+
+    async def _viewer(self, reader, writer):
+        try:
+            _, _, headers = await ws.read_request(reader)
+        except (ConnectionError, ValueError):
+            writer.close()
+            return
+        if not ws.is_upgrade(headers):
+            writer.write(b"HTTP/1.1 426 Upgrade Required\r\nContent-Length: 0\r\n\r\n")
+            writer.close()
+            return
+        viewer = await ws.accept(reader, writer, headers)
+        if self._last_state is not None:
+            viewer.send(json.dumps({"topic": "state", **self._last_state}))
+        self.viewers.add(viewer)
+        try:
+            while (message := await viewer.recv()) is not None:
+                try:
+                    message = json.loads(message)
+                    if "cmd" in message:
+                        self._receive("cmd", str(message["cmd"]))
+                    else:
+                        self._receive("sensors", message["sensors"])
+                except (KeyError, TypeError, ValueError):
+                    self.rejected += 1
+        finally:
+            self.viewers.discard(viewer)
+
+    async def _pump(self):
+        while True:
+            if len(self.samples) < self.batch:
+                await asyncio.sleep(self.interval)
+            await self._flush()
+            await asyncio.sleep(0)  # Let readers and new viewers in between bursts
+
+    async def _flush(self):
+        link = self.mqtt
+        if self.mqtt_address and link is None:
+            return  # Broker unreachable: keep (a bounded amount of) data for when it's back
+        while self.states:
+            t, status = self.states.popleft()
+            self._last_state = {"t": t, "status": status}
+            self._send("state", self._last_state, retain=True)
+        samples = self.samples
+        while samples:
+            rows = [samples.popleft() for _ in range(min(self.batch, len(samples)))]
+            self._send("telemetry", {"columns": self.columns, "rows": rows}, rows=len(rows))
+            self.sent += len(rows)
+            if link is not None and link.buffered() > self.high_water:
+                await link.drain()  # Backpressure: new samples pile up in the bounded queue
+
+    def _send(self, kind, message, retain=False, rows=1):
+        """Publish `message` (a dict) on the `kind` topic and to every viewer, as
+        {"topic": kind, **message}."""
+        if self.mqtt is not None:
+            self.mqtt.publish(f"{self.topic}/{kind}", json.dumps(message), retain)
+            self.messages += 1
+        if self.viewers:
+            frame = json.dumps({"topic": kind, **message})
+            for viewer in self.viewers:
+                if viewer.buffered() > self.high_water:
+                    self.dropped += rows
+                else:
+                    viewer.send(frame)
+                    self.messages += 1
+
+
+# --- CLI ---
+async def _bench(n, batch):
+    broker = await mqtt.Broker(high_water=1 << 26).start(port=0)
+    sub = await mqtt.Client("bench-sub").connect("127.0.0.1", broker.port)
+    await sub.subscribe("twin/+/telemetry")
+    gateway = Gateway(mqtt_address=f"127.0.0.1:{broker.port}", batch=batch, capacity=n).start()
+    while gateway.mqtt is None:
+        await asyncio.sleep(0.01)
+
+    row = (0.0,) * len(gateway.columns)
+    started = time.perf_counter()
+    for i in range(n):
+        gateway.push(row)
+        if i % 1000 == 0:
+            await asyncio.sleep(0)
+    received = 0
+    while received < n:
+        _, payload = await asyncio.wait_for(sub.messages.get(), 10)
+        received += len(json.loads(payload)["rows"])
+    elapsed = time.perf_counter() - started
+    gateway.stop()
+    await sub.close()
+    await broker.close()
+    print(f"{n:,} samples in {gateway.messages:,} MQTT messages, end to end through the broker: "
+          f"{n / elapsed:,.0f} samples/s, {gateway.messages / elapsed:,.0f} messages/s "
+          f"(gateway, broker and subscriber sharing one core)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m conveyor_twin.gateway",
+                                     description="Stream a headless twin over MQTT/WebSocket")
+    parser.add_argument("--mqtt", help="broker host:port")
+    parser.add_argument("--ws", help="WebSocket listen host:port")
+    parser.add_argument("--line", default="line1")
+    parser.add_argument("--batch", type=int, default=250, help="samples per message")
+    parser.add_argument("--bench", type=int, default=0, help="push N samples through an in-process broker")
+    args = parser.parse_args(argv)
+
+    if args.bench:
+        asyncio.run(_bench(args.bench, args.batch))
+        return
+    if not (args.mqtt or args.ws):
+        parser.error("give --mqtt and/or --ws (or --bench)")
+    sim = ConveyorSim()
+    gateway = Gateway(args.line, args.mqtt, args.ws, batch=args.batch).start()
+    sim.observers.append(gateway.sample)
+    print(f"streaming {gateway.topic} (Ctrl+C to stop)")
+    last = time.perf_counter()
+    try:
+        while True:
+            time.sleep(sim.config.dt)
+            now = time.perf_counter()
+            sim.advance(now - last)
+            last = now
+            gateway.apply(sim)
+    except KeyboardInterrupt:
+        gateway.stop()
+        print(f"sent {gateway.sent} samples in {gateway.messages} messages, dropped {gateway.dropped}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Bound-value dashboard model: widgets are re-rendered only when they change.
+
+Ursina's Text rebuilds its glyph mesh on every assignment to .text (and its
+colour on .color), whether or not the value differs. A Field binds a widget
+to a value, formats it, and touches the widget only when the formatted
+output differs from what is on screen. Numbers can also be rate-limited
+(e.g. 10 Hz); status fields are left unthrottled, so they are effectively
+event-driven: they cost a comparison per frame and a render per change.
+
+Nothing here imports Ursina; any object with the bound attributes works.
+"""
+import time
+
+
+class Field:
+    def __init__(self, widget, source=None, render=str, hz=None, attrs=("text",)):
+        self.widget = widget
+        self.source = source        # Callable returning the value, or None to push it with set()
+        self.render = render        # value -> attribute value, or tuple matching attrs
+        self.attrs = attrs
+        self.period = 1.0 / hz if hz else 0.0
+        self.renders = 0
+        self._shown = None
+        self._due = 0.0
+
+    def refresh(self, now):
+        if now < self._due:
+            return False
+        self._due = now + self.period
+        return self.set(self.source())
+
+    def set(self, value):
+        """Render `value` if its output differs from what is on screen."""
+        out = self.render(value)
+        if out == self._shown:
+            return False
+        self._shown = out
+        if len(self.attrs) == 1:
+            setattr(self.widget, self.attrs[0], out)
+        else:
+            for attr, v in zip(self.attrs, out):
+                setattr(self.widget, attr, v)
+        self.renders += 1
+        return True
+
+
+class Panel:
+    """The bound fields of one dashboard, refreshed together once per frame."""
+
+    def __init__(self, clock=time.perf_counter):
+        self.clock = clock
+        self.fields = []
+        self.refreshes = 0
+
+    def bind(self, widget, source=None, render=str, hz=None, attrs=("text",)):
+        field = Field(widget, source, render, hz, attrs)
+        self.fields.append(field)
+        return field
+
+    def refresh(self):
+        now = self.clock()
+        self.refreshes += 1
+        for field in self.fields:
+            if field.source is not None:
+                field.refresh(now)
+
+    def renders(self):
+        """Widget updates actually applied, against one per field per frame without binding."""
+        return sum(f.renders for f in self.fields), self.refreshes * len(self.fields)
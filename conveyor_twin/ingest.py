@@ -0,0 +1,218 @@
+"""Drive the twin from historical plant logs (CSV or Parquet).
+
+Logs are streamed in chunks: a CSV is memory-mapped and parsed one block of
+lines at a time, and a Parquet file is read one record batch at a time. Only
+the current chunk is ever in memory, so months of 1 Hz to 100 Hz data replay
+on a laptop. A HistoryFeed plays the rows at real time or faster, pushes
+them through a FaultDetector, and writes the measured values and the
+inferred state into a ConveyorSim for the views.
+
+Columns are found by name: time (epoch seconds or ISO 8601), vibration,
+current and the optical counter; see --help for overrides.
+
+    python -m conveyor_twin.ingest --synth 2000000 plant.csv   # make a test log
+    python -m conveyor_twin.ingest plant.csv                    # detector over the whole log
+"""
+import argparse
+import io
+import mmap
+import time
+
+import numpy as np
+
+from .detect import FaultDetector
+from .sim import ConveyorSim
+
+# Column of the log used for each signal, first match wins
+ALIASES = {
+    "time": ("time", "timestamp", "ts", "datetime"),
+    "vibration": ("vibration", "vib", "vibration_mm_s"),
+    "current": ("current", "amps", "motor_current"),
+    "count": ("count", "bottle_count", "counter"),
+}
+
+
+def resolve_columns(names, overrides=None):
+    """{signal: column name} for a log with the given header."""
+    columns = {}
+    for signal, aliases in ALIASES.items():
+        wanted = (overrides or {}).get(signal)
+        found = [wanted] if wanted else [a for a in aliases if a in names]
+        if not found or found[0] not in names:
+            raise ValueError(f"no column for {signal!r} (tried {wanted or ', '.join(aliases)}; have {', '.join(names)})")
+        columns[signal] = found[0]
+    return columns
+
+
+# --- READERS ---
+def _parse_time(values):
+    try:
+        return values.astype(np.float64)
+    except ValueError:
+        return values.astype("datetime64[ms]").astype(np.int64) / 1000.0
+
+
+def csv_chunks(path, overrides=None, block_size=1 << 24):
+    """Yield {signal: array} for each block of about `block_size` bytes of a CSV."""
+    with open(path, "rb") as fh, mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        pos = mm.find(b"\n") + 1
+        names = [n.strip().strip('"') for n in mm[:pos].decode().strip().split(",")]
+        columns = resolve_columns(names, overrides)
+        numeric = [names.index(columns[s]) for s in ("vibration", "current", "count")]
+        time_col = names.index(columns["time"])
+        while pos < len(mm):
+            end = min(pos + block_size, len(mm))
+            if end < len(mm):
+                cut = mm.rfind(b"\n", pos, end)
+                end = cut + 1 if cut >= 0 else (mm.find(b"\n", end) + 1 or len(mm))
+            block = mm[pos:end]  # Copies this block only
+            pos = end
+            if not block.strip():
+                continue
+            values = np.loadtxt(io.BytesIO(block), delimiter=",", usecols=numeric, ndmin=2)
+            stamps = np.loadtxt(io.BytesIO(block), delimiter=",", usecols=(time_col,), dtype="U40", ndmin=1)
+            yield {"time": _parse_time(np.char.strip(stamps, '"')), "vibration": values[:, 0],
+                   "current": values[:, 1], "count": values[:, 2]}
+
+
+def parquet_chunks(path, overrides=None, batch_rows=1 << 16):
+    """Yield {signal: array} for each record batch of a Parquet file."""
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise SystemExit("Parquet input needs pyarrow (pip install pyarrow), or use a .csv log")
+    log = pq.ParquetFile(path, memory_map=True)
+    columns = resolve_columns(log.schema_arrow.names, overrides)
+    for batch in log.iter_batches(batch_size=batch_rows, columns=list(columns.values())):
+        chunk = {s: batch.column(c).to_numpy(zero_copy_only=False) for s, c in columns.items()}
+        t = chunk["time"]
+        chunk["time"] = t.astype("datetime64[ms]").astype(np.int64) / 1000.0 if t.dtype.kind == "M" else _parse_time(t)
+        yield chunk
+
+
+def open_log(path, overrides=None):
+    reader = parquet_chunks if str(path).endswith(".parquet") else csv_chunks
+    return reader(path, overrides)
+
+
+# --- PLAYBACK ---
+class HistoryFeed:
+    def __init__(self, chunks, speed=1.0, detector=None):
+        self.chunks = iter(chunks)
+        self.speed = speed              # Log seconds per wall-clock second
+        self.detector = detector or FaultDetector()
+        self.position = 0.0             # Log seconds played
+        self.rows = 0
+        self.done = False
+        self.latest = None              # (t, vibration, current, count) of the last row played
+        self.start = None
+        self._chunk = None
+        self._i = 0
+
+    def _next_chunk(self):
+        for chunk in self.chunks:
+            if len(chunk["time"]):
+                self._chunk, self._i = chunk, 0
+                if self.start is None:
+                    self.start = float(chunk["time"][0])
+                return True
+        self.done = True
+        return False
+
+    def advance(self, elapsed=None):
+        """Play the rows up to `elapsed * speed` log seconds further (all of them if
+        elapsed is None); returns how many rows were played."""
+        if self.start is None and not self._next_chunk():
+            return 0
+        self.position = np.inf if elapsed is None else self.position + elapsed * self.speed
+        played = 0
+        while not self.done:
+            chunk = self._chunk
+            if self._i >= len(chunk["time"]):
+                if not self._next_chunk():
+                    break
+                continue
+            t = chunk["time"]
+            j = int(np.searchsorted(t, self.start + self.position, side="right"))
+            if j > self._i:
+                update = self.detector.update
+                rows = zip(t[self._i:j].tolist(), chunk["vibration"][self._i:j].tolist(),
+                           chunk["current"][self._i:j].tolist(), chunk["count"][self._i:j].tolist())
+                for row in rows:
+                    update(*row)
+                self.latest = row
+                played += j - self._i
+                self._i = j
+            if j < len(t):
+                break
+        self.rows += played
+        return played
+
+    def apply(self, sim):
+        """Show the latest measured values in `sim` and follow the inferred state.
+        The sim is marked driven, so its own signals don't overwrite them."""
+        if self.latest is None:
+            return
+        sim.driven = True
+        _, sim.vibration, sim.current, count = self.latest
+        sim.bottle_count = int(count)
+        state = self.detector.state
+        if state != sim.status:
+            sim.set_status(state)
+
+
+# --- CLI ---
+def synthesize(path, rows, hz=10.0, seed=0):
+    """Write a plant-like CSV log (ISO timestamps) simulated with ConveyorSim."""
+    sim = ConveyorSim(seed=seed)
+    horizon = rows / hz
+    for t in np.arange(600.0, horizon, 3600.0):
+        sim.schedule(t, "WEAR")
+        sim.schedule(t + 300, "NORMAL")
+        sim.schedule(t + 1800, "JAM")
+        sim.schedule(t + 1860, "NORMAL")
+    epoch = np.datetime64("2025-01-01T00:00:00", "ms")
+    step = round(1 / (hz * sim.config.dt))
+    with open(path, "w", newline="") as fh:
+        fh.write("timestamp,vibration,current,counter\n")
+        lines = []
+        for i in range(rows):
+            sim.run(step * sim.config.dt)
+            stamp = str(epoch + np.timedelta64(int(sim.time * 1000), "ms")).replace("T", " ")
+            lines.append(f"{stamp},{sim.vibration:.4f},{sim.current:.4f},{sim.bottle_count}\n")
+            if len(lines) == 10000:
+                fh.writelines(lines)
+                lines.clear()
+        fh.writelines(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m conveyor_twin.ingest",
+                                     description="Run the fault detector over a historical plant log")
+    parser.add_argument("path", help=".csv or .parquet log")
+    parser.add_argument("--synth", type=int, metavar="ROWS", help="first write a synthetic 10 Hz CSV log")
+    for signal in ALIASES:
+        parser.add_argument(f"--{signal}", help=f"column holding {signal}")
+    args = parser.parse_args(argv)
+
+    if args.synth:
+        started = time.perf_counter()
+        synthesize(args.path, args.synth)
+        print(f"wrote {args.synth} rows in {time.perf_counter() - started:.1f} s")
+    overrides = {s: getattr(args, s) for s in ALIASES if getattr(args, s)}
+    feed = HistoryFeed(open_log(args.path, overrides))
+    state = feed.detector.state
+    started = time.perf_counter()
+    while not feed.done:
+        feed.advance(60.0)  # One log minute at a time, as fast as possible
+        if feed.detector.state != state:
+            state = feed.detector.state
+            print(f"{feed.detector.since - feed.start:10.1f} s  {state}")
+    elapsed = time.perf_counter() - started
+    span = (feed.latest[0] - feed.start) if feed.latest else 0.0
+    print(f"{feed.rows:,} rows ({span / 86400:.1f} days of data) in {elapsed:.1f} s: "
+          f"{feed.rows / max(elapsed, 1e-9):,.0f} rows/s, {span / max(elapsed, 1e-9):,.0f}x real time")
+
+
+if __name__ == "__main__":
+    main()
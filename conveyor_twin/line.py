@@ -0,0 +1,231 @@
+"""Declarative line descriptions.
+
+A line (belt geometry, spawning, speeds, jam points, accumulation tables,
+sensors and the signal profile of each state) is described in a TOML file,
+or YAML if PyYAML is installed, and loaded into a validated LineModel. The
+model turns it into the SimConfig the engine runs, and looks up sensor zones
+with the engine's own SensorArray, so finding the sensor in front of any
+number of bottles is one binary search each.
+
+Presets for the demo views live in conveyor_twin/lines/ and are loaded by
+name; a new layout is just a new file. State names may be the French ones
+(USURE, BOURRAGE). Omitted keys keep the SimConfig defaults.
+
+    line = load_line("v2")                      # preset name, or a path
+    sim = line.sim()
+    busy = line.occupied(sim.bottles.x)         # one flag per sensor
+    sim.step()
+    sim.events                                  # this tick's sensor crossings (see sensors.py)
+
+    python -m conveyor_twin.line                # list the presets
+    python -m conveyor_twin.line my_line.toml   # validate and summarize
+"""
+import argparse
+import tomllib
+from dataclasses import fields
+from pathlib import Path
+
+import numpy as np
+
+from .lanes import AccumulationZone, SegmentTable
+from .sensors import Sensor, SensorArray
+from .sim import STATES, ConveyorSim, SimConfig, canonical_state
+
+PRESETS = Path(__file__).with_name("lines")
+
+# Allowed keys of each table and the SimConfig field they set
+_BELT = {"spawn_x": "spawn_x", "exit_x": "exit_x", "bottle_length": "bottle_length",
+         "lanes": "lanes", "spread_z": "spread_z"}
+_SPAWN = {"interval": "spawn_interval", "jitter": "spawn_jitter"}
+_TABLES = {"name", "description", "belt", "spawn", "speed", "jam", "sensors", "signals"}
+
+
+class LineModel:
+    def __init__(self, name, config, sensors, description=""):
+        self.name = name
+        self.description = description
+        self.config = config
+        self.sensors = tuple(sorted(sensors, key=lambda s: s.x))
+        self.index = {s.name: i for i, s in enumerate(self.sensors)}
+        self.zones = SensorArray(self.sensors)  # Same zones the engine counts with
+        self.segments = SegmentTable(config.jam_points, config.accumulation, config.speed["JAM"])
+
+    def sim(self, seed=None):
+        return ConveyorSim(self.config, seed=seed)
+
+    def sensor(self, name):
+        return self.sensors[self.index[name]]
+
+    @property
+    def counter(self):
+        """The sensor the engine counts bottles and drives the laser with."""
+        return next(s for s in self.sensors if s.counter)
+
+    # --- LOOKUPS ---
+    @property
+    def edges(self):
+        """Sensor i covers [edges[2i], edges[2i+1])."""
+        return self.zones.edges
+
+    def zone_of(self, x):
+        """Index of the sensor whose zone holds each x, or -1."""
+        return self.zones.zone_of(x)
+
+    def occupied(self, x):
+        """For each sensor, whether any of the bottles at `x` is in its zone."""
+        zone = self.zones.zone_of(x)
+        return np.bincount(zone[zone >= 0], minlength=len(self.sensors)) > 0
+
+    def __repr__(self):
+        cfg = self.config
+        sensors = ", ".join(f"{s.name}@{s.x:g}" for s in self.sensors)
+        return (f"LineModel({self.name!r}: belt {cfg.spawn_x:g}..{cfg.exit_x:g} m, {cfg.lanes} lane(s), "
+                f"spawn every {cfg.spawn_interval:g} s, jam points {list(cfg.jam_points)}, sensors {sensors})")
+
+
+# --- LOADING ---
+def _read(path):
+    if path.suffix in (".yaml", ".yml"):
+        try:
+            import yaml
+        except ImportError:
+            raise SystemExit("YAML line files need PyYAML (pip install pyyaml), or use .toml")
+        return yaml.safe_load(path.read_text(encoding="utf-8")) or {}
+    with open(path, "rb") as fh:
+        return tomllib.load(fh)
+
+
+def _table(data, key, allowed, where):
+    table = data.get(key, {})
+    if not isinstance(table, dict):
+        raise ValueError(f"{where}: [{key}] must be a table")
+    unknown = set(table) - set(allowed)
+    if unknown:
+        raise ValueError(f"{where}: unknown key(s) in [{key}]: {', '.join(sorted(unknown))}")
+    return table
+
+
+def _per_state(table, where, default):
+    """{canonical state: value}, starting from `default`."""
+    values = dict(default)
+    for state, value in table.items():
+        try:
+            values[canonical_state(state.upper())] = value
+        except ValueError as error:
+            raise ValueError(f"{where}: {error}") from None
+    missing = [s for s in STATES if s not in values]
+    if missing:
+        raise ValueError(f"{where}: no value for {', '.join(missing)}")
+    return values
+
+
+def parse_line(data, where="line"):
+    """LineModel from an already parsed description; raises ValueError if invalid."""
+    unknown = set(data) - _TABLES
+    if unknown:
+        raise ValueError(f"{where}: unknown table(s) {', '.join(sorted(unknown))}")
+    defaults = SimConfig()
+    cfg = {}
+    for key, field in _BELT.items():
+        cfg[field] = _table(data, "belt", _BELT, where).get(key, getattr(defaults, field))
+    for key, field in _SPAWN.items():
+        cfg[field] = _table(data, "spawn", _SPAWN, where).get(key, getattr(defaults, field))
+    cfg["speed"] = {s: float(v) for s, v in _per_state(data.get("speed", {}), f"{where} [speed]",
+                                                          defaults.speed).items()}
+    jam = _table(data, "jam", ("points", "accumulation"), where)
+    cfg["jam_points"] = tuple(sorted(float(p) for p in jam.get("points", defaults.jam_points)))
+    zones = []
+    for zone in jam.get("accumulation", ()):
+        zone = dict(zone)
+        zones.append(AccumulationZone(float(zone.pop("start")), float(zone.pop("end")),
+                                      float(zone.pop("speed", cfg["speed"]["NORMAL"]))))
+        if zone:
+            raise ValueError(f"{where}: unknown key(s) in [[jam.accumulation]]: {', '.join(zone)}")
+    cfg["accumulation"] = tuple(sorted(zones, key=lambda z: z.start))
+    signals = _table(data, "signals", ("smoothing", "vibration", "current"), where)
+    cfg["smoothing"] = float(signals.get("smoothing", defaults.smoothing))
+    for signal in ("vibration", "current"):
+        values = _per_state(signals.get(signal, {}), f"{where} [signals.{signal}]", getattr(defaults, signal))
+        cfg[signal] = {s: (float(v[0]), float(v[1])) for s, v in values.items()}
+
+    sensors = []
+    for entry in data.get("sensors", ()):
+        entry = dict(entry)
+        try:
+            sensor = Sensor(str(entry.pop("name")), float(entry.pop("x")), float(entry.pop("window", 0.1)),
+                            bool(entry.pop("counter", False)))
+        except KeyError as missing:
+            raise ValueError(f"{where}: [[sensors]] entry without {missing}") from None
+        if entry:
+            raise ValueError(f"{where}: unknown key(s) in sensor {sensor.name!r}: {', '.join(entry)}")
+        sensors.append(sensor)
+    if not sensors:
+        sensors.append(Sensor("optical", defaults.sensor_x, defaults.sensor_window, True))
+    counters = [s for s in sensors if s.counter] or sensors[:1]
+    if len(counters) > 1:
+        raise ValueError(f"{where}: more than one counter sensor ({', '.join(s.name for s in counters)})")
+    cfg["sensor_x"], cfg["sensor_window"] = counters[0].x, counters[0].window
+    sensors = [Sensor(s.name, s.x, s.window, s is counters[0]) for s in sensors]
+    cfg["sensors"] = tuple(sorted(sensors, key=lambda s: s.x))
+
+    config = SimConfig(**{f.name: cfg.get(f.name, getattr(defaults, f.name)) for f in fields(SimConfig)})
+    _validate(config, sensors, where)
+    return LineModel(str(data.get("name", where)), config, sensors, str(data.get("description", "")))
+
+
+def _validate(cfg, sensors, where):
+    def check(ok, message):
+        if not ok:
+            raise ValueError(f"{where}: {message}")
+
+    check(cfg.exit_x > cfg.spawn_x, f"belt.exit_x ({cfg.exit_x}) must be past belt.spawn_x ({cfg.spawn_x})")
+    check(cfg.bottle_length > 0, "belt.bottle_length must be positive")
+    check(isinstance(cfg.lanes, int) and cfg.lanes >= 1, "belt.lanes must be a whole number >= 1")
+    check(cfg.spread_z >= 0, "belt.spread_z must not be negative")
+    check(cfg.spawn_interval > 0 and cfg.spawn_jitter >= 0, "spawn.interval must be positive, spawn.jitter >= 0")
+    check(all(v >= 0 for v in cfg.speed.values()), "speeds must not be negative")
+    check(cfg.smoothing > 0, "signals.smoothing must be positive")
+    for p in cfg.jam_points:
+        check(cfg.spawn_x <= p <= cfg.exit_x, f"jam point {p} is off the belt")
+    for zone in cfg.accumulation:
+        check(cfg.spawn_x <= zone.start < zone.end <= cfg.exit_x, f"accumulation zone {zone} is off the belt or empty")
+    for a, b in zip(cfg.accumulation, cfg.accumulation[1:]):
+        check(b.start >= a.end, f"accumulation zones {a} and {b} overlap")
+    names = [s.name for s in sensors]
+    check(len(set(names)) == len(names), "sensor names must be unique")
+    ordered = sorted(sensors, key=lambda s: s.x)
+    for s in ordered:
+        check(s.window > 0, f"sensor {s.name!r} needs a positive window")
+        check(cfg.spawn_x < s.x < cfg.exit_x, f"sensor {s.name!r} at {s.x} is off the belt")
+    for a, b in zip(ordered, ordered[1:]):
+        check(b.lo >= a.hi, f"sensors {a.name!r} and {b.name!r} overlap")
+
+
+def load_line(source):
+    """LineModel from a preset name (see PRESETS) or a .toml/.yaml path."""
+    path = Path(source)
+    if not path.suffix:
+        path = PRESETS / f"{source}.toml"
+        if not path.exists():
+            known = ", ".join(sorted(p.stem for p in PRESETS.glob("*.toml")))
+            raise ValueError(f"no line preset {source!r} (presets: {known})")
+    return parse_line(_read(path), where=path.name)
+
+
+# --- CLI ---
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m conveyor_twin.line",
+                                     description="Validate and summarize line descriptions")
+    parser.add_argument("lines", nargs="*", help="preset names or .toml/.yaml files (default: every preset)")
+    args = parser.parse_args(argv)
+
+    for source in args.lines or sorted(p.stem for p in PRESETS.glob("*.toml")):
+        try:
+            line = load_line(source)
+        except (ValueError, tomllib.TOMLDecodeError) as error:
+            raise SystemExit(f"{source}: {error}")
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,238 @@
+"""Minimal MQTT 3.1.1 over asyncio: a QoS 0 client and a small broker.
+
+Just enough of the protocol for the twin's gateway (CONNECT, PUBLISH with
+retain, SUBSCRIBE with + and # wildcards, PING, DISCONNECT), with no
+dependency beyond the standard library. The client talks to any broker
+(e.g. a local Mosquitto); the broker lets the gateway be exercised without
+one:
+
+    python -m conveyor_twin.mqtt --port 1883
+"""
+import argparse
+import asyncio
+import itertools
+import struct
+
+CONNECT, CONNACK, PUBLISH, SUBSCRIBE, SUBACK = 0x10, 0x20, 0x30, 0x80, 0x90
+PINGREQ, PINGRESP, DISCONNECT = 0xC0, 0xD0, 0xE0
+
+_U16 = struct.Struct("!H")
+# What a dropped connection (IncompleteReadError is an EOFError) or a garbled
+# packet can raise while talking to a broker
+LINK_ERRORS = (OSError, asyncio.IncompleteReadError, EOFError, ValueError, struct.error)
+
+
+# --- PACKET CODEC ---
+def _varint(n):
+    out = bytearray()
+    while True:
+        n, digit = divmod(n, 128)
+        out.append(digit | (0x80 if n else 0))
+        if not n:
+            return bytes(out)
+
+
+def _string(text):
+    data = text.encode() if isinstance(text, str) else text
+    return _U16.pack(len(data)) + data
+
+
+def packet(kind, body=b""):
+    return bytes((kind,)) + _varint(len(body)) + body
+
+
+def publish_packet(topic, payload, retain=False):
+    if isinstance(payload, str):
+        payload = payload.encode()
+    return packet(PUBLISH | retain, _string(topic) + payload)
+
+
+async def read_packet(reader):
+    """(first byte, body) of the next packet; raises IncompleteReadError on EOF."""
+    first = (await reader.readexactly(1))[0]
+    size = shift = 0
+    while True:
+        digit = (await reader.readexactly(1))[0]
+        size += (digit & 0x7F) << shift
+        shift += 7
+        if not digit & 0x80:
+            break
+    return first, await reader.readexactly(size) if size else b""
+
+
+def parse_publish(first, body):
+    """(topic, payload, retain) of a QoS 0 PUBLISH body."""
+    n = _U16.unpack_from(body)[0]
+    offset = 2 + n
+    if first & 0x06:
+        offset += 2  # Packet id of QoS 1/2 messages, which we treat as QoS 0
+    return body[2:2 + n].decode(), body[offset:], bool(first & 0x01)
+
+
+def topic_matches(pattern, topic):
+    parts = topic.split("/")
+    for i, p in enumerate(pattern.split("/")):
+        if p == "#":
+            return True
+        if i >= len(parts) or (p != "+" and p != parts[i]):
+            return False
+    return len(pattern.split("/")) == len(parts)
+
+
+# --- CLIENT ---
+class Client:
+    def __init__(self, client_id="conveyor-twin", keepalive=60):
+        self.client_id = client_id
+        self.keepalive = keepalive
+        self.messages = asyncio.Queue()   # (topic, payload bytes) of subscribed topics, None once closed
+        self._reader = self._writer = self._task = self._ping = None
+        self._ids = itertools.count(1)
+
+    async def connect(self, host="localhost", port=1883):
+        self._reader, self._writer = await asyncio.open_connection(host, port)
+        body = _string("MQTT") + bytes((4, 0x02)) + _U16.pack(self.keepalive) + _string(self.client_id)
+        self._writer.write(packet(CONNECT, body))
+        first, ack = await read_packet(self._reader)
+        if first != CONNACK or len(ack) < 2 or ack[1] != 0:
+            raise ConnectionError(f"broker refused the connection (code {ack[1] if len(ack) > 1 else '?'})")
+        self._task = asyncio.ensure_future(self._read_loop())
+        self._ping = asyncio.ensure_future(self._ping_loop())
+        return self
+
+    def publish(self, topic, payload, retain=False):
+        """Queue a QoS 0 message; never waits. Call drain() to apply backpressure."""
+        self._writer.write(publish_packet(topic, payload, retain))
+
+    def buffered(self):
+        """Bytes written but not yet accepted by the socket."""
+        return self._writer.transport.get_write_buffer_size()
+
+    async def drain(self):
+        await self._writer.drain()
+
+    async def subscribe(self, *topics):
+        body = _U16.pack(next(self._ids) & 0xFFFF) + b"".join(_string(t) + b"\x00" for t in topics)
+        self._writer.write(packet(SUBSCRIBE | 0x02, body))
+        await self._writer.drain()
+
+    async def close(self):
+        for task in (self._ping, self._task):
+            if task is not None:
+                task.cancel()
+        if self._writer is not None:
+            try:
+                self._writer.write(packet(DISCONNECT))
+                self._writer.close()
+                await self._writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    @property
+    def connected(self):
+        return self._task is not None and not self._task.done()
+
+    async def _read_loop(self):
+        try:
+            while True:
+                first, body = await read_packet(self._reader)
+                if first & 0xF0 == PUBLISH:
+                    topic, payload, _ = parse_publish(first, body)
+                    self.messages.put_nowait((topic, payload))
+        except LINK_ERRORS:
+            pass
+        self.messages.put_nowait(None)
+
+    async def _ping_loop(self):
+        while True:
+            await asyncio.sleep(self.keepalive / 2)
+            self._writer.write(packet(PINGREQ))
+
+
+# --- BROKER ---
+class Broker:
+    """In-process broker for tests and demos; slow subscribers lose messages."""
+
+    def __init__(self, high_water=1 << 20):
+        self.high_water = high_water
+        self.subscriptions = {}             # writer -> list of topic filters
+        self.retained = {}                  # topic -> packet
+        self.dropped = 0
+        self.server = None
+
+    async def start(self, host="127.0.0.1", port=1883):
+        self.server = await asyncio.start_server(self._client, host, port)
+        return self
+
+    @property
+    def port(self):
+        return self.server.sockets[0].getsockname()[1]
+
+    async def close(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+    def route(self, topic, data):
+        for writer, filters in self.subscriptions.items():
+            if any(topic_matches(f, topic) for f in filters):
+                if writer.transport.get_write_buffer_size() > self.high_water:
+                    self.dropped += 1
+                else:
+                    writer.write(data)
+
+    async def _client(self, reader, writer):
+        try:
+            first, _ = await read_packet(reader)
+            if first != CONNECT:
+                return
+            writer.write(packet(CONNACK, b"\x00\x00"))
+            self.subscriptions[writer] = []
+            while True:
+                first, body = await read_packet(reader)
+                kind = first & 0xF0
+                if kind == PUBLISH:
+                    topic, payload, retain = parse_publish(first, body)
+                    data = publish_packet(topic, payload)
+                    if retain:
+                        self.retained[topic] = data
+                    self.route(topic, data)
+                elif kind == SUBSCRIBE:
+                    filters, offset = [], 2
+                    while offset < len(body):
+                        n = _U16.unpack_from(body, offset)[0]
+                        filters.append(body[offset + 2:offset + 2 + n].decode())
+                        offset += 3 + n
+                    self.subscriptions[writer] += filters
+                    writer.write(packet(SUBACK, body[:2] + b"\x00" * len(filters)))
+                    for topic, data in self.retained.items():
+                        if any(topic_matches(f, topic) for f in filters):
+                            writer.write(data)
+                elif kind == PINGREQ:
+                    writer.write(packet(PINGRESP))
+                elif kind == DISCONNECT:
+                    return
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self.subscriptions.pop(writer, None)
+            writer.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m conveyor_twin.mqtt", description="Minimal MQTT broker")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=1883)
+    args = parser.parse_args(argv)
+
+    async def serve():
+        broker = await Broker().start(args.host, args.port)
+        print(f"MQTT broker listening on {args.host}:{broker.port}")
+        await broker.server.serve_forever()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,428 @@
+"""What-if optimizer for belt speed, spawn spacing and buffer length.
+
+Searches a line's operating point for the most bottles per hour that still
+meets a jam-risk and a bearing-wear limit, on the headless sim:
+
+    infeed --> buffer belt --> line (a preset, with its jam point) --> out
+
+The buffer belt feeds the line through a plant Route, so while the line is
+jammed the buffer keeps taking bottles, then drains into the line as fast
+as the line can accept them. Both belts run at the candidate speed.
+
+Jams are random: each bottle crossing the jam point may jam the line, with
+a probability that grows with the belt speed and with how closely it
+follows the previous bottle (JamModel), so a buffer draining at full
+density is a risk of its own. A jam stops the line for an exponential
+repair time. The jam risk of a candidate is the chance of at least one jam
+per running hour, from the summed per-bottle probabilities (smoother than
+counting the jams that happened). Wear is the bearing life of the line's
+drive (maintenance.WearModel), its motor current rising with the speed and
+the bottles on the belt (DriveModel).
+
+The search samples a Latin hypercube over the bounds, then runs rounds of
+perturbations around the current Pareto front, shrinking each round.
+Candidates are snapped to a grid. Each (candidate, replica) run is one
+job on a process pool, and replica i has the same seed for every
+candidate (common random numbers), so differences between candidates are
+not seed noise. Runs are cached by everything that determines them, in
+memory and optionally in a JSON-lines file, so a repeated or widened
+search only simulates the new points.
+
+The report is the Pareto front over throughput (max), jam risk (min) and
+bearing life (max), plus the best point meeting both limits.
+
+The default search is sized to take minutes, not hours: 73 candidates of 4
+replicas, each 20 simulated minutes after a 2 minute warmup, about 300 runs.
+Raise --horizon, --replicas or --rounds for a finer answer. With --cache, a
+second search only simulates the points the first one didn't.
+
+    python -m conveyor_twin.optimize --max-jam 0.3 --min-life 4000 --workers 16 --cache opt.jsonl
+    python -m conveyor_twin.optimize --speed 4:8 --spacing 0.8:1.6 --buffer 0:40 --out front.csv
+"""
+import argparse
+import hashlib
+import json
+import math
+import os
+import random
+import sys
+import time
+from dataclasses import dataclass, replace
+from multiprocessing import Pool
+
+import numpy as np
+
+from .batch import write_csv
+from .maintenance import WearModel
+from .plant import Plant
+from .sensors import Sensor
+from .sim import SimConfig
+
+# Search space: (low, high, grid step) of each decision variable
+PARAMS = ("speed", "spacing", "buffer")
+BOUNDS = {"speed": (3.0, 9.0, 0.1),         # Belt speed (m/s)
+          "spacing": (0.6, 2.0, 0.05),      # Spawn interval (s)
+          "buffer": (0.0, 40.0, 1.0)}       # Buffer belt length (m), 0 for none
+
+
+@dataclass(frozen=True)
+class JamModel:
+    rate: float = 0.25              # Jams per running hour at the reference point
+    speed_ref: float = 6.0          # Reference belt speed (m/s)
+    headway_ref: float = 1.2        # Reference time between two bottles at the jam point (s)
+    speed_exponent: float = 3.0     # Jam risk ~ speed^k
+    headway_scale: float = 0.3      # Jam risk e-folds for each this much less headway (s)
+    repair: float = 300.0           # Mean time to clear a jam (s)
+
+    def probability(self, headway, speed):
+        """Chance that a bottle jams the line, `headway` seconds behind the previous one."""
+        per_bottle = self.rate * self.headway_ref / 3600.0
+        risk = (per_bottle * (speed / self.speed_ref) ** self.speed_exponent
+                * math.exp(min((self.headway_ref - headway) / self.headway_scale, 50.0)))
+        return min(risk, 1.0)
+
+
+@dataclass(frozen=True)
+class DriveModel:
+    current_idle: float = 1.0       # Motor current of the empty belt, stopped (A)
+    current_speed: float = 0.15     # A per m/s of belt speed
+    current_bottle: float = 0.05    # A per bottle on the belt
+    wear: WearModel = WearModel()
+
+    def current(self, speed, bottles):
+        return self.current_idle + self.current_speed * speed + self.current_bottle * bottles
+
+    def life(self, load):
+        """Hours to wear out at the mean growth rate, for a mean load factor (I / I_nominal)^p."""
+        return 1.0 / (self.wear.growth_mean * max(load, 1e-12))
+
+
+@dataclass(frozen=True)
+class Setup:
+    config: SimConfig               # The line
+    jam: JamModel = JamModel()
+    drive: DriveModel = DriveModel()
+    horizon: float = 1200.0         # Measured seconds per run
+    warmup: float = 120.0           # Seconds run first to fill the belts, not measured
+    window: float = 0.05            # Half-width of the sensor timing the jam point
+
+    @property
+    def jam_x(self):
+        cfg = self.config
+        return cfg.jam_points[0] if cfg.jam_points else cfg.sensor_x
+
+
+# --- ONE RUN ---
+class _Recorder:
+    """Observer of the line: random jams at the jam point, jam risk and drive load."""
+
+    def __init__(self, setup, speed, seed, sensor):
+        self.jam, self.drive, self.speed = setup.jam, setup.drive, speed
+        self.nominal = setup.drive.wear.current_nominal
+        self.exponent = setup.drive.wear.load_exponent
+        self.rng = random.Random(seed)
+        self.sensor = sensor
+        self.last = -math.inf           # Time of the previous bottle at the jam point
+        self.measuring = False
+        self.risk = self.load = 0.0
+        self.ticks = self.running = self.jams = 0
+
+    def __call__(self, sim):
+        if len(sim.events):
+            for t, sensor, _, enter in sim.events.tolist():
+                if sensor != self.sensor or not enter:
+                    continue
+                p = self.jam.probability(t - self.last, self.speed)
+                self.last = t
+                if self.measuring:
+                    self.risk += p
+                if sim.status == "NORMAL" and self.rng.random() < p:
+                    sim.set_status("JAM")
+                    sim.schedule(sim.time + self.rng.expovariate(1.0 / self.jam.repair), "NORMAL")
+                    self.jams += self.measuring
+        if self.measuring:
+            current = self.drive.current(sim.speed, sim.bottles.n)
+            self.load += (current / self.nominal) ** self.exponent
+            self.ticks += 1
+            self.running += sim.status != "JAM"
+
+
+def simulate(point, setup, seed):
+    """Run one candidate (speed, spacing, buffer) once; returns its raw totals."""
+    speed, spacing, buffer = point
+    cfg = setup.config
+    ratio = speed / cfg.speed["NORMAL"]
+    sensors = cfg.sensors or (Sensor("optical", cfg.sensor_x, cfg.sensor_window, True),)
+    sensors += (Sensor("jam point", setup.jam_x - setup.window, setup.window),)
+    line_cfg = replace(cfg, spawn_interval=spacing, sensors=sensors,
+                       speed={**cfg.speed, "NORMAL": speed, "WEAR": cfg.speed["WEAR"] * ratio})
+    seeds = np.random.SeedSequence(seed).generate_state(3)
+    plant = Plant(cfg.dt)
+    line = plant.add_line("line", line_cfg, seed=int(seeds[0]), fed=buffer > 0)
+    if buffer > 0:
+        plant.add_line("buffer", SimConfig(spawn_x=0.0, exit_x=buffer, spawn_interval=spacing, jam_points=(),
+                                           sensor_x=buffer / 2, bottle_length=cfg.bottle_length,
+                                           spread_z=cfg.spread_z, speed={**line_cfg.speed, "JAM": 0.0}),
+                       seed=int(seeds[1]))
+        plant.connect("buffer", "line")
+    recorder = _Recorder(setup, speed, int(seeds[2]), line.sensors.index("jam point"))
+    line.observers.append(recorder)
+
+    plant.run(setup.warmup)
+    recorder.measuring, counted = True, line.bottle_count
+    plant.run(setup.horizon)
+    hours = recorder.ticks * plant.dt / 3600.0
+    return {"bottles": line.bottle_count - counted, "hours": hours, "running_h": recorder.running * plant.dt / 3600.0,
+            "jams": recorder.jams, "risk": recorder.risk, "load": recorder.load / max(recorder.ticks, 1)}
+
+
+def _run_job(job):
+    key, point, setup, seed = job
+    return key, simulate(point, setup, seed)
+
+
+def summarize(runs, drive):
+    """KPIs of a candidate from its replica runs."""
+    hours = sum(r["hours"] for r in runs)
+    running = sum(r["running_h"] for r in runs)
+    per_h = np.array([r["bottles"] / r["hours"] for r in runs])
+    load = sum(r["load"] * r["hours"] for r in runs) / hours
+    return {
+        "throughput_per_h": float(per_h.mean()),
+        "throughput_se": float(per_h.std(ddof=1) / math.sqrt(len(runs))) if len(runs) > 1 else 0.0,
+        "jam_risk_per_h": 1.0 - math.exp(-sum(r["risk"] for r in runs) / running) if running else 1.0,
+        "jams_per_h": sum(r["jams"] for r in runs) / hours,
+        "availability": running / hours,
+        "bearing_life_h": drive.life(load),
+    }
+
+
+# --- PARETO FRONT ---
+def pareto(scores):
+    """Indices of the rows of `scores` (higher is better in every column) that no
+    other row dominates."""
+    s = np.asarray(scores, dtype=np.float64)
+    if len(s) == 0:
+        return np.empty(0, dtype=np.intp)
+    no_worse = (s[:, None, :] <= s[None, :, :]).all(axis=2)   # [i, j]: j is at least as good as i
+    better = (s[:, None, :] < s[None, :, :]).any(axis=2)
+    return np.flatnonzero(~(no_worse & better).any(axis=1))
+
+
+# --- SEARCH ---
+class Optimizer:
+    def __init__(self, setup, bounds=BOUNDS, replicas=4, seed=0, max_jam=0.3, min_life=4000.0,
+                 workers=None, cache=None):
+        self.setup = setup
+        self.bounds = {name: bounds[name] for name in PARAMS}
+        self.max_jam = max_jam          # Highest acceptable chance of a jam per running hour
+        self.min_life = min_life        # Shortest acceptable bearing life (h)
+        self.workers = workers or os.cpu_count()
+        self.rng = np.random.default_rng(seed)
+        # Replica i uses the same seed for every candidate (common random numbers)
+        self.seeds = [int(s.generate_state(1)[0]) for s in np.random.SeedSequence(seed).spawn(replicas)]
+        self.results = {}               # Candidate point -> KPIs
+        self.runs = {}                  # Cache key -> raw totals of one run
+        self.simulated = 0              # Runs simulated by this optimizer
+        self.hits = 0                   # Runs found in the cache instead
+        self.cache = cache
+        self._fingerprint = repr(setup)
+        if cache and os.path.exists(cache):
+            with open(cache) as fh:
+                for entry in map(json.loads, fh):
+                    self.runs[entry["key"]] = entry["run"]
+
+    def snap(self, point):
+        """`point` clipped to the bounds and rounded to the grid."""
+        snapped = []
+        for value, (lo, hi, step) in zip(point, self.bounds.values()):
+            value = lo + round((min(max(value, lo), hi) - lo) / step) * step
+            snapped.append(round(min(value, hi), 9))
+        return tuple(snapped)
+
+    def _key(self, point, seed):
+        return hashlib.sha1(repr((point, seed, self._fingerprint)).encode()).hexdigest()
+
+    def evaluate(self, points, pool=None):
+        """KPIs of every point, simulating only the runs that aren't cached."""
+        points = list(dict.fromkeys(self.snap(p) for p in points))
+        jobs = [(self._key(p, s), p, self.setup, s) for p in points for s in self.seeds]
+        todo = [job for job in jobs if job[0] not in self.runs]
+        self.hits += len(jobs) - len(todo)
+        if todo:
+            results = pool.imap_unordered(_run_job, todo) if pool else map(_run_job, todo)
+            with open(self.cache, "a") if self.cache else _NoFile() as fh:
+                for key, run in results:
+                    self.runs[key] = run
+                    self.simulated += 1
+                    fh.write(json.dumps({"key": key, "run": run}) + "\n")
+        for p in points:
+            self.results[p] = summarize([self.runs[self._key(p, s)] for s in self.seeds], self.setup.drive)
+        return {p: self.results[p] for p in points}
+
+    def feasible(self, kpis):
+        return kpis["jam_risk_per_h"] <= self.max_jam and kpis["bearing_life_h"] >= self.min_life
+
+    def _violation(self, kpis):
+        return (max(kpis["jam_risk_per_h"] / self.max_jam - 1.0, 0.0)
+                + max(1.0 - kpis["bearing_life_h"] / self.min_life, 0.0))
+
+    def front(self):
+        """The evaluated points no other one beats on throughput, jam risk and life."""
+        points = list(self.results)
+        scores = [(k["throughput_per_h"], -k["jam_risk_per_h"], k["bearing_life_h"])
+                  for k in map(self.results.get, points)]
+        return sorted((points[i] for i in pareto(scores)), key=lambda p: -self.results[p]["throughput_per_h"])
+
+    def best(self):
+        """Highest-throughput point meeting both limits, or None."""
+        ok = [p for p, k in self.results.items() if self.feasible(k)]
+        return max(ok, key=lambda p: self.results[p]["throughput_per_h"]) if ok else None
+
+    def _latin_hypercube(self, n):
+        columns = []
+        for lo, hi, _ in self.bounds.values():
+            u = (self.rng.permutation(n) + self.rng.random(n)) / n
+            columns.append(lo + u * (hi - lo))
+        return [self.snap(p) for p in zip(*columns)]
+
+    def _neighbours(self, n, scale):
+        # Parents: the feasible part of the front, else the points closest to feasible
+        front = self.front()
+        parents = [p for p in front if self.feasible(self.results[p])]
+        if not parents:
+            parents = sorted(self.results, key=lambda p: self._violation(self.results[p]))[:max(4, n // 4)]
+        width = np.array([hi - lo for lo, hi, _ in self.bounds.values()])
+        out, tries = [], 0
+        while len(out) < n and tries < 20 * n:
+            tries += 1
+            parent = np.array(parents[self.rng.integers(len(parents))])
+            point = self.snap(parent + self.rng.normal(0.0, scale, len(width)) * width)
+            if point not in self.results and point not in out:
+                out.append(point)
+        return out
+
+    def search(self, initial=24, rounds=4, batch=12, start=(), log=None):
+        """Latin hypercube of `initial` points (plus `start`), then `rounds` of `batch`
+        neighbours of the front with a shrinking step. Returns the front."""
+        pool = Pool(self.workers) if self.workers > 1 else None
+        try:
+            for r in range(rounds + 1):
+                started = time.perf_counter()
+                before = self.simulated
+                if r == 0:
+                    points = [self.snap(p) for p in start] + self._latin_hypercube(initial)
+                else:
+                    points = self._neighbours(batch, 0.15 * 0.6 ** (r - 1))
+                if not points:
+                    break
+                self.evaluate(points, pool)
+                if log:
+                    best = self.best()
+                    log(f"round {r}: {len(points)} points, {self.simulated - before} runs in "
+                        f"{time.perf_counter() - started:.1f} s; front {len(self.front())}, best feasible "
+                        + (f"{self.results[best]['throughput_per_h']:,.0f}/h at {_describe(best)}" if best else "none"))
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+        return self.front()
+
+
+class _NoFile:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def write(self, text):
+        pass
+
+
+def _describe(point):
+    return ", ".join(f"{name} {value:g}" for name, value in zip(PARAMS, point))
+
+
+# --- CLI ---
+def _bounds(text, default):
+    """'4:8' or '4:8:0.2' -> (low, high, step)."""
+    if text is None:
+        return default
+    parts = [float(v) for v in text.split(":")]
+    if len(parts) not in (2, 3) or parts[0] > parts[1]:
+        raise ValueError(f"expected low:high[:step], got {text!r}")
+    return (parts[0], parts[1], parts[2] if len(parts) == 3 else default[2])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m conveyor_twin.optimize",
+                                     description="Search belt speed, spacing and buffer length for throughput "
+                                                 "under jam and wear limits")
+    parser.add_argument("--line", default="v2", help="preset name or line file")
+    for name in PARAMS:
+        lo, hi, step = BOUNDS[name]
+        parser.add_argument(f"--{name}", help=f"low:high[:step] (default {lo:g}:{hi:g}:{step:g})")
+    parser.add_argument("--max-jam", type=float, default=0.3, help="highest chance of a jam per running hour")
+    parser.add_argument("--min-life", type=float, default=4000.0, help="shortest bearing life (h)")
+    parser.add_argument("--jam-rate", type=float, default=JamModel.rate,
+                        help="jams per hour at the reference point (6 m/s, 1.2 s)")
+    parser.add_argument("--repair", type=float, default=JamModel.repair, help="mean jam repair time (s)")
+    parser.add_argument("--horizon", type=float, default=1200.0, help="measured seconds per run")
+    parser.add_argument("--replicas", type=int, default=4, help="seeded runs per candidate")
+    parser.add_argument("--initial", type=int, default=24, help="points of the first (space-filling) round")
+    parser.add_argument("--rounds", type=int, default=4)
+    parser.add_argument("--batch", type=int, default=12, help="new points per round")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="worker processes")
+    parser.add_argument("--cache", help="JSON-lines file of past runs, read and extended")
+    parser.add_argument("--out", help="write every evaluated point to this CSV")
+    args = parser.parse_args(argv)
+
+    from .line import load_line
+    try:
+        bounds = {name: _bounds(getattr(args, name), BOUNDS[name]) for name in PARAMS}
+        line = load_line(args.line)
+    except ValueError as exc:
+        parser.error(str(exc))
+    setup = Setup(line.config, jam=JamModel(rate=args.jam_rate, repair=args.repair), horizon=args.horizon)
+    opt = Optimizer(setup, bounds, replicas=args.replicas, seed=args.seed, max_jam=args.max_jam,
+                    min_life=args.min_life, workers=args.workers, cache=args.cache)
+    current = (line.config.speed["NORMAL"], line.config.spawn_interval, 0.0)
+
+    started = time.perf_counter()
+    front = opt.search(args.initial, args.rounds, args.batch, start=[current],
+                       log=lambda text: print(text, file=sys.stderr))
+    elapsed = time.perf_counter() - started
+    print(f"{len(opt.results)} points, {opt.simulated} runs simulated ({opt.hits} cached) "
+          f"in {elapsed:.0f} s on {opt.workers} worker(s)\n")
+
+    print(f"Pareto front ({len(front)} points; * meets jam <= {args.max_jam:g}/h and life >= {args.min_life:g} h):")
+    print(f"  {'speed':>6} {'spacing':>7} {'buffer':>6}  {'bottles/h':>12} {'jam risk/h':>10} "
+          f"{'life (h)':>8} {'avail.':>6}")
+    rows = [(p, opt.results[p]) for p in front]
+    rows.append((opt.snap(current), opt.results[opt.snap(current)]))
+    for i, (p, k) in enumerate(rows):
+        if i == len(front):
+            print("  current settings:")
+        print(f"{'*' if opt.feasible(k) else ' '} {p[0]:6.2f} {p[1]:7.2f} {p[2]:6.1f}  "
+              f"{k['throughput_per_h']:7,.0f} ±{k['throughput_se']:<4,.0f} {k['jam_risk_per_h']:10.3f} "
+              f"{k['bearing_life_h']:8,.0f} {k['availability']:6.1%}")
+    best = opt.best()
+    if best:
+        gain = opt.results[best]["throughput_per_h"] / opt.results[opt.snap(current)]["throughput_per_h"] - 1
+        print(f"\nbest within limits: {_describe(best)} ({gain:+.1%} bottles/h vs current settings)")
+    else:
+        print("\nno evaluated point meets both limits")
+
+    if args.out:
+        front_set = set(front)
+        table = ({**dict(zip(PARAMS, p)), **k, "feasible": opt.feasible(k), "pareto": p in front_set}
+                 for p, k in opt.results.items())
+        for _ in write_csv(args.out, table):
+            pass
+        print(f"{len(opt.results)} points -> {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""Object pool for the per-bottle views.
+
+Building an Ursina Entity (and its children) for every spawned bottle and
+destroying it at the exit churns the scene graph and the garbage collector,
+which shows up as frame hitches. A Pool preallocates the objects once and
+recycles them: release() only hides an object, acquire() shows an idle one
+again, and a new object is only built when the pool runs dry (a miss).
+
+Bursts, such as a JAM queue released at once, are absorbed by the idle list;
+objects beyond `capacity` idle ones are discarded. hit_rate and high_water
+(most objects ever in use at once) tell whether the capacity fits the line.
+
+    pool = Pool(Bottle, capacity=48, discard=destroy)
+    bottle = pool.acquire()
+    ...
+    pool.release(bottle)
+"""
+
+
+def _show(obj):
+    obj.enabled = True
+
+
+def _hide(obj):
+    obj.enabled = False
+
+
+class Pool:
+    def __init__(self, factory, capacity=64, preallocate=None, activate=_show, deactivate=_hide,
+                 discard=None):
+        """`preallocate` objects (default: capacity) are built up front; activate and
+        deactivate run on acquire and release, discard on objects the pool drops."""
+        self.factory = factory
+        self.capacity = capacity            # Most idle objects kept
+        self.activate = activate
+        self.deactivate = deactivate
+        self.discard = discard
+        self.idle = []
+        self.in_use = 0
+        self.high_water = 0
+        self.hits = 0
+        self.misses = 0
+        self.discarded = 0
+        self.reserve(capacity if preallocate is None else preallocate)
+
+    def reserve(self, n):
+        """Build idle objects until `n` are idle (e.g. ahead of a known burst)."""
+        while len(self.idle) < n:
+            obj = self.factory()
+            self.deactivate(obj)
+            self.idle.append(obj)
+
+    def acquire(self):
+        if self.idle:
+            obj = self.idle.pop()
+            self.hits += 1
+        else:
+            obj = self.factory()
+            self.misses += 1
+        self.activate(obj)
+        self.in_use += 1
+        self.high_water = max(self.high_water, self.in_use)
+        return obj
+
+    def release(self, obj):
+        self.in_use -= 1
+        if len(self.idle) < self.capacity:
+            self.deactivate(obj)
+            self.idle.append(obj)
+        else:
+            self.discarded += 1
+            if self.discard:
+                self.discard(obj)
+
+    @property
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 1.0
+
+    def report(self):
+        return (f"pool {self.in_use} in use, {len(self.idle)} idle, hit rate {self.hit_rate:.1%}, "
+                f"high water {self.high_water}/{self.capacity}")
@@ -0,0 +1,296 @@
+"""Per-frame phase timing for the twin.
+
+A Profiler times each phase of the main loop: the ConveyorSim steps
+(spawn, physics, sensors), its observers (telemetry) and whatever the view
+wraps in `profiler.phase("ui")`. Every frame adds one row of phase totals
+to a ring (recent percentiles) and to log-spaced histograms (whole run).
+
+A sim stepped by a SimThread is instrumented with its runner: the timed
+wrappers are installed and removed on the sim thread (through the runner's
+queue), its phases go to their own row, closed after every tick into the
+`ticks` ring, and the runner's own observer isn't timed. Frames then hold
+the render thread's phases only.
+
+Disabled, the sim is left untouched (the timed wrappers are only installed
+while enabled) and phase()/frame() return at once, so the hooks can stay in
+the scripts. With tracing on, every span is also kept for export to the
+Chrome trace format (chrome://tracing, Perfetto) or to speedscope.
+
+    python -m conveyor_twin.profiler --seconds 60 --jam 20 --trace run.json --speedscope run.speedscope.json
+"""
+import argparse
+import json
+import time
+from collections import deque
+
+import numpy as np
+
+from .sim import ConveyorSim
+from .telemetry import RingBuffer, Telemetry
+
+PHASES = ("spawn", "physics", "sensors", "telemetry", "ui")
+# ConveyorSim step methods timed under each phase
+SIM_PHASES = {"_spawn": "spawn", "_cleanup": "spawn", "_move": "physics",
+              "_sense": "sensors", "_signals": "sensors"}
+MAIN, SIM = 1, 2                    # Trace thread ids: the main (render) loop and a SimThread
+BINS = np.geomspace(1e-6, 1.0, 61)  # Histogram edges (s), 10 bins per decade
+
+
+class _Null:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL = _Null()
+
+
+class _Span:
+    __slots__ = ("profiler", "name", "col", "start")
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+        self.col = profiler.column[name]
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        profiler = self.profiler
+        profiler._add(profiler._current, MAIN, self.name, self.col, self.start, time.perf_counter())
+        return False
+
+
+class Profiler:
+    def __init__(self, phases=PHASES, frames=600, trace_capacity=500_000):
+        self.phases = tuple(phases)
+        self.column = {name: i + 1 for i, name in enumerate(self.phases)}  # Column 0 is the frame time
+        self.frames = RingBuffer(frames, 1 + len(self.phases))            # Seconds per frame and phase
+        self.ticks = RingBuffer(frames, 1 + len(self.phases))             # Same per tick of a threaded sim
+        self.histogram = np.zeros((1 + len(self.phases), len(BINS) + 1), dtype=np.int64)
+        self.trace = deque(maxlen=trace_capacity)  # (name, start, duration, thread) spans, while tracing
+        self.enabled = False
+        self.tracing = False
+        self.origin = time.perf_counter()
+        self._current = np.zeros(1 + len(self.phases))     # This frame, on the main thread
+        self._tick = np.zeros(1 + len(self.phases))        # This tick, on the sim thread
+        self._frame_start = None
+        self._sims = []             # (sim, runner or None)
+
+    # --- HOOKS ---
+    def enable(self, on=True, trace=None):
+        self.enabled = on
+        if trace is not None:
+            self.tracing = trace
+        self._frame_start = None
+        self._current[:] = 0.0
+        for sim, runner in self._sims:
+            if runner is None:
+                self._hook(sim, on)
+            else:
+                runner.submit(self._hook, on, runner)  # Rebind only between the sim thread's ticks
+
+    def toggle(self):
+        self.enable(not self.enabled)
+        return self.enabled
+
+    def instrument(self, sim, runner=None):
+        """Time the steps and observers of a ConveyorSim while enabled; pass the
+        SimThread stepping it, if any."""
+        self._sims.append((sim, runner))
+        if self.enabled:
+            if runner is None:
+                self._hook(sim, True)
+            else:
+                runner.submit(self._hook, True, runner)
+        return sim
+
+    def _hook(self, sim, on, runner=None):
+        current, thread = (self._current, MAIN) if runner is None else (self._tick, SIM)
+        sim.__dict__.pop("step", None)
+        for method, phase in SIM_PHASES.items():
+            sim.__dict__.pop(method, None)  # Back to the class method
+            if on:
+                setattr(sim, method, self.timed(getattr(sim, method), phase, current, thread))
+        if on and runner is not None:
+            sim.step = self._closing(sim.step)
+        # The runner's frame collection is plumbing, not telemetry
+        skip = runner._collect if runner is not None else None
+        observers = [getattr(o, "__wrapped__", o) for o in sim.observers]
+        sim.observers[:] = [self.timed(o, "telemetry", current, thread) if on and o != skip else o
+                            for o in observers]
+        if runner is not None:
+            self._tick[:] = 0.0
+
+    def timed(self, fn, phase, current=None, thread=MAIN):
+        """fn wrapped to add its run time to `phase` (of the frame, or of `current`)."""
+        col, clock, add = self.column[phase], time.perf_counter, self._add
+        current = self._current if current is None else current
+
+        def wrapper(*args, **kwargs):
+            start = clock()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                add(current, thread, phase, col, start, clock())
+        wrapper.__wrapped__ = fn
+        return wrapper
+
+    def _closing(self, step):
+        # ConveyorSim.step of a threaded sim: each tick is its own row of `ticks`
+        clock, tick, ticks = time.perf_counter, self._tick, self.ticks
+
+        def wrapper(*args, **kwargs):
+            start = clock()
+            try:
+                return step(*args, **kwargs)
+            finally:
+                end = clock()
+                tick[0] = end - start
+                ticks.append(tick)
+                tick[:] = 0.0
+                if self.tracing:
+                    self.trace.append(("tick", start, end - start, SIM))
+        wrapper.__wrapped__ = step
+        return wrapper
+
+    def phase(self, name):
+        """Context manager timing its block under `name`."""
+        return _Span(self, name) if self.enabled else _NULL
+
+    def _add(self, current, thread, name, col, start, end):
+        current[col] += end - start
+        if self.tracing:
+            self.trace.append((name, start, end - start, thread))
+
+    def frame(self):
+        """Close the current frame: call once per rendered frame (or headless tick)."""
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        current = self._current
+        if self._frame_start is not None:
+            current[0] = now - self._frame_start
+            self.frames.append(current)
+            self.histogram[np.arange(len(current)), np.searchsorted(BINS, current)] += 1
+            if self.tracing:
+                self.trace.append(("frame", self._frame_start, current[0], MAIN))
+        current[:] = 0.0
+        self._frame_start = now
+
+    # --- STATISTICS ---
+    def histogram_percentile(self, name, q):
+        """Upper bin edge (s) below which q% of all frames spent in `name`."""
+        counts = self.histogram[0 if name == "frame" else self.column[name]]
+        total = counts.sum()
+        if not total:
+            return 0.0
+        i = int(np.searchsorted(np.cumsum(counts), total * q / 100.0))
+        return float(BINS[min(i, len(BINS) - 1)])
+
+    def report(self):
+        """Text breakdown of the recent frames, as shown by the overlay."""
+        recent = self.frames.read(self.frames.oldest)
+        if not len(recent):
+            return "profiler: no frames yet"
+        p50, p95, p99 = (np.percentile(recent[:, 0], q) * 1e3 for q in (50, 95, 99))
+        mean = recent.mean(axis=0)
+        ticks = self.ticks.read(self.ticks.oldest)
+        threaded = [self.column[name] for name in self.phases if name != "ui"] if len(ticks) else []
+        lines = [f"frame {p50:6.2f} p50 {p95:6.2f} p95 {p99:6.2f} p99 ms  ({1.0 / max(mean[0], 1e-9):.0f} fps)"]
+        for name, col in self.column.items():
+            if col not in threaded:
+                lines.append(f"{name:10s} {mean[col] * 1e3:7.3f} ms  {mean[col] / mean[0]:6.1%}")
+        other = mean[0] - mean[1:].sum()
+        lines.append(f"{'other':10s} {other * 1e3:7.3f} ms  {other / mean[0]:6.1%}  (render, scripts)")
+        if threaded:
+            # Phases of the sim thread, per tick rather than per frame
+            per_tick = ticks.mean(axis=0)
+            p50, p99 = (np.percentile(ticks[:, 0], q) * 1e6 for q in (50, 99))
+            lines.append(f"sim tick {p50:6.0f} p50 {p99:6.0f} p99 us")
+            for name in self.phases:
+                col = self.column[name]
+                if col in threaded:
+                    lines.append(f"{name:10s} {per_tick[col] * 1e6:7.1f} us  {per_tick[col] / per_tick[0]:6.1%}")
+        return "\n".join(lines)
+
+    # --- EXPORT ---
+    def _spans(self, thread=None):
+        spans = self.trace if thread is None else [span for span in self.trace if span[3] == thread]
+        return sorted(spans, key=lambda span: (span[1], -span[2]))
+
+    def write_chrome_trace(self, path):
+        """Complete ("X") events in microseconds, for chrome://tracing or Perfetto."""
+        events = [{"name": name, "ph": "X", "pid": 1, "tid": thread,
+                   "ts": (start - self.origin) * 1e6, "dur": duration * 1e6}
+                  for name, start, duration, thread in self._spans()]
+        with open(path, "w") as fh:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, fh)
+
+    def write_speedscope(self, path, name="conveyor twin"):
+        """Evented profile in speedscope's own file format, one profile per thread."""
+        frames, index, profiles = [], {}, []
+        for thread in sorted({span[3] for span in self.trace}) or [MAIN]:
+            events, stack = [], []
+            for span, start, duration, _ in self._spans(thread):
+                start, end = start - self.origin, start - self.origin + duration
+                while stack and stack[-1][1] <= start:
+                    frame, at = stack.pop()
+                    events.append({"type": "C", "frame": frame, "at": at * 1e6})
+                if stack and end > stack[-1][1]:
+                    end = stack[-1][1]  # Clamp rounding overlaps so events nest
+                if span not in index:
+                    index[span] = len(frames)
+                    frames.append({"name": span})
+                events.append({"type": "O", "frame": index[span], "at": start * 1e6})
+                stack.append((index[span], end))
+            while stack:
+                frame, at = stack.pop()
+                events.append({"type": "C", "frame": frame, "at": at * 1e6})
+            profiles.append({"type": "evented", "name": name if thread == MAIN else f"{name} (sim thread)",
+                             "unit": "microseconds", "startValue": events[0]["at"] if events else 0,
+                             "endValue": events[-1]["at"] if events else 0, "events": events})
+        with open(path, "w") as fh:
+            json.dump({"$schema": "https://www.speedscope.app/file-format-schema.json",
+                       "shared": {"frames": frames}, "profiles": profiles, "name": name}, fh)
+
+
+# --- CLI ---
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m conveyor_twin.profiler",
+                                     description="Profile the headless twin, one frame per tick")
+    parser.add_argument("--seconds", type=float, default=60.0, help="simulated time")
+    parser.add_argument("--jam", type=float, help="switch to JAM at this time (s)")
+    parser.add_argument("--trace", help="write a Chrome trace (.json)")
+    parser.add_argument("--speedscope", help="write a speedscope profile (.speedscope.json)")
+    args = parser.parse_args(argv)
+
+    sim = ConveyorSim(seed=0)
+    if args.jam is not None:
+        sim.schedule(args.jam, "JAM")
+    sim.observers.append(Telemetry().sample)
+    profiler = Profiler()
+    profiler.instrument(sim)
+    profiler.enable(trace=bool(args.trace or args.speedscope))
+    started = time.perf_counter()
+    for _ in range(round(args.seconds / sim.config.dt)):
+        sim.step()
+        profiler.frame()
+    elapsed = time.perf_counter() - started
+    print(profiler.report())
+    print(f"{sim.tick:,} ticks in {elapsed:.2f} s (profiled); whole-run tick p99 "
+          f"{profiler.histogram_percentile('frame', 99) * 1e6:.0f} us")
+    if args.trace:
+        profiler.write_chrome_trace(args.trace)
+        print(f"Chrome trace written to {args.trace}")
+    if args.speedscope:
+        profiler.write_speedscope(args.speedscope)
+        print(f"speedscope profile written to {args.speedscope}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,420 @@
+"""Record a session to a compact log and replay it.
+
+A log is a sequence of chunks of `chunk_ticks` ticks, followed by an index:
+
+    header   b"CVRP", JSON metadata (line geometry, dt)
+    chunk    b"CHNK" header, one fixed-width signal record per tick,
+             zlib-compressed bottle stream
+    ...
+    index    (offset, first tick, first time) per chunk, trailer b"CVIX"
+
+Signal records are read straight from a memory map. Bottle positions are
+quantized to millimetres and stored as per-tick deltas, with each chunk
+starting from a full keyframe, so the belt moving uniformly compresses to
+almost nothing. A tick where a bottle jumps further than an int16 delta
+holds (a reset, a reload, a bottle moved by hand) is stored as a keyframe
+too. Seeking decodes one chunk at most, and opening a log only
+reads its index: a one-hour session starts instantly and a replay holds
+about two chunks in memory, whatever the file size. If a session died before
+writing the index, the chunk headers are scanned instead.
+
+    python -m conveyor_twin.replay --record 3600 session.cvr
+    python -m conveyor_twin.replay session.cvr --play --speed 20
+"""
+import argparse
+import json
+import struct
+import time
+import zlib
+from collections import OrderedDict
+
+import numpy as np
+
+from .bottles import BottleStore
+from .sim import STATES, ConveyorSim
+
+_MAGIC = b"CVRP"
+_FILE_HEADER = struct.Struct("<4sI")            # magic, length of the JSON metadata
+_CHUNK_MAGIC = b"CHNK"
+_CHUNK_HEADER = struct.Struct("<4sQIII")        # magic, first tick, ticks, signal bytes, payload bytes
+_TRAILER = struct.Struct("<QI4s")               # index offset, chunks, magic
+_INDEX_MAGIC = b"CVIX"
+
+SIGNALS = np.dtype([
+    ("time", "<f8"), ("vibration", "<f4"), ("current", "<f4"), ("speed", "<f4"),
+    ("bottle_count", "<u4"), ("on_belt", "<u4"), ("status", "u1"), ("laser_on", "u1"),
+])
+_INDEX = np.dtype([("offset", "<u8"), ("first_tick", "<u8"), ("first_time", "<f8")])
+_SCALE = 1000.0                                 # Positions are stored in millimetres
+_DX_MAX = np.iinfo(np.int16).max                # Largest per-tick move stored as a delta (mm)
+_META_FIELDS = ("dt", "spawn_x", "sensor_x", "sensor_window", "exit_x", "jam_points", "lanes")
+
+
+# --- RECORDING ---
+class Recorder:
+    """Tick observer writing a ConveyorSim session to `path`."""
+
+    def __init__(self, path, config=None, chunk_ticks=600):
+        self.fh = open(path, "wb")
+        self.chunk_ticks = chunk_ticks
+        meta = {"version": 1, "states": STATES, "chunk_ticks": chunk_ticks}
+        if config is not None:
+            meta["config"] = {name: getattr(config, name) for name in _META_FIELDS}
+        meta = json.dumps(meta).encode()
+        self.fh.write(_FILE_HEADER.pack(_MAGIC, len(meta)) + meta)
+        self.ticks = 0
+        self.index = []
+        self._signals = np.zeros(chunk_ticks, dtype=SIGNALS)
+        self._start_chunk()
+
+    def _start_chunk(self):
+        self._k = 0
+        self._removed_n, self._spawned_n = [], []
+        self._removed, self._dx, self._new_ids, self._new_x, self._new_z = [], [], [], [], []
+        # Empty "previous frame": the first tick of a chunk stores every bottle (keyframe)
+        self._prev_ids = np.empty(0, dtype=np.int64)
+        self._prev_q = np.empty(0, dtype=np.int64)
+
+    def __call__(self, sim):
+        store = sim.bottles
+        rec = self._signals[self._k]
+        rec["time"] = sim.time
+        rec["vibration"] = sim.vibration
+        rec["current"] = sim.current
+        rec["speed"] = sim.speed
+        rec["bottle_count"] = sim.bottle_count
+        rec["on_belt"] = store.n
+        rec["status"] = STATES.index(sim.status)
+        rec["laser_on"] = sim.laser_on
+
+        ids = store.ids
+        q = np.rint(store.x * _SCALE).astype(np.int64)
+        # Bottles keep their spawn order, so survivors come first and new ones last
+        keep = np.isin(self._prev_ids, ids, assume_unique=True)
+        removed = np.flatnonzero(~keep)
+        surv = len(self._prev_ids) - len(removed)
+        dx = q[:surv] - self._prev_q[keep]
+        if surv and np.abs(dx).max() > _DX_MAX:
+            # Too far for a delta: drop every bottle and store them all afresh
+            removed, surv = np.arange(len(self._prev_ids)), 0
+        self._removed_n.append(len(removed))
+        self._spawned_n.append(len(ids) - surv)
+        if len(removed):
+            self._removed.append(removed.astype(np.uint32))
+        if surv:
+            self._dx.append(dx.astype(np.int16))
+        if len(ids) > surv:
+            self._new_ids.append(ids[surv:].copy())
+            self._new_x.append(q[surv:].astype(np.int32))
+            self._new_z.append(np.rint(store.z[surv:] * _SCALE).astype(np.int16))
+        self._prev_ids = ids.copy()
+        self._prev_q = q
+        self._k += 1
+        self.ticks += 1
+        if self._k == self.chunk_ticks:
+            self._flush()
+
+    def _flush(self):
+        k = self._k
+        if k == 0:
+            return
+        payload = b"".join([
+            np.asarray(self._removed_n, dtype=np.uint32).tobytes(),
+            np.asarray(self._spawned_n, dtype=np.uint32).tobytes(),
+            *(a.tobytes() for a in self._removed),
+            *(a.tobytes() for a in self._dx),
+            *(a.tobytes() for a in self._new_ids),
+            *(a.tobytes() for a in self._new_x),
+            *(a.tobytes() for a in self._new_z),
+        ])
+        payload = zlib.compress(payload, 1)
+        signals = self._signals[:k].tobytes()
+        first_tick = self.ticks - k
+        self.index.append((self.fh.tell(), first_tick, float(self._signals[0]["time"])))
+        self.fh.write(_CHUNK_HEADER.pack(_CHUNK_MAGIC, first_tick, k, len(signals), len(payload)))
+        self.fh.write(signals)
+        self.fh.write(payload)
+        self.fh.flush()
+        self._start_chunk()
+
+    def close(self):
+        if self.fh.closed:
+            return
+        self._flush()
+        offset = self.fh.tell()
+        self.fh.write(np.array(self.index, dtype=_INDEX).tobytes())
+        self.fh.write(_TRAILER.pack(offset, len(self.index), _INDEX_MAGIC))
+        self.fh.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# --- READING ---
+class Chunk:
+    """One decoded chunk: signal records plus every tick's bottles."""
+
+    def __init__(self, signals, offsets, ids, x, z):
+        self.signals = signals      # View into the memory map
+        self.offsets = offsets      # Bottles of tick i are rows offsets[i]:offsets[i + 1]
+        self.ids = ids
+        self.x = x
+        self.z = z
+
+    def bottles(self, i):
+        a, b = self.offsets[i], self.offsets[i + 1]
+        return self.ids[a:b], self.x[a:b], self.z[a:b]
+
+
+class Recording:
+    def __init__(self, path, cache=2):
+        self.path = path
+        self.mm = np.memmap(path, dtype=np.uint8, mode="r")
+        magic, size = _FILE_HEADER.unpack_from(self.mm, 0)
+        if magic != _MAGIC:
+            raise ValueError(f"{path} is not a session recording")
+        self.meta = json.loads(bytes(self.mm[_FILE_HEADER.size:_FILE_HEADER.size + size]))
+        self._data_start = _FILE_HEADER.size + size
+        self.index = self._read_index()
+        self.ticks = int(self.index["first_tick"][-1] + self._chunk_len(len(self.index) - 1)) if len(self.index) else 0
+        self.cache_size = cache
+        self._cache = OrderedDict()
+
+    def _read_index(self):
+        mm = self.mm
+        if len(mm) >= self._data_start + _TRAILER.size:
+            offset, n, magic = _TRAILER.unpack_from(mm, len(mm) - _TRAILER.size)
+            if magic == _INDEX_MAGIC:
+                return np.frombuffer(mm, dtype=_INDEX, count=n, offset=offset)
+        # No index (session not closed): walk the chunk headers
+        entries, offset = [], self._data_start
+        while offset + _CHUNK_HEADER.size <= len(mm):
+            magic, first_tick, ticks, sig_bytes, payload = _CHUNK_HEADER.unpack_from(mm, offset)
+            end = offset + _CHUNK_HEADER.size + sig_bytes + payload
+            if magic != _CHUNK_MAGIC or end > len(mm):
+                break
+            first_time = np.frombuffer(mm, dtype=SIGNALS, count=1, offset=offset + _CHUNK_HEADER.size)["time"][0]
+            entries.append((offset, first_tick, first_time))
+            offset = end
+        return np.array(entries, dtype=_INDEX)
+
+    def _chunk_len(self, c):
+        return _CHUNK_HEADER.unpack_from(self.mm, int(self.index["offset"][c]))[2]
+
+    def __len__(self):
+        return self.ticks
+
+    @property
+    def start(self):
+        return float(self.index["first_time"][0]) if len(self.index) else 0.0
+
+    @property
+    def duration(self):
+        return self.signal(self.ticks - 1)["time"] - self.start if self.ticks else 0.0
+
+    # --- RANDOM ACCESS ---
+    def chunk_of(self, tick):
+        return int(np.searchsorted(self.index["first_tick"], tick, side="right")) - 1
+
+    def tick_at(self, t):
+        """Last tick recorded at or before time `t`."""
+        c = max(int(np.searchsorted(self.index["first_time"], t, side="right")) - 1, 0)
+        times = self._signals(c)["time"]
+        i = max(int(np.searchsorted(times, t, side="right")) - 1, 0)
+        return int(self.index["first_tick"][c]) + i
+
+    def _signals(self, c):
+        offset = int(self.index["offset"][c])
+        _, _, ticks, _, _ = _CHUNK_HEADER.unpack_from(self.mm, offset)
+        return np.frombuffer(self.mm, dtype=SIGNALS, count=ticks, offset=offset + _CHUNK_HEADER.size)
+
+    def signal(self, tick):
+        c = self.chunk_of(tick)
+        return self._signals(c)[tick - int(self.index["first_tick"][c])]
+
+    def chunk(self, c):
+        if c in self._cache:
+            self._cache.move_to_end(c)
+            return self._cache[c]
+        decoded = self._cache[c] = self._decode(c)
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return decoded
+
+    def frame(self, tick):
+        """(signal record, ids, x, z) of one tick."""
+        c = self.chunk_of(tick)
+        chunk = self.chunk(c)
+        i = tick - int(self.index["first_tick"][c])
+        return (chunk.signals[i],) + chunk.bottles(i)
+
+    def _decode(self, c):
+        offset = int(self.index["offset"][c])
+        _, _, k, sig_bytes, payload_len = _CHUNK_HEADER.unpack_from(self.mm, offset)
+        start = offset + _CHUNK_HEADER.size
+        signals = np.frombuffer(self.mm, dtype=SIGNALS, count=k, offset=start)
+        raw = zlib.decompress(self.mm[start + sig_bytes:start + sig_bytes + payload_len])
+
+        pos = 0
+
+        def take(dtype, count):
+            nonlocal pos
+            arr = np.frombuffer(raw, dtype=dtype, count=count, offset=pos)
+            pos += arr.nbytes
+            return arr
+
+        removed_n = take(np.uint32, k).astype(np.int64)
+        spawned_n = take(np.uint32, k).astype(np.int64)
+        on_belt = np.cumsum(spawned_n - removed_n)
+        surv_n = np.concatenate(([0], on_belt[:-1])) - removed_n
+        removed = take(np.uint32, int(removed_n.sum()))
+        dx = take(np.int16, int(surv_n.sum()))
+        total_new = int(spawned_n.sum())
+        new_ids = take(np.int64, total_new)
+        new_x = take(np.int32, total_new)
+        new_z = take(np.int16, total_new)
+
+        offsets = np.concatenate(([0], np.cumsum(on_belt)))
+        ids = np.empty(offsets[-1], dtype=np.int64)
+        q = np.empty(offsets[-1], dtype=np.int64)
+        zq = np.empty(offsets[-1], dtype=np.int64)
+        r = d = s = 0
+        prev = slice(0, 0)
+        for i in range(k):
+            a, b = offsets[i], offsets[i + 1]
+            m = a + surv_n[i]
+            keep = np.ones(prev.stop - prev.start, dtype=bool)
+            keep[removed[r:r + removed_n[i]]] = False
+            r += removed_n[i]
+            ids[a:m] = ids[prev][keep]
+            q[a:m] = q[prev][keep] + dx[d:d + surv_n[i]]
+            zq[a:m] = zq[prev][keep]
+            d += surv_n[i]
+            ids[m:b] = new_ids[s:s + spawned_n[i]]
+            q[m:b] = new_x[s:s + spawned_n[i]]
+            zq[m:b] = new_z[s:s + spawned_n[i]]
+            s += spawned_n[i]
+            prev = slice(a, b)
+        return Chunk(signals, offsets, ids, q / _SCALE, zq / _SCALE)
+
+    def transitions(self):
+        """(time, status) of every state change; reads all signal records."""
+        out, last = [], None
+        for c in range(len(self.index)):
+            sig = self._signals(c)
+            status = sig["status"]
+            changes = np.flatnonzero(np.diff(status, prepend=-1 if last is None else last))
+            out += [(float(sig["time"][i]), STATES[status[i]]) for i in changes]
+            last = status[-1]
+        return out
+
+
+# --- PLAYBACK ---
+class Player:
+    """Plays a Recording through the attributes the views read from a ConveyorSim."""
+
+    def __init__(self, recording, speed=1.0):
+        self.recording = recording
+        self.playback_speed = speed
+        self.paused = False
+        self.position = 0.0                     # Seconds since the start of the recording
+        self.bottles = BottleStore()
+        self.observers = []
+        self.tick = -1
+        self.next_id = 0
+        self._load(0)
+
+    @property
+    def config(self):
+        return self.recording.meta.get("config", {})
+
+    def advance(self, elapsed):
+        """Move the playhead by `elapsed` wall-clock seconds (times the playback speed);
+        returns the ticks moved."""
+        before = self.tick
+        if not self.paused:
+            self.seek(self.position + elapsed * self.playback_speed)
+        return self.tick - before
+
+    def seek(self, seconds):
+        rec = self.recording
+        self.position = min(max(seconds, 0.0), rec.duration)
+        tick = rec.tick_at(rec.start + self.position)
+        if tick != self.tick:
+            self._load(tick)
+            for observer in self.observers:
+                observer(self)
+
+    def set_status(self, status):
+        pass  # A replay can't be changed
+
+    def _load(self, tick):
+        if not len(self.recording):
+            return
+        sig, ids, x, z = self.recording.frame(tick)
+        self.tick = tick
+        self.time = float(sig["time"])
+        self.status = STATES[sig["status"]]
+        self.vibration = float(sig["vibration"])
+        self.current = float(sig["current"])
+        self.speed = float(sig["speed"])
+        self.bottle_count = int(sig["bottle_count"])
+        self.laser_on = bool(sig["laser_on"])
+        self.bottles.load(ids, x, z)
+        self.next_id = int(ids[-1]) + 1 if len(ids) else self.next_id
+
+
+# --- CLI ---
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m conveyor_twin.replay", description="Record or replay a session")
+    parser.add_argument("path")
+    parser.add_argument("--record", type=float, metavar="SECONDS", help="record a headless session first")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--at", type=float, help="print the frame at this time (s)")
+    parser.add_argument("--play", action="store_true", help="replay to the terminal")
+    parser.add_argument("--speed", type=float, default=10.0, help="playback speed for --play")
+    args = parser.parse_args(argv)
+
+    if args.record:
+        sim = ConveyorSim(seed=args.seed)
+        for t in range(300, int(args.record), 900):   # A short JAM and some WEAR every 15 min
+            sim.schedule(t, "JAM")
+            sim.schedule(t + 30, "NORMAL")
+            sim.schedule(t + 400, "WEAR")
+            sim.schedule(t + 550, "NORMAL")
+        started = time.perf_counter()
+        with Recorder(args.path, sim.config) as recorder:
+            sim.observers.append(recorder)
+            sim.run(args.record)
+        print(f"recorded {recorder.ticks} ticks in {time.perf_counter() - started:.1f} s")
+
+    started = time.perf_counter()
+    rec = Recording(args.path)
+    opened = time.perf_counter() - started
+    size = len(rec.mm)
+    print(f"{args.path}: {rec.ticks} ticks, {rec.duration:.0f} s, {len(rec.index)} chunks, "
+          f"{size / 1e6:.1f} MB ({size / max(rec.ticks, 1):.0f} B/tick), opened in {opened * 1e3:.1f} ms")
+    if args.at is not None:
+        sig, ids, x, _ = rec.frame(rec.tick_at(rec.start + args.at))
+        print(f"t={sig['time']:.2f} {STATES[sig['status']]} count={sig['bottle_count']} bottles={ids.tolist()}")
+        print("x:", np.round(x, 3).tolist())
+    if args.play:
+        player = Player(rec, speed=args.speed)
+        last = -1.0
+        try:
+            while player.position < rec.duration:
+                time.sleep(1 / 30)
+                player.advance(1 / 30)
+                if player.time - last >= args.speed:
+                    last = player.time
+                    print(f"{player.time:8.1f} s  {player.status:6s}  vib {player.vibration:5.2f}  "
+                          f"cur {player.current:5.2f}  count {player.bottle_count:5d}  on belt {player.bottles.n}")
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
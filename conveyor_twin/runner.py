@@ -0,0 +1,226 @@
+"""Simulation on its own thread, rendered from immutable snapshots.
+
+A SimThread steps a ConveyorSim at its fixed rate on a background thread,
+paced by the wall clock (times `speed`), so the simulated plant no longer
+depends on the frame rate: a render hitch, a slow frame or a minimized
+window don't change how many ticks run or how many bottles go through.
+
+After each batch of ticks the sim thread publishes a Frame, an immutable
+copy of everything the views read (signals, counters, bottle positions and
+the sensor events since the previous frame). The newest two frames are
+swapped in as one tuple, a single reference assignment, so the render
+thread reads a Frame without a lock and never sees half a tick. The
+renderer draws one tick behind, interpolating between the two frames at
+its own time, so motion stays smooth whatever the two rates are.
+
+State outside the Frame that both threads touch goes through its own lock:
+telemetry rings (filled by the sim thread, read by sparklines) take the
+ring's lock on append and read.
+
+Everything that changes the sim goes through the sim thread: set_status()
+and submit() queue a call, and `controllers` run before each batch
+(gateway and web commands, history playback). Observers (telemetry,
+recording, gateway, store) keep running on the sim thread after every tick.
+
+    runner = SimThread(line.sim()).start()
+    runner.controllers.append(gateway.apply)
+    def update():
+        frame = runner.frame()              # interpolated to now
+        batched.sync(frame.bottles)
+    runner.set_status("JAM")
+
+    python -m conveyor_twin.runner --seconds 10 --hitch 0.25     # throughput with render hitches
+"""
+import argparse
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+from .sensors import NO_EVENTS
+from .sim import ConveyorSim, canonical_state
+
+
+class BottleView:
+    """Read-only bottle arrays of a Frame, with the BottleStore views the renderers use."""
+    __slots__ = ("ids", "x", "z", "n")
+
+    def __init__(self, ids, x, z):
+        for arr in (ids, x, z):
+            arr.flags.writeable = False
+        self.ids, self.x, self.z, self.n = ids, x, z, len(ids)
+
+    def __len__(self):
+        return self.n
+
+
+class Frame:
+    """The state of the sim after a tick, as published to the render thread."""
+    __slots__ = ("tick", "time", "wall", "status", "speed", "vibration", "current", "bottle_count",
+                 "laser_on", "next_id", "bottles", "events")
+
+    def __init__(self, tick, time, wall, status, speed, vibration, current, bottle_count, laser_on,
+                 next_id, bottles, events):
+        self.tick = tick
+        self.time = time
+        self.wall = wall                    # perf_counter() when published
+        self.status = status
+        self.speed = speed
+        self.vibration = vibration
+        self.current = current
+        self.bottle_count = bottle_count
+        self.laser_on = laser_on
+        self.next_id = next_id
+        self.bottles = bottles
+        self.events = events                # Sensor crossings since the previous frame (a reader
+                                            # that skips frames misses some: totals are in the counters)
+
+    @classmethod
+    def capture(cls, sim, wall, events=NO_EVENTS):
+        store = sim.bottles
+        return cls(sim.tick, sim.time, wall, sim.status, sim.speed, sim.vibration, sim.current,
+                   sim.bottle_count, sim.laser_on, sim.next_id,
+                   BottleView(store.ids.copy(), store.x.copy(), store.z.copy()), events)
+
+    def blend(self, newer, alpha):
+        """The state `alpha` of the way from this frame to `newer`: positions and
+        signals interpolated, discrete values and events taken from `newer`."""
+        if alpha >= 1.0:
+            return newer
+        a, b = self.bottles, newer.bottles
+        x = b.x
+        if a.n and b.n:
+            # Ids only grow, so both id arrays are sorted: match the bottles present in both
+            j = np.minimum(np.searchsorted(a.ids, b.ids), a.n - 1)
+            both = a.ids[j] == b.ids
+            x = x.copy()
+            x[both] = a.x[j[both]] + (b.x[both] - a.x[j[both]]) * alpha
+        lerp = lambda u, v: u + (v - u) * alpha
+        return Frame(newer.tick, lerp(self.time, newer.time), lerp(self.wall, newer.wall), newer.status,
+                     lerp(self.speed, newer.speed), lerp(self.vibration, newer.vibration),
+                     lerp(self.current, newer.current), newer.bottle_count, newer.laser_on, newer.next_id,
+                     BottleView(b.ids, x, b.z) if x is not b.x else b, newer.events)
+
+
+class SimThread:
+    def __init__(self, sim, speed=1.0, max_lag=1.0):
+        """Run `sim` `speed` times faster than real time; if the thread falls more
+        than `max_lag` seconds behind (a suspended process), the rest is dropped."""
+        self.sim = sim
+        self.speed = speed
+        self.paused = False
+        self.max_lag = max_lag
+        self.controllers = []               # Callables run as controller(sim) before each batch
+        self.inbox = deque()                # Queued calls, see submit()
+        self.elapsed = 0.0                  # Wall seconds covered by the last batch
+        self.batches = 0
+        self._events = []
+        self._frames = (None, Frame.capture(sim, time.perf_counter()))  # (previous, newest), swapped whole
+        self._thread = None
+        self._stop = threading.Event()
+        sim.observers.append(self._collect)
+
+    # --- RENDER THREAD SIDE ---
+    @property
+    def latest(self):
+        return self._frames[1]
+
+    def frame(self, now=None):
+        """The sim as of one batch ago, interpolated to `now` (perf_counter time)."""
+        previous, newest = self._frames
+        if previous is None or newest.wall <= previous.wall:
+            return newest
+        now = time.perf_counter() if now is None else now
+        alpha = (now - newest.wall) / (newest.wall - previous.wall)
+        return previous.blend(newest, min(max(alpha, 0.0), 1.0))
+
+    def submit(self, fn, *args):
+        """Call fn(sim, *args) on the sim thread before its next batch."""
+        self.inbox.append((fn, args))
+
+    def set_status(self, status):
+        self.submit(ConveyorSim.set_status, canonical_state(status))
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="twin-sim", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=2.0):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    # --- SIM THREAD ---
+    def _collect(self, sim):
+        if len(sim.events):
+            self._events.append(sim.events)
+
+    def _run(self):
+        sim, inbox = self.sim, self.inbox
+        period = sim.config.dt
+        last = time.perf_counter()
+        while not self._stop.is_set():
+            for _ in range(len(inbox)):
+                fn, args = inbox.popleft()
+                fn(sim, *args)
+            for control in self.controllers:
+                control(sim)
+            now = time.perf_counter()
+            self.elapsed, last = now - last, now
+            steps = max(1, round(self.max_lag * self.speed / period))
+            if not self.paused and sim.advance(self.elapsed * self.speed, steps):
+                events, self._events = self._events, []
+                events = np.concatenate(events) if len(events) > 1 else (events[0] if events else NO_EVENTS)
+                self._frames = (self._frames[1], Frame.capture(sim, now, events))
+                self.batches += 1
+            # Wake once per tick of wall time; faster than real time, each batch is several ticks
+            self._stop.wait(max(period - (time.perf_counter() - now), 0.0))
+
+
+# --- CLI ---
+def _render_loop(runner, seconds, fps, hitch, every):
+    """Stand-in for a render loop: reads a frame `fps` times a second and, every
+    `every` seconds, stalls for `hitch` seconds holding the interpreter."""
+    frames = stalls = 0
+    start = next_hitch = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        runner.frame()
+        frames += 1
+        if hitch and time.perf_counter() >= next_hitch + every:
+            next_hitch = time.perf_counter()
+            while time.perf_counter() - next_hitch < hitch:
+                sum(range(1000))            # Busy Python work, like a heavy frame
+            stalls += 1
+        time.sleep(1 / fps)
+    return frames, stalls
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m conveyor_twin.runner",
+                                     description="Check that render hitches don't change simulated throughput")
+    parser.add_argument("--line", default="v2", help="preset name or line file")
+    parser.add_argument("--seconds", type=float, default=10.0, help="wall seconds per run")
+    parser.add_argument("--speed", type=float, default=1.0, help="simulated seconds per wall second")
+    parser.add_argument("--fps", type=float, default=60.0)
+    parser.add_argument("--hitch", type=float, default=0.25, help="length of each render stall (s)")
+    parser.add_argument("--every", type=float, default=1.0, help="seconds between stalls")
+    args = parser.parse_args(argv)
+
+    from .line import load_line
+    line = load_line(args.line)
+    for label, hitch in (("smooth render", 0.0), (f"{args.hitch * 1000:.0f} ms stall every {args.every:g} s", args.hitch)):
+        runner = SimThread(line.sim(seed=0), speed=args.speed).start()
+        started = time.perf_counter()
+        frames, stalls = _render_loop(runner, args.seconds, args.fps, hitch, args.every)
+        elapsed = time.perf_counter() - started
+        runner.stop()
+        sim = runner.sim
+        print(f"{label:32s} {frames / elapsed:6.1f} frames/s ({stalls} stalls)  "
+              f"sim {sim.time / elapsed:6.2f} s/s for {args.speed:g} requested, "
+              f"{sim.tick / elapsed:7.1f} ticks/s, {sim.bottle_count} bottles")
+
+
+if __name__ == "__main__":
+    main()
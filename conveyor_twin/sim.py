@@ -0,0 +1,220 @@
+"""Headless conveyor simulation core.
+
+The physics of the twin (spawning, belt movement, JAM pile-up, optical
+counting and the vibration/current signals) live here so they can run at a
+fixed timestep without a window. The Ursina scripts only render this state.
+
+The optical sensors work on the distance each bottle covered in a tick
+(see sensors.py), so counts and event times don't depend on the step size.
+"""
+import heapq
+import itertools
+import random
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from .bottles import BottleStore
+from .lanes import AccumulationZone, LaneIndex, SegmentTable, lane_of
+from .sensors import Sensor, SensorArray
+
+STATES = ("NORMAL", "WEAR", "JAM")
+# Names used by the French scripts and line descriptions
+STATE_ALIASES = {"USURE": "WEAR", "BOURRAGE": "JAM"}
+
+
+def canonical_state(status):
+    """The STATES name for `status`, which may be an alias (USURE, BOURRAGE)."""
+    status = STATE_ALIASES.get(status, status)
+    if status not in STATES:
+        raise ValueError(f"unknown state {status!r}, expected one of {STATES} "
+                         f"(or {', '.join(STATE_ALIASES)})")
+    return status
+
+
+# --- CONFIGURATION ---
+@dataclass
+class SimConfig:
+    dt: float = 1 / 60              # Fixed simulation timestep (s)
+    spawn_interval: float = 1.2     # Seconds between two bottles
+    spawn_jitter: float = 0.0       # Extra random spacing, uniform in [0, jitter] s
+    spawn_x: float = -5.0
+    spread_z: float = 0.5           # Bottles land at z in [-spread, +spread]
+    bottle_length: float = 0.8      # Also the minimum pitch between bottles of a lane
+    lanes: int = 1                  # Parallel queues across the belt width
+    sensor_x: float = 15.0          # Optical arch
+    sensor_window: float = 0.1      # Half-width of the counting window
+    sensors: tuple = ()             # Every Sensor on the belt; empty means just the arch above
+    exit_x: float = 25.0            # Bottles are removed past this point
+    jam_points: tuple = (12.0,)     # Where the line blocks while jammed
+    accumulation: tuple = ()        # AccumulationZone sections that keep conveying in a JAM
+    smoothing: float = 5.0          # Lerp rate of the sensor signals
+    speed: dict = field(default_factory=lambda: {"NORMAL": 6.0, "WEAR": 5.5, "JAM": 0.0})
+    # (target, noise) per state for the IoT signals
+    vibration: dict = field(default_factory=lambda: {"NORMAL": (0.5, 0.1), "WEAR": (4.5, 0.5), "JAM": (0.1, 0.0)})
+    current: dict = field(default_factory=lambda: {"NORMAL": (2.0, 0.1), "WEAR": (2.5, 0.1), "JAM": (8.0, 0.5)})
+
+
+# --- ENGINE ---
+class ConveyorSim:
+    def __init__(self, config=None, seed=None):
+        self.config = config or SimConfig()
+        self.rng = random.Random(seed)
+        self.status = "NORMAL"
+        self.speed = self.config.speed["NORMAL"]
+        self.vibration = self.config.vibration["NORMAL"][0]
+        self.current = self.config.current["NORMAL"][0]
+        self.bottle_count = 0
+        self.laser_on = False
+        self.bottles = BottleStore()  # Ordered by spawn, i.e. front of the line first
+        self.lanes = LaneIndex(self.config.lanes)
+        self.jam_points = tuple(sorted(self.config.jam_points))
+        self.accumulation = tuple(AccumulationZone(*z) if not isinstance(z, AccumulationZone) else z
+                                  for z in self.config.accumulation)
+        self.segments = SegmentTable(self.jam_points, self.accumulation, self.config.speed["JAM"])
+        self.sensors = SensorArray(self.config.sensors or
+                                   (Sensor("optical", self.config.sensor_x, self.config.sensor_window, True),))
+        self.tick = 0
+        self.time = 0.0
+        self.next_id = 0
+        self._next_spawn = 0.0
+        self._accumulator = 0.0
+        self._schedule = []         # (time, seq, status) heap of timed state changes
+        self._seq = itertools.count()
+        self.observers = []         # Callables run as observer(sim) after every tick
+        # Plant wiring: a fed line gets its bottles from upstream instead of
+        # spawning them, and a blocked outfeed holds bottles at exit_x.
+        self.autospawn = True
+        self.outfeed_blocked = False
+        # A driven line shows measured values (see ingest.HistoryFeed): the
+        # vibration, current and count are left as set from outside.
+        self.driven = False
+        self.exited = np.empty(0)   # z of the bottles that left on the last tick
+        self._before = np.empty(64) # Positions at the start of the tick, for the sensors
+
+    @property
+    def events(self):
+        """Sensor crossings of the last tick, see sensors.EVENT."""
+        return self.sensors.events
+
+    def set_status(self, status):
+        self.status = canonical_state(status)
+
+    def schedule(self, at, status):
+        """Switch to `status` once simulated time reaches `at` seconds."""
+        heapq.heappush(self._schedule, (at, next(self._seq), canonical_state(status)))
+
+    # --- TIME ---
+    def step(self, dt=None):
+        dt = self.config.dt if dt is None else dt
+        while self._schedule and self._schedule[0][0] <= self.time + 1e-9:
+            self.status = heapq.heappop(self._schedule)[2]
+        self.speed = self.config.speed[self.status]
+        self._spawn()
+        n = self.bottles.n
+        if len(self._before) < n:
+            self._before = np.empty(2 * n)
+        before = self._before[:n]
+        np.copyto(before, self.bottles.x)
+        belt = self._move(dt)
+        self._sense(before, belt, dt)
+        self._cleanup()
+        if not self.driven:
+            self._signals(dt)
+        self.tick += 1
+        self.time += dt
+        for observer in self.observers:
+            observer(self)
+
+    def run(self, seconds):
+        for _ in range(round(seconds / self.config.dt)):
+            self.step()
+
+    def advance(self, elapsed, max_steps=10):
+        """Consume wall-clock time in fixed steps; returns the steps taken."""
+        self._accumulator = min(self._accumulator + elapsed, max_steps * self.config.dt)
+        steps = 0
+        while self._accumulator >= self.config.dt:
+            self.step()
+            self._accumulator -= self.config.dt
+            steps += 1
+        return steps
+
+    # --- PHASES ---
+    def can_accept(self):
+        """True if the infeed spot is free for a new bottle."""
+        store = self.bottles
+        return not (store.n and store.x[-1] - self.config.spawn_x < self.config.bottle_length)
+
+    def inject(self, z):
+        """Place a bottle at the infeed; returns False if the spot is taken."""
+        if not self.can_accept():
+            return False
+        cfg = self.config
+        self.bottles.append(self.next_id, cfg.spawn_x, z, lane_of(z, cfg.spread_z, cfg.lanes))
+        self.next_id += 1
+        return True
+
+    def _spawn(self):
+        if self.status == "JAM" or not self.autospawn:
+            return  # Don't spawn new bottles if jammed
+        if self.time >= self._next_spawn - 1e-9:
+            cfg = self.config
+            if not self.can_accept():
+                return  # Infeed blocked by the previous bottle, retry next tick
+            self.inject(self.rng.uniform(-cfg.spread_z, cfg.spread_z))
+            self._next_spawn = self.time + cfg.spawn_interval
+            if cfg.spawn_jitter:
+                self._next_spawn += self.rng.uniform(0.0, cfg.spawn_jitter)
+
+    def _move(self, dt):
+        """Move the bottles; returns the belt speed under them (scalar or per bottle)."""
+        store = self.bottles
+        if store.n == 0:
+            return self.speed
+        x = store.x
+        v = store.v
+        limit = None
+        if self.status == "JAM":
+            # Accumulation zones keep conveying; the rest of the belt follows
+            # the JAM speed. Nobody goes past the next jam point.
+            segment = self.segments.segment(x)
+            v[:] = self.segments.speed[segment]
+            limit = self.segments.limits(x, segment)
+        else:
+            v[:] = self.speed
+        if self.outfeed_blocked:
+            limit = self.config.exit_x if limit is None else np.minimum(limit, self.config.exit_x)
+        if limit is None:
+            # The whole belt moves as one: pitches are kept, nothing to resolve
+            x += self.speed * dt
+            return self.speed
+        belt = v.copy()
+        target = np.minimum(x + v * dt, limit)
+        new = self.lanes.rebuild(store).resolve(x, target, self.config.bottle_length)
+        v[:] = (new - x) / dt if dt else 0.0
+        x[:] = new
+        return belt
+
+    def _sense(self, before, belt, dt):
+        sensors, store = self.sensors, self.bottles
+        counted = sensors.counts[sensors.counter]
+        # One lane keeps the bottles in front-first order, see SensorArray.sweep
+        sensors.sweep(store.ids, before, store.x, belt, self.time, dt, ordered=self.config.lanes == 1)
+        entered = int(sensors.counts[sensors.counter] - counted)
+        if not self.driven:
+            self.bottle_count += entered
+        # Beam broken at the end of the tick, or at some point during it
+        self.laser_on = bool(entered or sensors.is_occupied(sensors.counter))
+
+    def _cleanup(self):
+        self.exited = self.bottles.cull(self.config.exit_x)
+
+    def _signals(self, dt):
+        vib, vib_noise = self.config.vibration[self.status]
+        cur, cur_noise = self.config.current[self.status]
+        target_vib = vib + self.rng.uniform(-vib_noise, vib_noise)
+        target_cur = cur + self.rng.uniform(-cur_noise, cur_noise)
+        t = dt * self.config.smoothing
+        self.vibration += (target_vib - self.vibration) * t
+        self.current += (target_cur - self.current) * t
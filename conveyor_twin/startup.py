@@ -0,0 +1,87 @@
+"""Startup timing and the on-disk scene cache for the kiosks.
+
+mark() timestamps the startup steps of a view (imports, window, scene, ...)
+and report() prints them with the time to the first rendered frame, which
+watch_first_frame() records from inside the Panda3D task loop.
+
+cached_scene() builds the static props of a view (floor, belt frame, ...)
+once, flattens them into a few meshes and saves them as a .bam file; later
+starts load that file instead of building dozens of entities. The cache is
+keyed on the content of the file defining the build function, and on a
+caller-supplied key (e.g. the line geometry), so editing either rebuilds it.
+
+Only the scene cache and watch_first_frame() touch Panda3D, and they import
+it when called, so headless runs never load the graphics stack.
+"""
+import hashlib
+import os
+import sys
+import time
+from pathlib import Path
+
+T0 = time.perf_counter()    # Import of this module, as close to process start as the views get
+MARKS = []                  # (label, perf_counter)
+CACHE_DIR = Path(os.environ.get("TWIN_CACHE") or Path.home() / ".cache" / "conveyor_twin")
+
+
+def mark(label):
+    MARKS.append((label, time.perf_counter()))
+
+
+def report():
+    lines, last = [], T0
+    for label, at in MARKS:
+        lines.append(f"  {label:14s} {(at - last) * 1e3:7.1f} ms  (at {(at - T0) * 1e3:7.1f} ms)")
+        last = at
+    graphics = "loaded" if "panda3d.core" in sys.modules else "not imported"
+    return "\n".join(["startup:"] + lines + [f"  graphics stack {graphics}"])
+
+
+def watch_first_frame(callback=None):
+    """Mark "first frame" once Panda3D has rendered one, then call callback()."""
+    from direct.task.TaskManagerGlobal import taskMgr
+
+    def check(task):
+        if task.frame < 1:
+            return task.cont  # Frame 0 only queued the draw; it is on screen after the next flip
+        mark("first frame")
+        if callback:
+            callback()
+        return task.done
+    taskMgr.add(check, "startup-first-frame", sort=60)  # After the render task (igLoop, 50)
+
+
+# --- SCENE CACHE ---
+def cached_scene(name, build, rebuild=False, key=""):
+    """The static props made by build(), which returns an Entity holding them,
+    as one flattened node under the scene; loaded from the cache when fresh
+    (same build file and same `key`)."""
+    from panda3d.core import Filename, NodePath
+    from ursina import application, destroy, scene
+
+    digest = hashlib.sha1(Path(build.__code__.co_filename).read_bytes())
+    digest.update(str(key).encode())
+    path = CACHE_DIR / f"{name}-{digest.hexdigest()[:12]}.bam"
+    if rebuild or not path.exists():
+        root = build()
+        baked = NodePath(name)
+        for child in root.get_children():
+            child.copy_to(baked)
+        destroy(root)
+        _untag(baked.node())
+        baked.flatten_strong()  # One mesh per render state
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        for stale in CACHE_DIR.glob(f"{name}-*.bam"):
+            stale.unlink()
+        baked.write_bam_file(Filename.from_os_specific(str(path)))
+    node = application.base.loader.load_model(Filename.from_os_specific(str(path)), noCache=True)
+    node.reparent_to(scene)
+    return node
+
+
+def _untag(node):
+    """Drop the Entity back-references copied along, which also block flattening."""
+    for key in node.get_python_tag_keys():
+        node.clear_python_tag(key)
+    for child in node.get_children():
+        _untag(child)
@@ -0,0 +1,339 @@
+"""Telemetry history in an embedded time-series store (SQLite).
+
+Every conveyor's channels are kept at three resolutions, each with its own
+retention, so weeks of continuous writes from many lines stay bounded on
+disk:
+
+    raw   the samples as recorded, in blocks of up to `block` seconds
+          (one row per block: a float64 matrix, time first)
+    1s    per second and channel: count, min, max, mean
+    1m    per minute and channel: count, min, max, mean
+
+Writes never touch the disk on the caller's thread: observer() and write()
+only append to a bounded queue, and a writer thread drains it every
+`interval` seconds into one transaction (raw blocks plus both rollups,
+computed with numpy). Rollup rows are upserts that merge partial buckets,
+so a second or minute spread over several flushes is still exact. Old rows
+are deleted per resolution as data time moves on, and the freed pages are
+reused.
+
+query() picks the finest resolution that covers the range in at most
+`max_points` points, which is what the trend views ask for.
+
+    store = TimeSeriesStore("twin.db")
+    sim.observers.append(store.observer("line1"))
+    t, cols = store.query("line1", "vibration", start, end)
+
+    python -m conveyor_twin.store twin.db --conveyor line1 --channel vibration --last 3600
+    python -m conveyor_twin.store /tmp/bench.db --bench 20 --hours 24
+"""
+import argparse
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+from .telemetry import SIM_CHANNELS
+
+# Seconds of data kept at each resolution
+RETENTION = {"raw": 6 * 3600.0, "1s": 3 * 86400.0, "1m": 180 * 86400.0}
+BUCKET = {"1s": 1, "1m": 60}
+_RATE = 60.0    # Samples per second assumed when sizing raw queries
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS series (id INTEGER PRIMARY KEY, conveyor TEXT NOT NULL, channel TEXT NOT NULL,
+                                   UNIQUE (conveyor, channel));
+CREATE TABLE IF NOT EXISTS conveyors (id INTEGER PRIMARY KEY, name TEXT UNIQUE NOT NULL, channels TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS raw (conveyor INTEGER, t0 REAL, t1 REAL, n INTEGER, data BLOB,
+                                PRIMARY KEY (conveyor, t0)) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS rollup_1s (series INTEGER, t INTEGER, n INTEGER, min REAL, max REAL, mean REAL,
+                                      PRIMARY KEY (series, t)) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS rollup_1m (series INTEGER, t INTEGER, n INTEGER, min REAL, max REAL, mean REAL,
+                                      PRIMARY KEY (series, t)) WITHOUT ROWID;
+"""
+_UPSERT = """
+INSERT INTO rollup_{0} (series, t, n, min, max, mean) VALUES (?, ?, ?, ?, ?, ?)
+ON CONFLICT (series, t) DO UPDATE SET
+    mean = (mean * n + excluded.mean * excluded.n) / (n + excluded.n),
+    n = n + excluded.n, min = MIN(min, excluded.min), max = MAX(max, excluded.max)
+"""
+
+
+def _connect(path):
+    db = sqlite3.connect(path, timeout=30.0, check_same_thread=False)
+    db.execute("PRAGMA journal_mode=WAL")       # Readers don't wait for the writer
+    db.execute("PRAGMA synchronous=NORMAL")
+    return db
+
+
+def rollup(t, values, bucket):
+    """(bucket starts, n, min, max, mean per column) of rows sorted by time."""
+    keys = (np.floor(t / bucket) * bucket).astype(np.int64)
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    n = np.diff(np.r_[starts, len(keys)])
+    return (keys[starts], n, np.minimum.reduceat(values, starts), np.maximum.reduceat(values, starts),
+            np.add.reduceat(values, starts) / n[:, None])
+
+
+class TimeSeriesStore:
+    def __init__(self, path, channels=SIM_CHANNELS, retention=None, interval=1.0, block=10.0,
+                 capacity=1_000_000):
+        self.path = str(path)
+        self.channels = tuple(channels)
+        self.retention = {**RETENTION, **(retention or {})}
+        self.interval = interval            # Seconds between two flushes of the writer thread
+        self.block = block                  # Longest raw block (s)
+        self.pending = deque(maxlen=capacity)
+        self.written = 0                    # Rows stored
+        self.dropped = 0                    # Rows lost to a full queue
+        self.flushes = 0
+        self.latest = None                  # Newest data time stored, drives retention
+        self._conveyors = {}                # name -> (id, [series id per channel]), writer thread only
+        self._local = threading.local()
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._pruned = 0.0
+        db = _connect(self.path)
+        with db:
+            db.executescript(_SCHEMA)
+        db.close()
+        self._thread = threading.Thread(target=self._run, name="twin-store", daemon=True)
+        self._thread.start()
+
+    @classmethod
+    def from_env(cls, **kwargs):
+        """A store at TWIN_STORE if set, else None."""
+        path = os.environ.get("TWIN_STORE")
+        return cls(path, **kwargs) if path else None
+
+    # --- PRODUCERS (any thread) ---
+    def observer(self, conveyor="line1"):
+        """Tick observer recording a ConveyorSim as `conveyor`, in epoch seconds."""
+        pending, origin = self.pending, None
+
+        def sample(sim):
+            nonlocal origin
+            if origin is None:
+                origin = time.time() - sim.time
+            if len(pending) == pending.maxlen:
+                self.dropped += 1
+            pending.append((conveyor, (origin + sim.time, sim.vibration, sim.current, sim.speed,
+                                       sim.bottle_count, sim.bottles.n, float(sim.laser_on))))
+        return sample
+
+    def write(self, conveyor, rows):
+        """Queue rows (time, then one value per channel): a tuple or a 2-D array."""
+        rows = np.asarray(rows, dtype=np.float64)
+        if rows.ndim == 2:
+            self.pending.append((conveyor, rows))
+        else:
+            self.pending.append((conveyor, tuple(rows)))
+
+    def flush(self, timeout=30.0):
+        """Wait until everything queued so far is on disk."""
+        end = time.monotonic() + timeout
+        target = self.flushes + 2
+        while self.pending or self.flushes < target:
+            if time.monotonic() > end or not self._thread.is_alive():
+                return False
+            self._wake.set()
+            time.sleep(0.001)
+        return True
+
+    def close(self):
+        self._stop.set()
+        self._wake.set()
+        self._thread.join()
+
+    # --- WRITER THREAD ---
+    def _run(self):
+        db = _connect(self.path)
+        try:
+            while not self._stop.is_set():
+                self._wake.wait(self.interval)
+                self._wake.clear()
+                self._drain(db)
+            self._drain(db)
+        finally:
+            db.close()
+
+    def _drain(self, db):
+        batches = {}
+        pending = self.pending
+        for _ in range(len(pending)):
+            conveyor, rows = pending.popleft()
+            batches.setdefault(conveyor, []).append(rows)
+        with db:
+            for conveyor, parts in batches.items():
+                blocks = [p for p in parts if not isinstance(p, tuple)]
+                singles = [p for p in parts if isinstance(p, tuple)]  # Tick observer rows
+                if singles:
+                    blocks.append(np.array(singles, dtype=np.float64))
+                rows = np.vstack(blocks) if len(blocks) > 1 else blocks[0]
+                self._store(db, conveyor, rows[np.argsort(rows[:, 0], kind="stable")])
+            if self.latest is not None and self.latest - self._pruned >= 60.0:
+                self._prune(db)
+        self.flushes += 1
+
+    def _ids(self, db, conveyor):
+        if conveyor not in self._conveyors:
+            db.execute("INSERT OR IGNORE INTO conveyors (name, channels) VALUES (?, ?)",
+                       (conveyor, ",".join(self.channels)))
+            cid = db.execute("SELECT id FROM conveyors WHERE name = ?", (conveyor,)).fetchone()[0]
+            db.executemany("INSERT OR IGNORE INTO series (conveyor, channel) VALUES (?, ?)",
+                           [(conveyor, c) for c in self.channels])
+            ids = dict(db.execute("SELECT channel, id FROM series WHERE conveyor = ?", (conveyor,)))
+            self._conveyors[conveyor] = cid, [ids[c] for c in self.channels]
+        return self._conveyors[conveyor]
+
+    def _store(self, db, conveyor, rows):
+        cid, series = self._ids(db, conveyor)
+        t = rows[:, 0]
+        # Raw: blocks of at most `block` seconds
+        cuts = np.flatnonzero(np.diff(np.floor((t - t[0]) / self.block))) + 1
+        db.executemany("INSERT OR REPLACE INTO raw (conveyor, t0, t1, n, data) VALUES (?, ?, ?, ?, ?)",
+                       [(cid, float(b[0, 0]), float(b[-1, 0]), len(b), b.tobytes()) for b in np.split(rows, cuts)])
+        for level, bucket in BUCKET.items():
+            keys, n, lo, hi, mean = rollup(t, rows[:, 1:], bucket)
+            db.executemany(_UPSERT.format(level), [
+                (sid, k, c, a, b, m)
+                for j, sid in enumerate(series)
+                for k, c, a, b, m in zip(keys.tolist(), n.tolist(), lo[:, j].tolist(), hi[:, j].tolist(),
+                                         mean[:, j].tolist())
+            ])
+        self.written += len(rows)
+        self.latest = max(self.latest or t[-1], float(t[-1]))
+
+    def _prune(self, db):
+        latest = self.latest
+        db.execute("DELETE FROM raw WHERE t1 < ?", (latest - self.retention["raw"],))
+        for level in BUCKET:
+            db.execute(f"DELETE FROM rollup_{level} WHERE t < ?", (latest - self.retention[level],))
+        self._pruned = latest
+
+    # --- QUERIES (any thread) ---
+    def _reader(self):
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = self._local.db = _connect(self.path)
+        return db
+
+    def conveyors(self):
+        return [name for (name,) in self._reader().execute("SELECT name FROM conveyors ORDER BY name")]
+
+    def resolution(self, start, end, max_points=2000):
+        """Finest resolution covering [start, end] in at most `max_points` points."""
+        span = max(end - start, 0.0)
+        latest = self.latest if self.latest is not None else end
+        for level, step in (("raw", 1.0 / _RATE), ("1s", 1.0), ("1m", 60.0)):
+            if span / step <= max_points and start >= latest - self.retention[level]:
+                return level
+        return "1m"
+
+    def query(self, conveyor, channel, start, end, resolution=None, max_points=2000):
+        """(times, columns) of `channel` over [start, end]: columns is {"value": ...}
+        for raw data, else {"n", "min", "max", "mean"} per bucket."""
+        level = resolution or self.resolution(start, end, max_points)
+        db = self._reader()
+        if level == "raw":
+            row = db.execute("SELECT c.id, c.channels FROM conveyors c WHERE c.name = ?", (conveyor,)).fetchone()
+            if row is None:
+                return np.empty(0), {"value": np.empty(0)}
+            cid, channels = row
+            col = 1 + channels.split(",").index(channel)
+            blocks = db.execute("SELECT n, data FROM raw WHERE conveyor = ? AND t0 BETWEEN ? AND ? ORDER BY t0",
+                                (cid, start - self.block, end)).fetchall()
+            width = 1 + len(channels.split(","))
+            data = (np.concatenate([np.frombuffer(b, dtype=np.float64).reshape(n, width) for n, b in blocks])
+                    if blocks else np.empty((0, width)))
+            keep = (data[:, 0] >= start) & (data[:, 0] <= end)
+            return data[keep, 0], {"value": data[keep, col]}
+        rows = db.execute(
+            f"SELECT r.t, r.n, r.min, r.max, r.mean FROM rollup_{level} r JOIN series s ON s.id = r.series "
+            f"WHERE s.conveyor = ? AND s.channel = ? AND r.t BETWEEN ? AND ? ORDER BY r.t",
+            (conveyor, channel, int(np.floor(start / BUCKET[level]) * BUCKET[level]), end)).fetchall()
+        data = np.array(rows, dtype=np.float64).reshape(-1, 5)
+        return data[:, 0], {"n": data[:, 1], "min": data[:, 2], "max": data[:, 3], "mean": data[:, 4]}
+
+    def size(self):
+        """Bytes on disk, including the write-ahead log."""
+        return sum(os.path.getsize(p) for p in (self.path, self.path + "-wal") if os.path.exists(p))
+
+
+# --- CLI ---
+def _bench(path, conveyors, hours, rate):
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    store = TimeSeriesStore(path, retention={"raw": 3600.0})
+    rng = np.random.default_rng(0)
+    start = time.time() - hours * 3600
+    minute = int(60 * rate)
+    began = time.perf_counter()
+    for m in range(int(hours * 60)):
+        t = start + m * 60 + np.arange(minute) / rate
+        for c in range(conveyors):
+            rows = np.column_stack([t] + [rng.normal(1.0, 0.1, minute) for _ in store.channels])
+            store.write(f"line{c + 1:02d}", rows)
+        if len(store.pending) > 4 * conveyors:
+            store.flush()
+    store.flush(timeout=600)
+    elapsed = time.perf_counter() - began
+    rows = store.written
+    print(f"{rows:,} rows ({conveyors} conveyors x {hours:g} h at {rate:g} Hz, {len(store.channels)} channels) "
+          f"in {elapsed:.1f} s: {rows / elapsed:,.0f} rows/s, {rows / elapsed / rate / conveyors:,.0f}x real time; "
+          f"{store.size() / 1e6:.1f} MB on disk (raw kept {store.retention['raw'] / 3600:g} h)")
+    end = store.latest
+    for span in (60, 600, 3600, 6 * 3600, 24 * 3600):
+        if span > hours * 3600:
+            break
+        began = time.perf_counter()
+        t, cols = store.query("line01", "vibration", end - span, end)
+        level = store.resolution(end - span, end)
+        print(f"  last {span / 3600:5.2f} h: {len(t):6,} points at {level:3s} in {(time.perf_counter() - began) * 1e3:6.1f} ms")
+    store.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m conveyor_twin.store",
+                                     description="Query (or benchmark) a telemetry store")
+    parser.add_argument("path")
+    parser.add_argument("--conveyor", help="conveyor to query (default: list them)")
+    parser.add_argument("--channel", default="vibration")
+    parser.add_argument("--last", type=float, default=3600.0, help="seconds before the newest data")
+    parser.add_argument("--points", type=int, default=20, help="most points to print")
+    parser.add_argument("--bench", type=int, default=0, help="write N synthetic conveyors, then time queries")
+    parser.add_argument("--hours", type=float, default=6.0, help="bench: hours of data per conveyor")
+    parser.add_argument("--rate", type=float, default=60.0, help="bench: samples per second")
+    args = parser.parse_args(argv)
+
+    if args.bench:
+        _bench(args.path, args.bench, args.hours, args.rate)
+        return
+    if not os.path.exists(args.path):
+        raise SystemExit(f"{args.path}: no such store")
+    store = TimeSeriesStore(args.path)
+    try:
+        if not args.conveyor:
+            print("\n".join(store.conveyors()) or "(empty)")
+            return
+        newest = store._reader().execute("SELECT MAX(t1) FROM raw").fetchone()[0] or store._reader().execute(
+            "SELECT MAX(t) FROM rollup_1m").fetchone()[0]
+        if newest is None:
+            raise SystemExit("no data")
+        store.latest = newest
+        t, cols = store.query(args.conveyor, args.channel, newest - args.last, newest, max_points=args.points)
+        level = store.resolution(newest - args.last, newest, args.points)
+        print(f"{args.conveyor}/{args.channel}: {len(t)} points at {level}")
+        for i in range(len(t)):
+            stamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(t[i]))
+            print(stamp, "  ".join(f"{name} {values[i]:.3f}" for name, values in cols.items()))
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+"""Sensor telemetry history in fixed-size ring buffers.
+
+Every sample is one row of a preallocated float64 array, so recording never
+allocates and memory stays bounded however long the twin runs. Consumers
+read through cursors that only see rows they have not consumed yet, and the
+history can be flushed to disk as raw binary chunks.
+
+A ring may be written on the sim thread and read on the render thread:
+writers and read() take the ring's lock, and a reader that first decides
+how many rows it wants passes that count to read() so a row appended in
+between can't change the shape of what it gets.
+"""
+import json
+import struct
+import threading
+
+import numpy as np
+
+# Columns recorded from a ConveyorSim on every tick
+SIM_CHANNELS = ("vibration", "current", "speed", "bottle_count", "on_belt", "laser_on")
+
+_MAGIC = b"CVTL"
+_FILE_HEADER = struct.Struct("<4sI")       # magic, length of the JSON channel list
+_CHUNK_HEADER = struct.Struct("<QI")       # sequence number of the first row, rows
+
+
+class RingBuffer:
+    """Fixed-capacity buffer of rows; the oldest rows are overwritten."""
+
+    def __init__(self, capacity, width=1, dtype=np.float64):
+        self.capacity = capacity
+        self.data = np.zeros((capacity, width), dtype=dtype)
+        self.written = 0  # Total rows ever appended, i.e. sequence of the next row
+        self.lock = threading.RLock()
+
+    def __len__(self):
+        return min(self.written, self.capacity)
+
+    @property
+    def oldest(self):
+        """Sequence number of the oldest row still held."""
+        return max(0, self.written - self.capacity)
+
+    def append(self, row):
+        with self.lock:
+            self.data[self.written % self.capacity] = row
+            self.written += 1
+
+    def extend(self, rows):
+        rows = np.asarray(rows, dtype=self.data.dtype).reshape(-1, self.data.shape[1])
+        total = len(rows)
+        rows = rows[-self.capacity:]
+        with self.lock:
+            start = (self.written + total - len(rows)) % self.capacity
+            head = min(len(rows), self.capacity - start)
+            self.data[start:start + head] = rows[:head]
+            self.data[:len(rows) - head] = rows[head:]
+            self.written += total
+
+    def read(self, seq, out=None, count=None):
+        """Rows from sequence `seq` (clamped to the oldest held) to the newest, or
+        at most `count` rows from there."""
+        with self.lock:
+            seq = max(seq, self.oldest)
+            n = self.written - seq if count is None else min(count, self.written - seq)
+            if out is None:
+                out = np.empty((n, self.data.shape[1]), dtype=self.data.dtype)
+            start = seq % self.capacity
+            head = min(n, self.capacity - start)
+            out[:head] = self.data[start:start + head]
+            out[head:n] = self.data[:n - head]
+        return out[:n]
+
+    def latest(self, n):
+        return self.read(self.written - n)
+
+
+class Cursor:
+    """Independent read position of one consumer."""
+
+    def __init__(self, ring, seq):
+        self.ring = ring
+        self.seq = seq
+        self.dropped = 0  # Rows overwritten before this consumer read them
+
+    def pending(self):
+        return self.ring.written - max(self.seq, self.ring.oldest)
+
+    def read(self):
+        """All new rows as one array (a copy), advancing the cursor."""
+        ring = self.ring
+        with ring.lock:
+            if self.seq < ring.oldest:
+                self.dropped += ring.oldest - self.seq
+                self.seq = ring.oldest
+            rows = ring.read(self.seq)
+        self.seq += len(rows)
+        return rows
+
+    def __iter__(self):
+        """Yield new rows one by one until the cursor has caught up.
+
+        Rows are views into the ring: copy them if kept past the next wrap.
+        """
+        while self.seq < self.ring.written:
+            if self.seq < self.ring.oldest:
+                self.dropped += self.ring.oldest - self.seq
+                self.seq = self.ring.oldest
+            row = self.ring.data[self.seq % self.ring.capacity]
+            self.seq += 1
+            yield row
+
+
+class Telemetry:
+    def __init__(self, channels=SIM_CHANNELS, capacity=60 * 60 * 10):
+        self.channels = tuple(channels)
+        self.column = {name: i + 1 for i, name in enumerate(self.channels)}  # Column 0 is time
+        self.ring = RingBuffer(capacity, 1 + len(self.channels))
+        self._row = np.zeros(1 + len(self.channels))
+        self._flushed = 0
+
+    def __len__(self):
+        return len(self.ring)
+
+    # --- RECORDING ---
+    def record(self, t, values):
+        row = self._row
+        row[0] = t
+        row[1:] = values
+        self.ring.append(row)
+
+    def sample(self, sim):
+        """Tick observer: record a ConveyorSim into the SIM_CHANNELS columns."""
+        row = self._row
+        row[0] = sim.time
+        row[1] = sim.vibration
+        row[2] = sim.current
+        row[3] = sim.speed
+        row[4] = sim.bottle_count
+        row[5] = sim.bottles.n
+        row[6] = sim.laser_on
+        self.ring.append(row)
+
+    # --- CONSUMERS ---
+    def cursor(self, from_start=False):
+        return Cursor(self.ring, self.ring.oldest if from_start else self.ring.written)
+
+    def stream(self, channel, cursor=None):
+        """Yield (time, value) of one channel for every row not read yet."""
+        col = self.column[channel]
+        for row in cursor or self.cursor(from_start=True):
+            yield row[0], row[col]
+
+    def history(self, channel, n=None):
+        """Times and values of the last `n` samples (all held if None)."""
+        ring = self.ring
+        with ring.lock:
+            rows = ring.latest(len(ring) if n is None else min(n, len(ring)))
+        return rows[:, 0], rows[:, self.column[channel]]
+
+    # --- PERSISTENCE ---
+    def flush(self, fh):
+        """Append rows recorded since the last flush to an open binary file.
+
+        Writes the channel header first if the file is empty. Rows already
+        overwritten in the ring before this flush are lost.
+        """
+        if fh.tell() == 0:
+            names = json.dumps(("time",) + self.channels).encode()
+            fh.write(_FILE_HEADER.pack(_MAGIC, len(names)) + names)
+        with self.ring.lock:
+            seq = max(self._flushed, self.ring.oldest)
+            rows = self.ring.read(seq)
+        if len(rows):
+            fh.write(_CHUNK_HEADER.pack(seq, len(rows)))
+            fh.write(rows.tobytes())
+        self._flushed = seq + len(rows)
+        return len(rows)
+
+
+def read_chunks(path):
+    """Yield (channel names, first sequence number, rows) for each flushed chunk."""
+    with open(path, "rb") as fh:
+        magic, size = _FILE_HEADER.unpack(fh.read(_FILE_HEADER.size))
+        if magic != _MAGIC:
+            raise ValueError(f"{path} is not a telemetry file")
+        names = tuple(json.loads(fh.read(size)))
+        while True:
+            header = fh.read(_CHUNK_HEADER.size)
+            if len(header) < _CHUNK_HEADER.size:
+                return
+            seq, n = _CHUNK_HEADER.unpack(header)
+            rows = np.frombuffer(fh.read(n * 8 * len(names)), dtype=np.float64).reshape(n, len(names))
+            yield names, seq, rows
@@ -0,0 +1,457 @@
+"""Browser dashboard served from the twin process.
+
+An embedded asyncio HTTP server (on a background thread, like the gateway)
+serves a single-page dashboard at / and pushes the twin's state to every
+open page over a WebSocket at /ws. Any number of supervisor screens can
+watch one simulation without a 3D window each.
+
+The tick observer only takes an immutable snapshot of the sim, at most `hz`
+times a second of wall time (bottle positions quantized to centimetres). It
+runs on whichever thread steps the sim: the render loop, or the sim thread
+under a SimThread runner. The server thread then sends each page the difference between the snapshot
+that page last received and the newest one:
+
+    hello   {"type": "hello", "line": {...}, "control": bool, "v": n, "state": {...}}
+    delta   {"type": "delta", "v": n, "set": {changed values},
+             "bottles": {"drop": [ids], "add": [[id, x, z], ...], "shift": dx | "move": [[id, x], ...]}}
+
+The delta from a given base to the newest snapshot is encoded once and
+reused for every page that had the same base, so a hundred pages updated at
+the same rate cost about one encode. Each page asks for its own rate
+(/ws?hz=5, capped by the server). A page whose socket is backed up is
+skipped until it drains; its next delta spans everything it missed
+(coalescing), so a slow screen never queues stale frames.
+
+    python -m conveyor_twin.web --address 0.0.0.0:8080      # headless twin + dashboard
+    python -m conveyor_twin.web --bench 150 --seconds 10     # tick rate with 150 viewers
+"""
+import argparse
+import asyncio
+import json
+import os
+import threading
+import time
+from collections import deque
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+
+from . import ws
+from .gateway import _address
+from .sim import canonical_state
+
+
+class Snapshot:
+    """Immutable state of the twin at one instant."""
+    __slots__ = ("version", "values", "ids", "x", "z")
+
+    def __init__(self, version, values, ids, x, z):
+        self.version = version
+        self.values = values            # {name: scalar}, already rounded for display
+        self.ids = ids                  # Bottle ids, int64
+        self.x = x                      # Positions (cm), int32
+        self.z = z
+
+    def full(self):
+        return {**self.values, "bottles": [[int(i), int(x), int(z)]
+                                           for i, x, z in zip(self.ids, self.x, self.z)]}
+
+
+def diff(old, new):
+    """Delta message turning `old` into `new`."""
+    changed = {k: v for k, v in new.values.items() if old.values.get(k) != v}
+    common, old_at, new_at = np.intersect1d(old.ids, new.ids, assume_unique=True, return_indices=True)
+    bottles = {}
+    if len(common) < len(old.ids):
+        bottles["drop"] = np.setdiff1d(old.ids, common, assume_unique=True).tolist()
+    added = np.setdiff1d(np.arange(len(new.ids)), new_at, assume_unique=True)
+    if len(added):
+        bottles["add"] = np.stack([new.ids[added], new.x[added], new.z[added]], axis=1).tolist()
+    if len(common):
+        dx = new.x[new_at] - old.x[old_at]
+        if dx.min() == dx.max():
+            if dx[0]:
+                bottles["shift"] = int(dx[0])  # The whole belt moved as one
+        else:
+            moved = dx != 0
+            bottles["move"] = np.stack([common[moved], new.x[new_at][moved]], axis=1).tolist()
+    message = {"type": "delta", "v": new.version, "set": changed}
+    if bottles:
+        message["bottles"] = bottles
+    return message
+
+
+class _Viewer:
+    __slots__ = ("socket", "period", "due", "base", "sent", "skipped")
+
+    def __init__(self, socket, hz):
+        self.socket = socket
+        self.period = 1.0 / hz
+        self.due = 0.0
+        self.base = None                # Snapshot this page has
+        self.sent = 0
+        self.skipped = 0                # Updates coalesced because the socket was backed up
+
+
+class WebDashboard:
+    def __init__(self, address=":8080", line=None, hz=30.0, default_hz=10.0, control=False, high_water=1 << 16,
+                 store=None, conveyor="line1"):
+        """`line` (a LineModel) gives the belt layout drawn by the pages; `control`
+        lets pages send NORMAL/WEAR/JAM commands, collected by apply(). With a
+        TimeSeriesStore, /history.json serves `conveyor`'s trends from it."""
+        self.address = _address(address, 8080)
+        self.store = store
+        self.conveyor = conveyor
+        self.layout = self._layout(line)
+        self.hz = hz                        # Most snapshots per second, and the fastest a page may ask for
+        self.default_hz = default_hz
+        self.control = control
+        self.high_water = high_water        # Bytes buffered per page before it is skipped
+        self.latest = None                  # Newest Snapshot, replaced (never mutated) by sample()
+        self.inbox = deque()
+        self.viewers = set()
+        self.messages = 0
+        self.bytes = 0
+        self.encodes = 0                    # Distinct deltas encoded
+        self._version = 0
+        self._next_sample = 0.0
+        self._thread = self._loop = self._stop = None
+
+    @classmethod
+    def from_env(cls, **kwargs):
+        """A started dashboard if TWIN_WEB (host:port) is set, else None."""
+        address = os.environ.get("TWIN_WEB")
+        if not address:
+            return None
+        return cls(address, control=bool(os.environ.get("TWIN_WEB_CONTROL")), **kwargs).start()
+
+    @staticmethod
+    def _layout(line):
+        if line is None:
+            from .line import load_line
+            line = load_line("v2")
+        cfg = line.config
+        return {"name": line.name, "spawn_x": cfg.spawn_x, "exit_x": cfg.exit_x, "spread_z": cfg.spread_z,
+                "bottle_length": cfg.bottle_length, "jam_points": list(cfg.jam_points),
+                "sensors": [{"name": s.name, "x": s.x, "window": s.window} for s in line.sensors]}
+
+    # --- SIM SIDE (whichever thread steps the sim) ---
+    def sample(self, sim):
+        """Tick observer for a ConveyorSim; snapshots at most `hz` times a second (wall clock).
+
+        The Snapshot is built from copies and published by replacing `latest`
+        in one assignment. The server thread reads `latest` once per use, so
+        it never sees a half-built one and needs no lock (as with runner.Frame).
+        """
+        now = time.monotonic()
+        if now < self._next_sample:
+            return
+        self._next_sample = now + 1.0 / self.hz
+        store = sim.bottles
+        self._version += 1
+        self.latest = Snapshot(self._version, {
+            "t": round(sim.time, 2), "status": sim.status, "vibration": round(sim.vibration, 2),
+            "current": round(sim.current, 2), "speed": round(sim.speed, 2), "count": sim.bottle_count,
+            "on_belt": store.n, "laser": bool(sim.laser_on),
+        }, store.ids.copy(), np.rint(store.x * 100).astype(np.int32), np.rint(store.z * 100).astype(np.int32))
+
+    def poll(self):
+        inbox = self.inbox
+        return [inbox.popleft() for _ in range(len(inbox))]
+
+    def apply(self, sim):
+        """Apply the commands sent from the pages (only with control on)."""
+        for status in self.poll():
+            if status != sim.status:
+                sim.set_status(status)
+
+    def start(self):
+        ready = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(ready,), name="twin-web", daemon=True)
+        self._thread.start()
+        ready.wait()
+        return self
+
+    def stop(self, timeout=2.0):
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._stop.set)
+            self._thread.join(timeout)
+
+    # --- SERVER THREAD ---
+    def _run(self, ready):
+        asyncio.run(self._main(ready))
+
+    async def _main(self, ready):
+        self._loop = asyncio.get_running_loop()
+        self._stop = asyncio.Event()
+        server = await asyncio.start_server(self._client, *self.address, backlog=512)
+        self.address = server.sockets[0].getsockname()[:2]
+        pump = asyncio.ensure_future(self._pump())
+        ready.set()
+        await self._stop.wait()
+        pump.cancel()
+        for viewer in list(self.viewers):
+            await viewer.socket.close()
+        server.close()
+
+    async def _client(self, reader, writer):
+        try:
+            method, target, headers = await ws.read_request(reader)
+        except (ConnectionError, ValueError):
+            writer.close()
+            return
+        url = urlsplit(target)
+        if url.path == "/ws" and ws.is_upgrade(headers):
+            query = parse_qs(url.query)
+            try:
+                hz = min(float(query.get("hz", [self.default_hz])[0]), self.hz)
+            except ValueError:
+                hz = self.default_hz
+            await self._viewer(await ws.accept(reader, writer, headers), max(hz, 0.1))
+            return
+        if method == "GET" and url.path == "/":
+            self._respond(writer, 200, "text/html; charset=utf-8", PAGE.encode())
+        elif method == "GET" and url.path == "/state.json":
+            snap = self.latest
+            body = {"v": snap.version, "state": snap.full()} if snap else {}
+            self._respond(writer, 200, "application/json", json.dumps(body).encode())
+        elif method == "GET" and url.path == "/history.json" and self.store is not None:
+            body = await self._loop.run_in_executor(None, self._history, parse_qs(url.query))
+            self._respond(writer, 200 if body else 404, "application/json", body or b"{}")
+        else:
+            self._respond(writer, 404, "text/plain", b"not found")
+        try:
+            await writer.drain()
+            writer.close()
+        except ConnectionError:
+            pass
+
+    def _history(self, query):
+        """/history.json?channel=vibration&seconds=600&points=600, off the event loop."""
+        try:
+            channel = query.get("channel", ["vibration"])[0]
+            seconds = float(query.get("seconds", [600])[0])
+            points = int(query.get("points", [600])[0])
+            end = self.store.latest or time.time()
+            t, cols = self.store.query(self.conveyor, channel, end - seconds, end, max_points=max(points, 1))
+        except ValueError:
+            return None
+        values = cols.get("value", cols.get("mean"))
+        return json.dumps({"channel": channel, "t": t.tolist(), "values": values.tolist(),
+                           **({"min": cols["min"].tolist(), "max": cols["max"].tolist()} if "min" in cols else {})}
+                          ).encode()
+
+    @staticmethod
+    def _respond(writer, status, kind, body):
+        reason = {200: "OK", 404: "Not Found"}[status]
+        writer.write(f"HTTP/1.1 {status} {reason}\r\nContent-Type: {kind}\r\nContent-Length: {len(body)}\r\n"
+                     f"Cache-Control: no-store\r\nConnection: close\r\n\r\n".encode() + body)
+
+    async def _viewer(self, socket, hz):
+        viewer = _Viewer(socket, hz)
+        snap = self.latest
+        hello = {"type": "hello", "line": self.layout, "control": self.control,
+                 "v": snap.version if snap else 0, "state": snap.full() if snap else None}
+        socket.send(json.dumps(hello))
+        viewer.base = snap
+        viewer.due = time.monotonic() + viewer.period
+        self.viewers.add(viewer)
+        try:
+            while (message := await socket.recv()) is not None:
+                if not self.control:
+                    continue
+                try:
+                    self.inbox.append(canonical_state(str(json.loads(message)["cmd"]).upper()))
+                except (KeyError, TypeError, ValueError):
+                    pass
+        finally:
+            self.viewers.discard(viewer)
+
+    async def _pump(self):
+        period = 1.0 / self.hz
+        while True:
+            await asyncio.sleep(period)
+            snap = self.latest
+            if snap is None or not self.viewers:
+                continue
+            now = time.monotonic()
+            encoded = {}                    # Base version -> frame, for this round
+            for viewer in list(self.viewers):
+                if now < viewer.due or viewer.base is snap:
+                    continue
+                if viewer.socket.buffered() > self.high_water:
+                    viewer.skipped += 1     # Coalesced into the next delta it can take
+                    continue
+                key = viewer.base.version if viewer.base else None
+                frame = encoded.get(key)
+                if frame is None:
+                    if viewer.base is None:
+                        message = {"type": "full", "v": snap.version, "state": snap.full()}
+                    else:
+                        message = diff(viewer.base, snap)
+                    frame = encoded[key] = json.dumps(message, separators=(",", ":"))
+                    self.encodes += 1
+                viewer.socket.send(frame)
+                viewer.base = snap
+                viewer.due = max(viewer.due + viewer.period, now)
+                viewer.sent += 1
+                self.messages += 1
+                self.bytes += len(frame)
+
+
+# --- PAGE ---
+PAGE = """<!doctype html>
+<html><head><meta charset="utf-8"><title>Conveyor twin</title>
+<style>
+body{margin:0;background:#19191e;color:#ddd;font:14px system-ui,sans-serif}
+header{display:flex;gap:24px;align-items:baseline;padding:12px 16px}
+#status{font-size:22px;font-weight:600}
+.NORMAL{color:#4c4}.WEAR{color:#f90}.JAM{color:#f44}
+canvas{display:block;width:100%}
+button{margin-right:6px}#link{color:#888;margin-left:auto}
+</style></head><body>
+<header><span id="status">...</span><span id="vib"></span><span id="cur"></span><span id="cnt"></span>
+<span id="ctl" hidden><button>NORMAL</button><button>WEAR</button><button>JAM</button></span>
+<span id="link">connecting</span></header>
+<canvas id="belt" height="160"></canvas><canvas id="trend" height="80"></canvas>
+<script>
+const $ = id => document.getElementById(id);
+let line, state, bottles = new Map(), trend = [], socket;
+function connect() {
+  socket = new WebSocket(`ws://${location.host}/ws${location.search}`);
+  socket.onmessage = e => {
+    const m = JSON.parse(e.data);
+    if (m.type === "hello") { line = m.line; $("ctl").hidden = !m.control; if (m.state) load(m.state); seed(); }
+    else if (m.type === "full") load(m.state);
+    else if (m.type === "delta") patch(m);
+    draw();
+  };
+  socket.onopen = () => $("link").textContent = "live";
+  socket.onclose = () => { $("link").textContent = "reconnecting"; setTimeout(connect, 1000); };
+}
+function seed() {  // Fill the trend from the server's history, when it keeps one
+  fetch("/history.json?channel=vibration&seconds=60&points=600").then(r => r.ok ? r.json() : null)
+    .then(h => { if (h) trend = h.values.slice(-600); }).catch(() => {});
+}
+function load(s) { state = {...s}; bottles = new Map(s.bottles.map(([i, x, z]) => [i, [x, z]])); delete state.bottles; }
+function patch(m) {
+  Object.assign(state, m.set);
+  const b = m.bottles || {};
+  (b.drop || []).forEach(i => bottles.delete(i));
+  if (b.shift) bottles.forEach(p => p[0] += b.shift);
+  (b.move || []).forEach(([i, x]) => bottles.get(i)[0] = x);
+  (b.add || []).forEach(([i, x, z]) => bottles.set(i, [x, z]));
+}
+function draw() {
+  if (!state || !line) return;
+  $("status").textContent = state.status; $("status").className = state.status;
+  $("vib").textContent = `vibration ${state.vibration.toFixed(2)} mm/s`;
+  $("cur").textContent = `current ${state.current.toFixed(2)} A`;
+  $("cnt").textContent = `bottles ${state.count}`;
+  trend.push(state.vibration); if (trend.length > 600) trend.shift();
+  const c = $("belt"), g = c.getContext("2d"); c.width = c.clientWidth;
+  const len = line.exit_x - line.spawn_x, sx = x => (x - line.spawn_x) / len * (c.width - 20) + 10;
+  const half = Math.max(line.spread_z, 0.5) + 0.6, sz = z => 80 + z / half * 60;
+  g.fillStyle = "#111"; g.fillRect(10, 20, c.width - 20, 120);
+  g.fillStyle = "#a33"; line.jam_points.forEach(x => g.fillRect(sx(x) - 1, 20, 2, 120));
+  line.sensors.forEach(s => { g.fillStyle = state.laser ? "#4c4" : "#c44"; g.fillRect(sx(s.x) - 2, 14, 4, 132); });
+  g.fillStyle = "#0cf"; const w = Math.max(2, line.bottle_length / len * (c.width - 20));
+  bottles.forEach(([x, z]) => g.fillRect(sx(x / 100) - w / 2, sz(z / 100) - 6, w, 12));
+  const t = $("trend"), h = t.getContext("2d"); t.width = t.clientWidth;
+  h.clearRect(0, 0, t.width, t.height); h.strokeStyle = "#f90"; h.beginPath();
+  trend.forEach((v, i) => h.lineTo(i / 600 * t.width, t.height - v / 8 * t.height)); h.stroke();
+}
+document.querySelectorAll("#ctl button").forEach(b => b.onclick = () => socket.send(JSON.stringify({cmd: b.textContent})));
+connect();
+</script></body></html>
+"""
+
+
+# --- CLI ---
+def _viewers_process(address, n, seconds, hz, results):
+    """Open `n` pages' sockets from another process and count what they receive."""
+    async def run():
+        async def page():
+            socket = await ws.connect(*address, path=f"/ws?hz={hz}")
+            received = size = 0
+            end = time.monotonic() + seconds
+            while time.monotonic() < end:
+                try:
+                    message = await asyncio.wait_for(socket.recv(), end - time.monotonic())
+                except asyncio.TimeoutError:
+                    break
+                if message is None:
+                    break
+                received += 1
+                size += len(message)
+            await socket.close()
+            return received, size
+        return await asyncio.gather(*(page() for _ in range(n)))
+    results.put(asyncio.run(run()))
+
+
+def _tick_rate(sim, seconds):
+    start, ticks = time.perf_counter(), sim.tick
+    while time.perf_counter() - start < seconds:
+        sim.advance(1 / 60)
+        time.sleep(0)
+    return (sim.tick - ticks) / (time.perf_counter() - start)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m conveyor_twin.web",
+                                     description="Serve the browser dashboard of a headless twin")
+    parser.add_argument("--address", default=":8080", help="listen host:port")
+    parser.add_argument("--line", default="v2", help="line preset or .toml/.yaml file")
+    parser.add_argument("--control", action="store_true", help="let pages switch the state")
+    parser.add_argument("--bench", type=int, default=0, help="measure the tick rate with N viewers")
+    parser.add_argument("--seconds", type=float, default=10.0, help="bench: seconds per measurement")
+    parser.add_argument("--hz", type=float, default=10.0, help="bench: update rate each viewer asks for")
+    args = parser.parse_args(argv)
+
+    from .line import load_line
+    line = load_line(args.line)
+    sim = line.sim()
+    if args.bench:
+        import multiprocessing
+        sim.run(30.0)
+        alone = _tick_rate(sim, args.seconds)
+        web = WebDashboard("127.0.0.1:0", line=line).start()
+        sim.observers.append(web.sample)
+        results = multiprocessing.Queue()
+        pages = multiprocessing.Process(target=_viewers_process,
+                                        args=(web.address, args.bench, args.seconds + 2, args.hz, results))
+        pages.start()
+        while len(web.viewers) < args.bench and pages.is_alive():
+            sim.advance(1 / 60)
+            time.sleep(0.001)
+        served = _tick_rate(sim, args.seconds)
+        counts = results.get()
+        pages.join()
+        web.stop()
+        received = sum(c for c, _ in counts)
+        print(f"sim alone {alone:,.0f} ticks/s; with {args.bench} viewers at {args.hz:g} Hz {served:,.0f} ticks/s "
+              f"({served / alone:.0%})")
+        print(f"{received:,} updates received ({received / args.bench / (args.seconds + 2):.1f}/s per viewer, "
+              f"{sum(s for _, s in counts) / max(received, 1):.0f} B each); {web.encodes:,} encodes for "
+              f"{web.messages:,} sends")
+        return
+
+    web = WebDashboard(args.address, line=line, control=args.control).start()
+    sim.observers.append(web.sample)
+    print(f"dashboard on http://{web.address[0]}:{web.address[1]}/ (Ctrl+C to stop)")
+    last = time.perf_counter()
+    try:
+        while True:
+            time.sleep(sim.config.dt)
+            now = time.perf_counter()
+            sim.advance(now - last)
+            last = now
+            web.apply(sim)
+    except KeyboardInterrupt:
+        web.stop()
+        print(f"{web.messages:,} updates sent ({web.bytes:,} bytes) in {web.encodes:,} encodes")
+
+
+if __name__ == "__main__":
+    main()
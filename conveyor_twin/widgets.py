@@ -0,0 +1,109 @@
+"""Trend and diagnostic widgets for the Ursina dashboards.
+
+A Sparkline draws the recent history of one telemetry channel as a line
+strip in camera.ui. All buffers are allocated once: history is read from the
+ring straight into a preallocated array and the scaled points are written
+into the vertex buffer in place, so a refresh allocates no arrays.
+
+A ProfileOverlay shows the Profiler breakdown (and other diagnostics, such
+as the bottle pool) and is toggled with a key.
+"""
+import time
+
+import numpy as np
+from panda3d.core import Geom, GeomEnums, GeomLinestrips, GeomNode, GeomVertexData, GeomVertexFormat
+from ursina import Entity, Text, camera, color
+
+
+class Sparkline(Entity):
+    def __init__(self, telemetry, channel, points=120, stride=30, size=(0.3, 0.06), hz=4,
+                 value_range=None, line_color=color.cyan, **kwargs):
+        """Last points * stride samples of `channel`, one point every `stride` samples."""
+        kwargs.setdefault("parent", camera.ui)
+        super().__init__(**kwargs)
+        self.ring = telemetry.ring
+        self.col = telemetry.column[channel]
+        self.points = points
+        self.stride = stride
+        self.size = size
+        self.value_range = value_range  # (lo, hi), or None to fit the visible window
+        self.period = 1.0 / hz
+        self._due = 0.0
+        self._seen = -1
+        self._rows = np.zeros((points * stride, self.ring.data.shape[1]), dtype=self.ring.data.dtype)
+        self._ys = np.zeros(points)
+        self._verts = np.zeros((points, 3), dtype=np.float32)
+        self._verts[:, 0] = np.linspace(-size[0] / 2, size[0] / 2, points)
+
+        vdata = GeomVertexData("sparkline", GeomVertexFormat.get_v3(), GeomEnums.UH_dynamic)
+        vdata.set_num_rows(points)
+        prim = GeomLinestrips(GeomEnums.UH_static)
+        prim.add_consecutive_vertices(0, points)
+        prim.close_primitive()
+        geom = Geom(vdata)
+        geom.add_primitive(prim)
+        self._node = GeomNode("sparkline")
+        self._node.add_geom(geom)
+        np_ = self.attach_new_node(self._node)
+        np_.set_color(line_color)
+        np_.set_light_off()
+        self.refresh()
+
+    def update(self):
+        now = time.perf_counter()
+        if now >= self._due and self.ring.written != self._seen:
+            self._due = now + self.period
+            self.refresh()
+
+    def refresh(self):
+        ring, rows, ys = self.ring, self._rows, self._ys
+        # The ring may be filled on the sim thread: size the read from one look at
+        # `written` and pass the count, so a row landing meanwhile isn't read
+        with ring.lock:
+            self._seen = written = ring.written
+            k = min(len(rows), written, ring.capacity)
+            if k:
+                ring.read(written - k, out=rows[len(rows) - k:], count=k)
+        if k == 0:
+            ys[:] = 0.0
+        else:
+            rows[:len(rows) - k, self.col] = rows[len(rows) - k, self.col]  # Flat line before the first sample
+            ys[:] = rows[self.stride - 1::self.stride, self.col]
+        lo, hi = self.value_range or (ys.min(), ys.max())
+        span = hi - lo if hi > lo else 1.0
+        np.subtract(ys, lo, out=ys)
+        np.multiply(ys, self.size[1] / span, out=ys)
+        np.clip(ys, 0.0, self.size[1], out=ys)
+        np.subtract(ys, self.size[1] / 2, out=ys)
+        self._verts[:, 1] = ys
+        vdata = self._node.modify_geom(0).modify_vertex_data()
+        memoryview(vdata.modify_array(0)).cast("B").cast("f")[:] = self._verts.ravel()
+
+
+class ProfileOverlay(Text):
+    def __init__(self, profiler, key="f3", hz=4, extra=(), **kwargs):
+        """Phase breakdown and frame-time percentiles; `key` turns profiling on and off.
+        Each callable of `extra` adds a line of its own (e.g. Pool.report)."""
+        kwargs.setdefault("parent", camera.ui)
+        kwargs.setdefault("position", (-0.85, 0.45))
+        kwargs.setdefault("scale", 0.8)
+        kwargs.setdefault("background", True)
+        super().__init__(text="profiler", ignore=False, **kwargs)  # Text ignores update/input by default
+        self.profiler = profiler
+        self.key = key
+        self.extra = extra
+        self.period = 1.0 / hz
+        self._due = 0.0
+        self.visible = profiler.enabled
+
+    def input(self, key):
+        if key == self.key:
+            self.visible = self.profiler.toggle()
+            self._due = 0.0
+
+    def update(self):
+        self.profiler.frame()
+        now = time.perf_counter()
+        if self.visible and now >= self._due:
+            self._due = now + self.period
+            self.text = "\n".join([self.profiler.report()] + [line() for line in self.extra])
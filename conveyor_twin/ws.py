@@ -0,0 +1,153 @@
+"""Minimal WebSocket (RFC 6455) endpoints over asyncio streams.
+
+Text and binary messages, ping/pong and close, with no dependency beyond
+the standard library. Server connections are accepted from an already
+parsed HTTP request, so an HTTP server can upgrade some of its routes.
+"""
+import asyncio
+import base64
+import hashlib
+import os
+import struct
+
+_GUID = b"258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+TEXT, BINARY, CLOSE, PING, PONG = 0x1, 0x2, 0x8, 0x9, 0xA
+
+
+async def read_request(reader):
+    """(method, path, headers) of an HTTP/1.1 request; headers are lower-cased."""
+    line = (await reader.readline()).decode("latin-1").strip()
+    if not line:
+        raise ConnectionError("connection closed before the request line")
+    method, path, _ = line.split(" ", 2)
+    headers = {}
+    while True:
+        line = (await reader.readline()).decode("latin-1").strip()
+        if not line:
+            return method, path, headers
+        name, _, value = line.partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+
+def is_upgrade(headers):
+    return headers.get("upgrade", "").lower() == "websocket" and "sec-websocket-key" in headers
+
+
+def _accept_key(key):
+    return base64.b64encode(hashlib.sha1(key.encode() + _GUID).digest()).decode()
+
+
+def _frame(opcode, data, mask):
+    n = len(data)
+    head = bytes((0x80 | opcode,))
+    bit = 0x80 if mask else 0
+    if n < 126:
+        head += bytes((bit | n,))
+    elif n < 1 << 16:
+        head += bytes((bit | 126,)) + struct.pack("!H", n)
+    else:
+        head += bytes((bit | 127,)) + struct.pack("!Q", n)
+    if not mask:
+        return head + data
+    key = os.urandom(4)
+    return head + key + _apply_mask(data, key)
+
+
+def _apply_mask(data, key):
+    # XOR with the repeated 4-byte key, done on one big integer instead of per byte
+    n = len(data)
+    if not n:
+        return b""
+    pad = (key * (n // 4 + 1))[:n]
+    return (int.from_bytes(data, "little") ^ int.from_bytes(pad, "little")).to_bytes(n, "little")
+
+
+class WebSocket:
+    def __init__(self, reader, writer, client=False):
+        self.reader = reader
+        self.writer = writer
+        self.client = client        # Clients mask what they send, servers don't
+        self.closed = False
+
+    def send(self, message):
+        """Queue a text (str) or binary (bytes) message; never waits."""
+        if self.closed:
+            return
+        if isinstance(message, str):
+            self.writer.write(_frame(TEXT, message.encode(), self.client))
+        else:
+            self.writer.write(_frame(BINARY, message, self.client))
+
+    def buffered(self):
+        return self.writer.transport.get_write_buffer_size()
+
+    async def drain(self):
+        await self.writer.drain()
+
+    async def recv(self):
+        """Next text (str) or binary (bytes) message, or None once closed."""
+        parts, kind = [], None
+        while not self.closed:
+            try:
+                head = await self.reader.readexactly(2)
+                n = head[1] & 0x7F
+                if n == 126:
+                    n = struct.unpack("!H", await self.reader.readexactly(2))[0]
+                elif n == 127:
+                    n = struct.unpack("!Q", await self.reader.readexactly(8))[0]
+                key = await self.reader.readexactly(4) if head[1] & 0x80 else None
+                data = await self.reader.readexactly(n)
+            except (asyncio.IncompleteReadError, ConnectionError):
+                self.closed = True
+                return None
+            if key:
+                data = _apply_mask(data, key)
+            opcode = head[0] & 0x0F
+            if opcode == PING:
+                self.writer.write(_frame(PONG, data, self.client))
+            elif opcode == CLOSE:
+                await self.close()
+                return None
+            elif opcode != PONG:
+                kind = kind or opcode
+                parts.append(data)
+                if head[0] & 0x80:
+                    data = b"".join(parts)
+                    return data.decode() if kind == TEXT else data
+        return None
+
+    async def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            self.writer.write(_frame(CLOSE, b"", self.client))
+            self.writer.close()
+            await self.writer.wait_closed()
+        except ConnectionError:
+            pass
+
+
+async def accept(reader, writer, headers):
+    """Answer an upgrade request read with read_request()."""
+    writer.write(
+        b"HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+        b"Sec-WebSocket-Accept: " + _accept_key(headers["sec-websocket-key"]).encode() + b"\r\n\r\n"
+    )
+    await writer.drain()
+    return WebSocket(reader, writer)
+
+
+async def connect(host, port, path="/"):
+    reader, writer = await asyncio.open_connection(host, port)
+    key = base64.b64encode(os.urandom(16)).decode()
+    writer.write(
+        f"GET {path} HTTP/1.1\r\nHost: {host}:{port}\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+        f"Sec-WebSocket-Key: {key}\r\nSec-WebSocket-Version: 13\r\n\r\n".encode()
+    )
+    status = await reader.readline()
+    if b" 101 " not in status:
+        raise ConnectionError(f"upgrade refused: {status.decode().strip()}")
+    while (await reader.readline()).strip():
+        pass
+    return WebSocket(reader, writer, client=True)
@@ -1,8 +1,22 @@
 from ursina import *
+import atexit
+import os
 import random
 
+from conveyor_twin import Telemetry, load_line, startup
+from conveyor_twin.batched import BatchedBottles
+from conveyor_twin.hmi import Panel
+from conveyor_twin.pool import Pool
+from conveyor_twin.profiler import Profiler
+from conveyor_twin.widgets import ProfileOverlay, Sparkline
+# Gateway, replay and history modules are only imported when switched on
+startup.mark("imports")
+
 # --- CONFIGURATION & SETUP ---
+# Belt, sensors and jam points come from the line description (TWIN_LINE: preset name or .toml file)
+line = load_line(os.environ.get("TWIN_LINE", "v2"))
 app = Ursina()
+startup.mark("window")
 window.title = "Digital Twin: Industrial Conveyor V2"
 window.color = color.rgb(25, 25, 30) # Dark industrial background
 window.borderless = False
@@ -14,43 +28,47 @@ EditorCamera()
 
 # --- ASSETS & ENVIRONMENT ---
 
-# 1. Factory Floor (Grid)
-floor = Entity(
-    model='plane',
-    scale=80,
-    color=color.rgb(40, 40, 45),
-    texture='white_cube',
-    texture_scale=(40, 40),
-    y=-3
-)
-
-# 2. Lighting
+# 1. Lighting
 PointLight(parent=camera, position=(0, 10, -10), color=color.white)
 AmbientLight(color=color.rgba(120, 120, 120, 100))
 
-# 3. The Conveyor Belt System (Aluminum Style)
+# 2. The Conveyor Belt System (Aluminum Style)
 class ConveyorBelt(Entity):
-    def __init__(self):
-        super().__init__()
+    def __init__(self, start=-5, end=25, **kwargs):
+        super().__init__(**kwargs)
+        length, mid = end - start, (start + end) / 2
         # Main Frame (Aluminum)
-        self.frame = Entity(parent=self, model='cube', scale=(30, 1.5, 4), color=color.light_gray, position=(10, -1.5, 0))
+        self.frame = Entity(parent=self, model='cube', scale=(length, 1.5, 4), color=color.light_gray, position=(mid, -1.5, 0))
         
         # Moving Belt Surface (Dark Rubber)
-        self.belt = Entity(parent=self, model='cube', scale=(30, 0.2, 3.2), color=color.rgb(20, 20, 20), position=(10, -0.6, 0))
+        self.belt = Entity(parent=self, model='cube', scale=(length, 0.2, 3.2), color=color.rgb(20, 20, 20), position=(mid, -0.6, 0))
         
         # Side Rails (Safety)
-        self.rail_front = Entity(parent=self, model='cube', scale=(30, 0.5, 0.2), color=color.rgb(200, 200, 200), position=(10, 0.5, -1.8))
-        self.rail_back = Entity(parent=self, model='cube', scale=(30, 0.5, 0.2), color=color.rgb(200, 200, 200), position=(10, 0.5, 1.8))
+        self.rail_front = Entity(parent=self, model='cube', scale=(length, 0.5, 0.2), color=color.rgb(200, 200, 200), position=(mid, 0.5, -1.8))
+        self.rail_back = Entity(parent=self, model='cube', scale=(length, 0.5, 0.2), color=color.rgb(200, 200, 200), position=(mid, 0.5, 1.8))
         
         # Legs (Yellow Safety Color)
-        for x in [0, 10, 20]:
+        for x in [start + 5, mid, end - 5]:
             Entity(parent=self, model='cube', scale=(1, 4, 3.5), color=color.rgb(220, 180, 0), position=(x, -3.5, 0))
 
-conveyor = ConveyorBelt()
+# Floor and belt never change: built once, then loaded flattened from the on-disk scene cache
+def build_static_scene():
+    root = Entity()
+    # Factory Floor (Grid)
+    Entity(parent=root, model='plane', scale=80, color=color.rgb(40, 40, 45), texture='white_cube', texture_scale=(40, 40), y=-3)
+    ConveyorBelt(line.config.spawn_x, line.config.exit_x, parent=root)
+    return root
+
+static_scene = startup.cached_scene("conveyor_v2", build_static_scene,
+                                    key=(line.config.spawn_x, line.config.exit_x))
+startup.mark("scene")
 
-# 4. Sensors
-# Optical Sensor (Arch)
-sensor_arch = Entity(model='cube', scale=(0.5, 4, 5), color=color.dark_gray, position=(15, 1, 0))
+# 3. Sensors
+# Optical Sensor (Arch) on the counting sensor; the line's other sensors get a plain arch
+for sensor in line.sensors:
+    arch = Entity(model='cube', scale=(0.5, 4, 5), color=color.dark_gray, position=(sensor.x, 1, 0))
+    if sensor.counter:
+        sensor_arch = arch
 sensor_laser = Entity(parent=sensor_arch, model='cube', scale=(0.1, 0.1, 0.9), color=color.red, y=0, alpha=0.8)
 Text(text="OPTICAL SENSOR", parent=sensor_arch, scale=2, y=0.6, x=-0.6, rotation_y=90)
 
@@ -59,74 +77,108 @@ iot_box = Entity(model='cube', scale=(1.5, 2, 1.5), color=color.azure, position=
 Text(text="IoT HUB", parent=iot_box, scale=2, y=0.6, x=-0.6, color=color.black)
 
 # --- SIMULATION STATE ---
-class SimulationState:
-    def __init__(self):
-        self.status = "NORMAL" # NORMAL, WEAR, JAM
-        self.speed = 6.0
-        self.vibration = 0.5
-        self.current = 2.0
-        self.bottle_count = 0
-        self.last_spawn = 0
+# Physics run headless in conveyor_twin; this script only renders them.
+# TWIN_REPLAY=session.cvr plays a recorded session instead, TWIN_RECORD=session.cvr records this one.
+replaying = bool(os.environ.get("TWIN_REPLAY"))
+if replaying:
+    from conveyor_twin.replay import Player, Recording
+    sim_state = Player(Recording(os.environ["TWIN_REPLAY"]))
+else:
+    sim_state = line.sim()
+    if os.environ.get("TWIN_RECORD"):
+        from conveyor_twin.replay import Recorder
+        recorder = Recorder(os.environ["TWIN_RECORD"], sim_state.config)
+        sim_state.observers.append(recorder)
+        atexit.register(recorder.close)
+# TWIN_HISTORY=plant.csv (or .parquet) drives the state and dashboard from a plant log,
+# played TWIN_HISTORY_SPEED times faster than real time
+history = None
+if os.environ.get("TWIN_HISTORY"):
+    from conveyor_twin.ingest import HistoryFeed, open_log
+    history = HistoryFeed(open_log(os.environ["TWIN_HISTORY"]), speed=float(os.environ.get("TWIN_HISTORY_SPEED", 1)))
+telemetry = Telemetry()  # Last 10 min of every channel, kept for trends and fault analysis
+sim_state.observers.append(telemetry.sample)
+# Long-term history in SQLite (raw + 1 s/1 min rollups), off unless TWIN_STORE=twin.db is set
+store = None
+if os.environ.get("TWIN_STORE"):
+    from conveyor_twin.store import TimeSeriesStore
+    store = TimeSeriesStore.from_env()
+    sim_state.observers.append(store.observer(line.name))
+    atexit.register(store.close)
+
+# IoT gateway, off unless TWIN_MQTT and/or TWIN_WS (host:port) are set:
+# streams the twin out and lets real sensors or remote commands drive it
+gateway = None
+if os.environ.get("TWIN_MQTT") or os.environ.get("TWIN_WS"):
+    from conveyor_twin.gateway import Gateway
+    gateway = Gateway.from_env()
+    sim_state.observers.append(gateway.sample)
 
-sim_state = SimulationState()
+# Browser dashboard for the supervisor screens, off unless TWIN_WEB (host:port) is set;
+# TWIN_WEB_CONTROL=1 also lets the pages switch the state
+web = None
+if os.environ.get("TWIN_WEB"):
+    from conveyor_twin.web import WebDashboard
+    web = WebDashboard.from_env(line=line, store=store, conveyor=line.name)
+    sim_state.observers.append(web.sample)
 
-# --- BOTTLE LOGIC (Composite Entity) ---
-bottles = []
+# The sim steps on its own thread at a fixed rate, so a slow frame or a minimized window
+# doesn't slow the plant; the views draw `view`, its latest snapshot interpolated to the
+# frame's time. A replay is played by the frame clock instead.
+runner = None
+view = sim_state
+if not replaying:
+    from conveyor_twin.runner import SimThread
+    runner = SimThread(sim_state)
+    runner.controllers += [c.apply for c in (gateway, web) if c]
+    if history:
+        def follow_history(sim):
+            history.advance(runner.elapsed)
+            history.apply(sim)
+        runner.controllers.append(follow_history)
+    view = runner.latest
+control = runner or sim_state  # Where state changes go
+
+# --- BOTTLE VIEWS ---
+# Batched: the whole line is one mesh (one draw call). Entities: one Bottle per sim bottle.
+batched = BatchedBottles()
+bottles = {}  # sim bottle id -> Entity, only used when batched rendering is off
 
 class Bottle(Entity):
-    def __init__(self):
-        super().__init__(position=(-5, 0.5, random.uniform(-0.5, 0.5)))
+    def __init__(self, z):
+        super().__init__(position=(-5, 0.5, z))
         
         # Visuals: Body + Cap (Using Cubes to avoid 'missing model' error)
         self.body = Entity(parent=self, model='cube', color=color.rgba(0, 200, 255, 220), scale=(0.8, 1.5, 0.8), y=0)
         self.cap = Entity(parent=self, model='cube', color=color.white, scale=(0.4, 0.3, 0.4), y=0.9)
-        
-        # Collider for logic
-        self.collider = BoxCollider(self, center=(0,0,0), size=(0.8, 1.5, 0.8))
-        self.velocity = 0
-
-    def update(self):
-        # Movement Logic
-        if sim_state.status == "JAM":
-            # In a JAM, check for collisions ahead
-            blocked = False
-            hit_info = self.intersects()
-            if hit_info.hit:
-                for entity in hit_info.entities:
-                    # Check if we hit another bottle that is ahead of us
-                    if entity in bottles and entity.x > self.x:
-                        blocked = True
-                        break
-            
-            # If not blocked and not at the jam point (x=12), move
-            if not blocked and self.x < 12: 
-                 self.x += time.dt * sim_state.speed
-        else:
-            # Normal movement
-            self.x += time.dt * sim_state.speed
-
-        # Sensor Logic (Passing the arch)
-        if 14.9 < self.x < 15.1:
-            sensor_laser.color = color.green
-            if not hasattr(self, 'counted'):
-                sim_state.bottle_count += 1
-                self.counted = True
-        elif 15.1 < self.x < 15.3:
-             sensor_laser.color = color.red
-
-        # Cleanup
-        if self.x > 25:
-            bottles.remove(self)
-            destroy(self)
-
-def spawn_manager():
-    if sim_state.status == "JAM":
-        return # Don't spawn new bottles if jammed
-
-    if time.time() - sim_state.last_spawn > 1.2: # Spawn every 1.2s
-        b = Bottle()
-        bottles.append(b)
-        sim_state.last_spawn = time.time()
+
+# Bottles are recycled instead of built and destroyed for each one (a full belt is ~40);
+# built when entity rendering is first switched on
+bottle_pool = Pool(lambda: Bottle(0), capacity=48, preallocate=0, discard=destroy)
+
+def sync_bottles():
+    store = view.bottles
+    ids = store.ids.tolist()
+    for bottle_id, x, z in zip(ids, store.x.tolist(), store.z.tolist()):
+        entity = bottles.get(bottle_id)
+        if entity is None:
+            entity = bottles[bottle_id] = bottle_pool.acquire()
+            entity.z = z
+        entity.x = x
+    # Ids only grow, so everything below the oldest live id has left the belt
+    # (and, after seeking back in a replay, everything from next_id on isn't there yet)
+    oldest = ids[0] if ids else view.next_id
+    for bottle_id in [i for i in bottles if i < oldest or i >= view.next_id]:
+        bottle_pool.release(bottles.pop(bottle_id))
+
+def toggle_batched():
+    batched.enabled = not batched.enabled
+    if batched.enabled:
+        for entity in bottles.values():
+            bottle_pool.release(entity)
+        bottles.clear()
+    else:
+        bottle_pool.reserve(bottle_pool.capacity)
 
 # --- DASHBOARD UI ---
 class Dashboard(Entity):
@@ -141,58 +193,82 @@ class Dashboard(Entity):
         self.cur_txt = Text(text="Current: 2.0 A", parent=self.panel, position=(-0.45, -0.15), scale=1.2)
         self.cnt_txt = Text(text="Bottles: 0", parent=self.panel, position=(-0.45, -0.3), scale=1.2)
         
-        self.help_txt = Text(text="CONTROLS: [1] NORMAL  [2] WEAR  [3] JAM", parent=self, position=(-0.85, -0.45), color=color.gray)
+        self.help_txt = Text(text="CONTROLS: [1] NORMAL  [2] WEAR  [3] JAM  [R] RENDER MODE  [F3] PROFILER", parent=self, position=(-0.85, -0.45), color=color.gray)
 
 dashboard = Dashboard()
+if replaying:
+    dashboard.help_txt.text = "REPLAY: [SPACE] PAUSE  [LEFT/RIGHT] SEEK 10 s  [UP/DOWN] SPEED  [R] RENDER MODE"
+
+# Bound values: a widget is only re-rendered when its formatted value changes
+STATUS_STYLE = {
+    "NORMAL": ("STATUS: NORMAL", color.green),
+    "WEAR": ("WARNING: BEARING WEAR", color.orange),
+    "JAM": ("CRITICAL: JAM DETECTED", color.red),
+}
+IOT_COLOR = {"NORMAL": color.azure, "WEAR": color.orange, "JAM": color.red}
+hmi = Panel()
+hmi.bind(dashboard.status_txt, lambda: view.status, STATUS_STYLE.get, attrs=("text", "color"))
+hmi.bind(iot_box, lambda: view.status, IOT_COLOR.get, attrs=("color",))
+hmi.bind(sensor_laser, lambda: view.laser_on, {True: color.green, False: color.red}.get, attrs=("color",))
+hmi.bind(dashboard.vib_txt, lambda: view.vibration, "Vibration: {:.2f} mm/s".format, hz=10)
+hmi.bind(dashboard.cur_txt, lambda: view.current, "Current: {:.2f} A".format, hz=10)
+hmi.bind(dashboard.cnt_txt, lambda: view.bottle_count, "Bottles: {}".format)
+
+# Trends over the last minute (one point every half second)
+vib_trend = Sparkline(telemetry, "vibration", value_range=(0, 6), position=(0.70, 0.12), line_color=color.orange)
+cur_trend = Sparkline(telemetry, "current", value_range=(0, 10), position=(0.70, 0.04), line_color=color.yellow)
+
+# Phase timings: [F3] shows the breakdown. TWIN_TRACE=run.json profiles from the
+# start and writes a Chrome trace (also opens in speedscope) on exit.
+profiler = Profiler()
+if not replaying:
+    profiler.instrument(sim_state, runner)
+if os.environ.get("TWIN_TRACE"):
+    profiler.enable(trace=True)
+    atexit.register(profiler.write_chrome_trace, os.environ["TWIN_TRACE"])
+ProfileOverlay(profiler, extra=(bottle_pool.report,))
+if runner:
+    runner.start()  # Last, once the sim is fully wired
+    atexit.register(runner.stop)
+startup.mark("views")
 
 # --- MAIN LOOP ---
 def update():
-    spawn_manager()
-    
-    # Update Sensor Data based on State
-    target_vib = 0.5
-    target_cur = 2.0
-    
-    if sim_state.status == "NORMAL":
-        sim_state.speed = 6.0
-        target_vib = 0.5 + random.uniform(-0.1, 0.1)
-        target_cur = 2.0 + random.uniform(-0.1, 0.1)
-        dashboard.status_txt.text = "STATUS: NORMAL"
-        dashboard.status_txt.color = color.green
-        iot_box.color = color.azure
-        
-    elif sim_state.status == "WEAR":
-        sim_state.speed = 5.5
-        target_vib = 4.5 + random.uniform(-0.5, 0.5) # High vibration
-        target_cur = 2.5 + random.uniform(-0.1, 0.1)
-        dashboard.status_txt.text = "WARNING: BEARING WEAR"
-        dashboard.status_txt.color = color.orange
-        iot_box.color = color.orange
-        # Visual shake effect
-        iot_box.x = -2 + random.uniform(-0.05, 0.05)
-        
-    elif sim_state.status == "JAM":
-        sim_state.speed = 0 # Belt stopped
-        target_vib = 0.1 # No movement
-        target_cur = 8.0 + random.uniform(-0.5, 0.5) # Stalled motor current spike
-        dashboard.status_txt.text = "CRITICAL: JAM DETECTED"
-        dashboard.status_txt.color = color.red
-        iot_box.color = color.red
-
-    # Smooth data transitions
-    sim_state.vibration = lerp(sim_state.vibration, target_vib, time.dt * 5)
-    sim_state.current = lerp(sim_state.current, target_cur, time.dt * 5)
-    
-    # Update UI
-    dashboard.vib_txt.text = f"Vibration: {sim_state.vibration:.2f} mm/s"
-    dashboard.cur_txt.text = f"Current: {sim_state.current:.2f} A"
-    dashboard.cnt_txt.text = f"Bottles: {sim_state.bottle_count}"
+    global view
+    if runner:
+        view = runner.frame()
+    else:
+        if gateway:
+            gateway.apply(sim_state)
+        if web:
+            web.apply(sim_state)
+        sim_state.advance(time.dt)
+        if history:
+            history.advance(time.dt)
+            history.apply(sim_state)
+    with profiler.phase("ui"):
+        if batched.enabled:
+            batched.sync(view.bottles)
+        else:
+            sync_bottles()
+
+        if view.status == "WEAR":
+            # Visual shake effect
+            iot_box.x = -2 + random.uniform(-0.05, 0.05)
+        hmi.refresh()
 
 # --- INPUTS ---
 def input(key):
-    if key == '1': sim_state.status = "NORMAL"
-    if key == '2': sim_state.status = "WEAR"
-    if key == '3': sim_state.status = "JAM"
+    if key == '1': control.set_status("NORMAL")
+    if key == '2': control.set_status("WEAR")
+    if key == '3': control.set_status("JAM")
+    if key == 'r': toggle_batched()
+    if replaying:
+        if key == 'space': sim_state.paused = not sim_state.paused
+        if key == 'right arrow': sim_state.seek(sim_state.position + 10)
+        if key == 'left arrow': sim_state.seek(sim_state.position - 10)
+        if key == 'up arrow': sim_state.playback_speed *= 2
+        if key == 'down arrow': sim_state.playback_speed /= 2
     if key == 'escape': application.quit()
 
 app.run()
@@ -0,0 +1,37 @@
+from dataclasses import replace
+
+import pytest
+
+from conveyor_twin.des import EventSim, random_faults
+from conveyor_twin.line import load_line
+from conveyor_twin.sensors import Sensor
+from conveyor_twin.sim import ConveyorSim, SimConfig
+
+
+def counts(config, seconds=600.0, seed=0):
+    frame, event = ConveyorSim(config, seed=seed), EventSim(config, seed=seed)
+    for engine in (frame, event):
+        random_faults(engine, seconds, 120.0, 30.0, seed=seed)
+        engine.run(seconds)
+    return frame.bottle_count, event.bottle_count
+
+
+@pytest.mark.parametrize("config", [SimConfig(), load_line("digital_twin").config, load_line("v2").config],
+                         ids=["default", "digital_twin", "v2"])
+def test_event_engine_counts_like_the_frame_engine(config):
+    frame, event = counts(config)
+    assert frame == event > 0
+
+
+def test_event_engine_counts_on_its_one_sensor():
+    # The sensor list wins over sensor_x, as in the frame engine
+    config = SimConfig(sensors=(Sensor("optical", 20.0, 0.1, True),), jam_points=(18.0,))
+    frame, event = counts(config)
+    assert frame == event > 0
+
+
+def test_event_engine_rejects_several_sensors():
+    config = replace(SimConfig(), sensors=(Sensor("infeed", 2.0, 0.1), Sensor("optical", 15.0, 0.1, True)))
+    with pytest.raises(ValueError, match="one sensor"):
+        EventSim(config)
+    ConveyorSim(config).run(1.0)  # The frame engine still takes it
@@ -0,0 +1,65 @@
+import math
+
+import pytest
+
+from conveyor_twin.detect import CUSUM, EWMA, FaultDetector, LatencyTracker, RollingRMS
+from conveyor_twin.sim import ConveyorSim
+
+
+def test_rolling_rms_forgets_old_samples():
+    rms = RollingRMS(2)
+    assert rms.value == 0.0
+    assert rms.update(3.0) == 3.0
+    assert rms.update(4.0) == pytest.approx(math.sqrt(12.5))
+    assert rms.update(0.0) == pytest.approx(math.sqrt(8.0))  # The 3 left the window
+
+
+def test_ewma_starts_at_the_first_sample():
+    ewma = EWMA(0.25)
+    assert ewma.update(4.0) == 4.0
+    assert ewma.update(8.0) == 5.0
+
+
+def test_cusum_alarms_after_a_sustained_shift_and_clears():
+    cusum = CUSUM(target=1.0, k=0.5, h=2.0)
+    assert not any(cusum.update(1.4) for _ in range(100))  # Inside the slack
+    assert [cusum.update(2.5) for _ in range(3)] == [False, False, True]
+    assert cusum.s == 3.0
+    for _ in range(10):
+        cusum.update(5.0)
+    assert cusum.s == 4.0  # Capped at 2h
+    assert [cusum.update(0.0) for _ in range(3)] == [True, False, False]
+
+
+def test_detects_every_simulated_transition():
+    sim = ConveyorSim(seed=0)
+    t = 0.0
+    for _ in range(5):
+        for status in ("WEAR", "NORMAL", "JAM", "NORMAL"):
+            t += 60.0
+            sim.schedule(t, status)
+    tracker = LatencyTracker(FaultDetector())
+    sim.observers.append(tracker)
+    sim.run(t + 60.0)
+    assert tracker.missed == 0 and tracker.false_alarms == 0
+    assert {state: len(v) for state, v in tracker.latencies.items()} == {"WEAR": 5, "JAM": 5, "NORMAL": 11}
+    assert max(max(v) for v in tracker.latencies.values()) < 1.0
+
+
+@pytest.mark.parametrize("seed", [1, 2, 3])
+def test_no_false_alarm_in_steady_normal(seed):
+    sim = ConveyorSim(seed=seed)
+    detector = FaultDetector()
+    states = []
+    sim.observers.append(lambda s: states.append(detector.update(s.time, s.vibration, s.current, s.bottle_count)))
+    sim.run(600.0)
+    assert set(states) == {"NORMAL"}
+
+
+def test_stalled_counter_is_a_jam_only_when_the_belt_is_quiet():
+    quiet, running = FaultDetector(), FaultDetector()
+    for i in range(100):  # 10 s at 10 Hz, counter frozen
+        quiet.update(i / 10, 0.1, 2.0, 7)
+        running.update(i / 10, 0.5, 2.0, 7)
+    assert quiet.state == "JAM" and quiet.since == pytest.approx(4.1)
+    assert running.state == "NORMAL"
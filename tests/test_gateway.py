@@ -0,0 +1,70 @@
+import asyncio
+import json
+
+from conveyor_twin import mqtt
+from conveyor_twin.gateway import Gateway
+
+
+class Viewer:
+    def __init__(self):
+        self.frames = []
+
+    def buffered(self):
+        return 0
+
+    def send(self, frame):
+        self.frames.append(json.loads(frame))
+
+
+def test_viewer_frames_are_json_objects():
+    gateway = Gateway()
+    viewer = Viewer()
+    gateway.viewers.add(viewer)
+    gateway._send("telemetry", {"columns": ("time", "vibration"), "rows": [[0.0, 1.5]]})
+    gateway._send('odd "kind"', {})
+    assert viewer.frames == [{"topic": "telemetry", "columns": ["time", "vibration"], "rows": [[0.0, 1.5]]},
+                             {"topic": 'odd "kind"'}]
+
+
+async def _flaky_broker_run():
+    broker = await mqtt.Broker().start(port=0)
+    attempts = []
+
+    async def flaky(reader, writer):
+        attempts.append(len(attempts))
+        if len(attempts) == 1:
+            await mqtt.read_packet(reader)
+            writer.write(b"\x20")               # CONNACK cut after its first byte
+            writer.close()
+        elif len(attempts) == 2:
+            await mqtt.read_packet(reader)
+            writer.write(mqtt.packet(mqtt.CONNACK, b"\x00\x00") + b"\x30\x40\x00\x05twin/")  # PUBLISH cut short
+            await writer.drain()
+            writer.close()
+        else:
+            await broker._client(reader, writer)
+
+    server = await asyncio.start_server(flaky, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    sub = await mqtt.Client("test-sub").connect("127.0.0.1", broker.port)
+    await sub.subscribe("twin/+/telemetry")
+    gateway = Gateway(mqtt_address=f"127.0.0.1:{port}", interval=0.01).start()
+    try:
+        for _ in range(500):
+            if len(attempts) >= 3 and gateway.mqtt is not None:
+                break
+            await asyncio.sleep(0.01)
+        gateway.push((1.0,) + (0.0,) * (len(gateway.columns) - 1))
+        topic, payload = await asyncio.wait_for(sub.messages.get(), 5)
+    finally:
+        gateway.stop()
+        await sub.close()
+        server.close()
+        await broker.close()
+    return len(attempts), topic, json.loads(payload)["rows"]
+
+
+def test_gateway_reconnects_after_a_link_cut_mid_packet():
+    attempts, topic, rows = asyncio.run(_flaky_broker_run())
+    assert attempts == 3
+    assert topic == "twin/line1/telemetry" and rows[0][0] == 1.0
@@ -0,0 +1,12 @@
+from conveyor_twin.__main__ import run_headless
+
+
+def test_flat_out_run_plays_the_history(tmp_path, monkeypatch, capsys):
+    log = tmp_path / "plant.csv"
+    # 60 s at 10 Hz with a count no simulated line would reach
+    log.write_text("time,vibration,current,count\n"
+                   + "".join(f"{i / 10:.1f},7.0,3.0,{1000 + i}\n" for i in range(600)))
+    monkeypatch.setenv("TWIN_HISTORY", str(log))
+    run_headless(seconds=30.0, speed=0)
+    last = capsys.readouterr().out.strip().splitlines()[-1]
+    assert int(last.split("bottles ")[1].split()[0]) == 1300
@@ -0,0 +1,55 @@
+from conveyor_twin.hmi import Panel
+
+
+class Widget:
+    """Counts assignments, like Ursina's Text rebuilding its mesh on each one."""
+
+    def __init__(self):
+        self.writes = 0
+
+    def __setattr__(self, name, value):
+        if name != "writes":
+            self.writes += 1
+        super().__setattr__(name, value)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_clean_field_is_not_redrawn():
+    widget, values = Widget(), iter([1.0, 1.0, 1.001, 2.0])
+    panel = Panel(clock=Clock())
+    field = panel.bind(widget, lambda: next(values), render=lambda v: f"{v:.1f} A")
+    for _ in range(4):
+        panel.refresh()
+    assert widget.text == "2.0 A"
+    assert widget.writes == field.renders == 2  # 1.0 shown once; 1.001 formats the same
+    assert panel.renders() == (2, 4)
+
+
+def test_pushed_field_sets_several_attributes_together():
+    widget = Widget()
+    field = Panel().bind(widget, render=lambda jam: ("JAM", "red") if jam else ("OK", "green"),
+                         attrs=("text", "color"))
+    assert field.set(False) and not field.set(False)
+    assert field.set(True)
+    assert (widget.text, widget.color, widget.writes) == ("JAM", "red", 4)
+
+
+def test_rate_limited_field_waits_for_its_period():
+    clock, widget, value = Clock(), Widget(), [0]
+    panel = Panel(clock=clock)
+    panel.bind(widget, lambda: value[0], hz=10)
+    for step in range(10):  # 1 s of frames at 10 ms, the value changing every frame
+        clock.now = step * 0.01
+        value[0] = step
+        panel.refresh()
+    assert widget.writes == 1 and widget.text == "0"
+    clock.now = 0.1
+    panel.refresh()
+    assert widget.text == "9"
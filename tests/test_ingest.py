@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+
+from conveyor_twin.ingest import HistoryFeed, csv_chunks, resolve_columns
+from conveyor_twin.sim import ConveyorSim
+
+
+def write_log(path, rows, header="time,vibration,current,count", iso=False):
+    lines = [header]
+    for i in range(rows):
+        t = f"2025-01-01 00:{i // 600:02d}:{i % 600 / 10:04.1f}" if iso else f"{1000 + i / 10:.1f}"
+        lines.append(f"{t},{i * 0.01:.2f},{2 + i * 0.001:.3f},{i}")
+    path.write_text("\n".join(lines) + "\n")
+
+
+@pytest.mark.parametrize("iso", [False, True])
+def test_chunks_split_on_line_boundaries(tmp_path, iso):
+    log = tmp_path / "log.csv"
+    write_log(log, 1000, iso=iso)
+    chunks = list(csv_chunks(log, block_size=997))  # Blocks end mid-line
+    assert len(chunks) > 10
+    count = np.concatenate([c["count"] for c in chunks])
+    assert count.tolist() == list(range(1000))
+    t = np.concatenate([c["time"] for c in chunks])
+    assert np.allclose(np.diff(t), 0.1)
+    assert [len(c["time"]) for c in chunks] == [len(c["vibration"]) for c in chunks]
+
+
+def test_columns_are_found_by_alias_or_override(tmp_path):
+    assert resolve_columns(["ts", "vib", "amps", "counter"]) == {
+        "time": "ts", "vibration": "vib", "current": "amps", "count": "counter"}
+    with pytest.raises(ValueError, match="no column for 'current'"):
+        resolve_columns(["time", "vibration", "count"])
+    log = tmp_path / "log.csv"
+    write_log(log, 10, header="when,vibration,i_motor,count")
+    with pytest.raises(ValueError, match="no column for 'time'"):
+        next(csv_chunks(log))
+    chunk = next(csv_chunks(log, {"time": "when", "current": "i_motor"}))
+    assert chunk["current"][1] == pytest.approx(2.001)
+
+
+def test_feed_plays_rows_in_time_across_chunks(tmp_path):
+    log = tmp_path / "log.csv"
+    write_log(log, 1000)
+    feed = HistoryFeed(csv_chunks(log, block_size=500), speed=10.0)
+    assert feed.advance(1.0) == 101  # 10 log seconds, both ends included
+    assert feed.latest[3] == 100
+    assert feed.advance(None) == 899 and feed.done
+
+
+def test_driven_sim_keeps_the_logged_values(tmp_path):
+    log = tmp_path / "log.csv"
+    write_log(log, 50)
+    feed = HistoryFeed(csv_chunks(log))
+    feed.advance(None)
+    sim = ConveyorSim(seed=0)
+    sim.run(5.0)
+    feed.apply(sim)
+    assert sim.driven
+    before = dict(zip(sim.bottles.ids.tolist(), sim.bottles.x.tolist()))
+    for _ in range(60):
+        sim.step()
+    assert (sim.vibration, sim.current, sim.bottle_count) == (0.49, 2.049, 49)
+    # The belt still runs
+    assert all(x > before[i] for i, x in zip(sim.bottles.ids.tolist(), sim.bottles.x.tolist()) if i in before)
@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+
+from conveyor_twin.line import PRESETS, load_line, parse_line
+
+
+@pytest.mark.parametrize("name", sorted(p.stem for p in PRESETS.glob("*.toml")))
+def test_presets_load(name):
+    line = load_line(name)
+    assert line.counter.counter
+    line.sim(seed=0).run(5.0)
+
+
+def test_app_v2_jam_stops_the_whole_belt():
+    # As the original view: motor speed 0, every bottle stays where it is
+    sim = load_line("app_v2").sim(seed=0)
+    sim.run(10.0)
+    sim.set_status("BOURRAGE")
+    x = sim.bottles.x.copy()
+    sim.run(2.0)
+    assert len(x) and (sim.bottles.x == x).all()
+
+
+@pytest.mark.parametrize("data, message", [
+    ({"speed": {"FAST": 3.0}}, "unknown state"),
+    ({"signals": {"vibration": {"BOURRAGE": [1.0, 0.0], "PANNE": [1.0, 0.0]}}}, "unknown state"),
+    ({"sensors": [{"name": "a", "x": 10.0, "window": 0.5}, {"name": "b", "x": 10.8, "window": 0.5}]}, "overlap"),
+    ({"sensors": [{"name": "a", "x": 30.0}]}, "off the belt"),
+    ({"sensors": [{"name": "a", "x": 5.0, "counter": True}, {"name": "b", "x": 8.0, "counter": True}]},
+     "more than one counter"),
+    ({"sensors": [{"x": 5.0}]}, "without 'name'"),
+    ({"jam": {"points": [12.0], "accumulation": [{"start": -10.0, "end": 5.0}]}}, "off the belt or empty"),
+    ({"jam": {"accumulation": [{"start": 5.0, "end": 5.0}]}}, "off the belt or empty"),
+    ({"jam": {"accumulation": [{"start": 0.0, "end": 6.0}, {"start": 5.0, "end": 8.0}]}}, "overlap"),
+    ({"jam": {"points": [40.0]}}, "jam point 40.0 is off the belt"),
+    ({"belt": {"exit_x": -6.0}}, "must be past"),
+    ({"belt": {"speed": 3.0}}, "unknown key"),
+    ({"conveyor": {}}, "unknown table"),
+])
+def test_invalid_descriptions_are_rejected(data, message):
+    with pytest.raises(ValueError, match=message):
+        parse_line(data)
+
+
+def test_unknown_preset():
+    with pytest.raises(ValueError, match="no line preset"):
+        load_line("nowhere")
+
+
+def test_zone_of_uses_the_engine_edges():
+    # Touching zones: a covers [9.5, 10.5), b covers [10.5, 11.5)
+    line = parse_line({"sensors": [{"name": "a", "x": 10.0, "window": 0.5, "counter": True},
+                                   {"name": "b", "x": 11.0, "window": 0.5}]})
+    assert line.edges.tolist() == [9.5, 10.5, 10.5, 11.5]
+    x = np.array([9.49, 9.5, 10.0, 10.5, 11.49, 11.5, 20.0])
+    assert line.zone_of(x).tolist() == [-1, 0, 0, 1, 1, -1, -1]
+    assert line.occupied(x).tolist() == [True, True]
+    assert line.occupied(np.array([11.5])).tolist() == [False, False]
+
+
+def test_occupied_matches_the_engine():
+    line = load_line("v2")
+    sim = line.sim(seed=0)
+    for _ in range(1200):
+        sim.step()
+        assert (line.occupied(sim.bottles.x) == sim.sensors.occupied).all()
@@ -0,0 +1,33 @@
+from conveyor_twin.optimize import Optimizer, Setup, pareto
+from conveyor_twin.sim import SimConfig
+
+
+def test_pareto_keeps_the_undominated_rows():
+    scores = [(10, 1), (8, 3), (9, 0), (10, 1), (5, 3), (0, 0)]
+    # (9, 0) and (0, 0) are beaten by (10, 1), (5, 3) by (8, 3); ties stay
+    assert pareto(scores).tolist() == [0, 1, 3]
+    assert len(pareto([])) == 0
+
+
+def short_setup():
+    return Setup(SimConfig(), horizon=20.0, warmup=5.0)
+
+
+def test_runs_are_cached(tmp_path):
+    cache = tmp_path / "opt.jsonl"
+    opt = Optimizer(short_setup(), replicas=2, workers=1, cache=str(cache))
+    first = opt.evaluate([(6.0, 1.2, 10.0), (6.02, 1.21, 10.2)])  # Both snap to one grid point
+    assert list(first) == [(6.0, 1.2, 10.0)]
+    assert (opt.simulated, opt.hits) == (2, 0)
+    again = opt.evaluate([(6.0, 1.2, 10.0), (5.0, 1.2, 10.0)])
+    assert (opt.simulated, opt.hits) == (4, 2)
+    assert again[(6.0, 1.2, 10.0)] == first[(6.0, 1.2, 10.0)]
+
+    reloaded = Optimizer(short_setup(), replicas=2, workers=1, cache=str(cache))
+    assert reloaded.evaluate([(5.0, 1.2, 10.0)]) == {(5.0, 1.2, 10.0): again[(5.0, 1.2, 10.0)]}
+    assert (reloaded.simulated, reloaded.hits) == (0, 2)
+    # Another line is another set of runs
+    other = Optimizer(Setup(SimConfig(jam_points=(10.0,)), horizon=20.0, warmup=5.0), replicas=2, workers=1,
+                      cache=str(cache))
+    other.evaluate([(5.0, 1.2, 10.0)])
+    assert (other.simulated, other.hits) == (2, 0)
@@ -0,0 +1,52 @@
+import pytest
+
+from conveyor_twin.plant import Plant, chain
+from conveyor_twin.sim import SimConfig
+
+
+def test_add_line_leaves_the_config_alone():
+    config = SimConfig()
+    plant = Plant(dt=0.05)
+    a, b = plant.add_line("a", config), plant.add_line("b", config)
+    assert a.config.dt == b.config.dt == 0.05
+    assert config.dt == 1 / 60
+    with pytest.raises(ValueError):
+        plant.add_line("a")
+    with pytest.raises(KeyError):
+        plant.connect("a", "c")
+
+
+def test_fed_line_only_takes_bottles_from_upstream():
+    plant = chain(2)
+    first, second = plant.lines.values()
+    plant.run(3.0)  # Nothing has reached the end of the first belt yet
+    assert first.bottles.n > 0 and second.next_id == 0
+    plant.run(20.0)
+    assert second.next_id > 0
+
+
+def test_blocked_outfeed_holds_bottles_until_the_jam_clears():
+    plant = chain(2)
+    first, second = plant.lines.values()
+    second.set_status("JAM")
+    plant.run(60.0)
+    assert first.outfeed_blocked
+    assert first.bottles.x.max() <= first.config.exit_x
+    assert second.next_id <= 1 and plant.delivered == 0  # Only the infeed spot of the stopped belt
+    # Nothing is lost on the way
+    pending = len(plant.routes[next(iter(plant.lines))].pending)
+    assert first.next_id == first.bottles.n + pending + second.next_id
+    second.set_status("NORMAL")
+    plant.run(30.0)
+    assert not first.outfeed_blocked and plant.delivered > 0
+
+
+def test_divert_hands_out_round_robin():
+    plant = Plant()
+    plant.add_line("in", SimConfig(jam_points=()), seed=0)
+    for name in ("a", "b"):
+        plant.add_line(name, SimConfig(jam_points=()), fed=True)
+    plant.connect("in", "a", "b")
+    plant.run(120.0)
+    a, b = plant.lines["a"].next_id, plant.lines["b"].next_id
+    assert a > 10 and abs(a - b) <= 1
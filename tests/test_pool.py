@@ -0,0 +1,35 @@
+from conveyor_twin.pool import Pool
+
+
+class Thing:
+    built = 0
+
+    def __init__(self):
+        Thing.built += 1
+        self.enabled = True
+
+
+def test_objects_are_reused_and_hidden_when_idle():
+    Thing.built = 0
+    pool = Pool(Thing, capacity=4)
+    assert Thing.built == 4 and not any(t.enabled for t in pool.idle)
+    for _ in range(100):  # A steady line: a few bottles at a time
+        held = [pool.acquire() for _ in range(3)]
+        assert all(t.enabled for t in held)
+        for t in held:
+            pool.release(t)
+    assert Thing.built == 4 and pool.misses == 0 and pool.hit_rate == 1.0
+    assert pool.in_use == 0 and pool.high_water == 3
+
+
+def test_burst_beyond_capacity_is_bounded():
+    Thing.built = 0
+    dropped = []
+    pool = Pool(Thing, capacity=4, preallocate=2, discard=dropped.append)
+    burst = [pool.acquire() for _ in range(10)]
+    assert (pool.hits, pool.misses, pool.high_water) == (2, 8, 10)
+    for t in burst:
+        pool.release(t)
+    assert len(pool.idle) == 4 and len(dropped) == pool.discarded == 6
+    pool.reserve(4)
+    assert Thing.built == 10  # Already 4 idle, nothing built
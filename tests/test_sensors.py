@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+
+from conveyor_twin.sensors import Sensor, SensorArray
+from conveyor_twin.sim import ConveyorSim, SimConfig
+
+DT = 1 / 60
+
+
+def arch():
+    return SensorArray([Sensor("infeed", 2.0, 0.1), Sensor("optical", 15.0, 0.1, counter=True)])
+
+
+@pytest.mark.parametrize("ordered", [True, False])
+def test_fast_bottle_skipping_the_window_is_counted_once(ordered):
+    sensors = arch()
+    # 10 m in one tick: the bottle is before the 0.2 m window, then past it
+    assert sensors.sweep(np.array([7]), np.array([10.0]), np.array([20.0]), 600.0, 0.0, DT, ordered) == 2
+    events = sensors.events
+    assert events[["sensor", "bottle", "enter"]].tolist() == [(1, 7, True), (1, 7, False)]
+    assert events["t"] == pytest.approx([4.9 / 600, 5.1 / 600])
+    assert sensors.counts.tolist() == [0, 1]
+    assert not sensors.occupied.any()
+    # Nothing more to count on the next tick
+    assert sensors.sweep(np.array([7]), np.array([20.0]), np.array([30.0]), 600.0, DT, DT, ordered) == 0
+    assert len(sensors.events) == 0
+    assert sensors.counts.tolist() == [0, 1]
+
+
+@pytest.mark.parametrize("ordered", [True, False])
+def test_bottle_stopping_in_the_window_is_counted_once(ordered):
+    sensors = arch()
+    ids = np.array([3])
+    sensors.sweep(ids, np.array([14.0]), np.array([15.0]), 6.0, 0.0, DT, ordered)
+    assert sensors.is_occupied(1)
+    for tick in range(1, 5):  # Held in the zone by a jam
+        assert sensors.sweep(ids, np.array([15.0]), np.array([15.0]), 0.0, tick * DT, DT, ordered) == 0
+    sensors.sweep(ids, np.array([15.0]), np.array([16.0]), 6.0, 5 * DT, DT, ordered)
+    events = sensors.events
+    assert events[["sensor", "bottle", "enter"]].tolist() == [(1, 3, False)]
+    assert events["t"] == pytest.approx([5 * DT + 0.1 / 6])
+    assert sensors.counts.tolist() == [0, 1]
+
+
+def test_ordered_sweep_matches_the_general_one():
+    rng = np.random.default_rng(0)
+    for _ in range(500):
+        n = int(rng.integers(1, 40))
+        before = np.sort(rng.uniform(-5.0, 25.0, n))[::-1].copy()  # Front of the line first
+        speed = rng.choice([0.0, 6.0, 300.0])
+        after = before + rng.uniform(0.0, 1.0, n) * speed * DT
+        ids = np.arange(n, dtype=np.int64)
+        ordered, general = arch(), arch()
+        # Keep the order: a follower never passes its leader
+        after = np.minimum.accumulate(after)
+        after = np.maximum(after, before)
+        assert ordered.sweep(ids, before, after, speed, 1.0, DT, True) == general.sweep(ids, before, after, speed,
+                                                                                         1.0, DT, False)
+        assert ordered.events.tolist() == general.events.tolist()
+        assert ordered.counts.tolist() == general.counts.tolist()
+
+
+@pytest.mark.parametrize("dt", [0.25, 0.75])
+def test_counts_and_times_do_not_depend_on_the_step(dt):
+    def run(step):
+        # Bottles spawn on a tick, so the interval is a whole number of steps
+        sim = ConveyorSim(SimConfig(dt=step, spawn_interval=1.5), seed=0)
+        entered = []
+        sim.observers.append(lambda s: entered.extend(t for t, _, _, enter in s.events.tolist() if enter))
+        sim.run(120.0)
+        return sim.bottle_count, entered
+
+    fine, coarse = run(DT), run(dt)
+    assert fine[0] == coarse[0] > 0
+    assert np.allclose(fine[1], coarse[1])
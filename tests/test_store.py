@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+
+from conveyor_twin.store import TimeSeriesStore, rollup
+
+T0 = 1_699_999_980.0  # On a minute boundary
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = TimeSeriesStore(tmp_path / "twin.db", channels=("a", "b"), interval=0.01)
+    yield store
+    store.close()
+
+
+def rows(t):
+    t = np.asarray(t, dtype=np.float64)
+    return np.column_stack([t, (t - T0) * 10, -(t - T0)])
+
+
+def test_rollup_buckets_start_on_the_boundary():
+    t = np.array([0.0, 0.99, 1.0, 59.99, 60.0, 61.5])
+    keys, n, lo, hi, mean = rollup(t, t[:, None], 1)
+    assert keys.tolist() == [0, 1, 59, 60, 61] and n.tolist() == [2, 1, 1, 1, 1]
+    keys, n, lo, hi, mean = rollup(t, t[:, None], 60)
+    assert keys.tolist() == [0, 60] and n.tolist() == [4, 2]
+    assert lo[:, 0].tolist() == [0.0, 60.0] and hi[:, 0].tolist() == [59.99, 61.5]
+    assert mean[:, 0] == pytest.approx([(0.99 + 1.0 + 59.99) / 4, 60.75])
+
+
+def test_buckets_split_over_flushes_are_exact(store):
+    t = T0 + 50 + np.arange(400) / 20        # 20 Hz from 50 s to 70 s: across a minute edge
+    for part in np.array_split(t, 7):         # Several flushes, cutting through buckets
+        store.write("line1", rows(part))
+        assert store.flush()
+    values = (t - T0) * 10
+    for level, bucket in (("1s", 1), ("1m", 60)):
+        got_t, cols = store.query("line1", "a", t[0], t[-1], resolution=level)
+        keys = np.floor(t / bucket) * bucket
+        assert got_t.tolist() == np.unique(keys).tolist()
+        for i, k in enumerate(got_t):
+            inside = values[keys == k]
+            assert cols["n"][i] == len(inside)
+            assert (cols["min"][i], cols["max"][i]) == (inside.min(), inside.max())
+            assert cols["mean"][i] == pytest.approx(inside.mean())
+    got_t, cols = store.query("line1", "b", T0 + 55, T0 + 65, resolution="1m")
+    assert got_t.tolist() == [T0, T0 + 60] and cols["n"].tolist() == [200, 200]
+
+
+def test_query_picks_the_finest_resolution_that_fits(store):
+    t = T0 + np.arange(0, 4 * 3600, 0.5)      # 4 h at 2 Hz
+    store.write("line1", rows(t))
+    assert store.flush()
+    end = store.latest
+    assert store.resolution(end - 30, end) == "raw"
+    assert store.resolution(end - 1800, end) == "1s"
+    assert store.resolution(end - 3 * 3600, end) == "1m"
+    assert store.resolution(end - 30, end, max_points=10) == "1m"
+    store.retention["raw"] = 600.0             # Older raw data is gone: use the rollups
+    assert store.resolution(end - 900, end - 870) == "1s"
+
+    got_t, cols = store.query("line1", "a", end - 10, end)
+    assert got_t.tolist() == t[-21:].tolist()
+    assert cols["value"].tolist() == ((t[-21:] - T0) * 10).tolist()
+    got_t, cols = store.query("line1", "a", end - 1800, end)
+    assert len(got_t) == 1801 and cols["n"][1:].tolist() == [2] * 1800
+    assert store.query("other", "a", end - 10, end)[0].size == 0
@@ -0,0 +1,59 @@
+import threading
+
+import numpy as np
+
+from conveyor_twin.telemetry import Cursor, RingBuffer
+
+
+def filled(capacity, rows):
+    ring = RingBuffer(capacity, width=2)
+    ring.extend([(i, -i) for i in range(rows)])
+    return ring
+
+
+def test_read_with_count_stops_there():
+    ring = filled(8, 13)  # Holds rows 5..12, wrapped
+    assert ring.read(7, count=3)[:, 0].tolist() == [7, 8, 9]
+    assert ring.read(11, count=5)[:, 0].tolist() == [11, 12]
+    assert ring.read(0, count=2)[:, 0].tolist() == [5, 6]  # Clamped to the oldest row held
+    out = np.zeros((4, 2))
+    assert ring.read(10, out=out, count=3) is not out
+    assert out[:3, 0].tolist() == [10, 11, 12] and out[3, 0] == 0
+
+
+def test_cursor_sees_every_row_once():
+    ring = filled(8, 5)
+    cursor = Cursor(ring, 0)
+    assert cursor.read()[:, 0].tolist() == [0, 1, 2, 3, 4]
+    ring.extend([(i, -i) for i in range(5, 15)])
+    assert cursor.read()[:, 0].tolist() == list(range(7, 15))
+    assert cursor.dropped == 2
+    assert len(cursor.read()) == 0
+
+
+def test_counted_read_is_consistent_while_appending():
+    ring = RingBuffer(64, width=2)
+    stop = threading.Event()
+
+    def writer():
+        i = 0
+        while not stop.is_set():
+            ring.append((i, -i))
+            i += 1
+
+    thread = threading.Thread(target=writer)
+    thread.start()
+    rows = np.zeros((48, 2))
+    try:
+        for _ in range(2000):
+            # As Sparkline.refresh: one look at `written`, then an explicit count
+            with ring.lock:
+                written = ring.written
+                k = min(len(rows), written, ring.capacity)
+                got = ring.read(written - k, out=rows, count=k)
+            if k:
+                assert got[:, 0].tolist() == list(range(written - k, written))
+                assert (got[:, 1] == -got[:, 0]).all()
+    finally:
+        stop.set()
+        thread.join()
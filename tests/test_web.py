@@ -0,0 +1,64 @@
+import numpy as np
+
+from conveyor_twin.sim import ConveyorSim
+from conveyor_twin.web import Snapshot, WebDashboard, diff
+
+
+def snap(version, bottles, **values):
+    """Snapshot of (id, x cm, z cm) bottles."""
+    rows = np.array(bottles, dtype=np.int64).reshape(-1, 3)
+    return Snapshot(version, {"status": "NORMAL", "count": 0, **values},
+                    rows[:, 0], rows[:, 1].astype(np.int32), rows[:, 2].astype(np.int32))
+
+
+def patch(state, message):
+    """What the page does with a delta (see PAGE)."""
+    values, bottles = dict(state[0]), {i: [x, z] for i, (x, z) in state[1].items()}
+    values.update(message["set"])
+    b = message.get("bottles", {})
+    for i in b.get("drop", []):
+        del bottles[i]
+    for p in bottles.values():
+        p[0] += b.get("shift", 0)
+    for i, x in b.get("move", []):
+        bottles[i][0] = x
+    for i, x, z in b.get("add", []):
+        bottles[i] = [x, z]
+    return values, {i: tuple(p) for i, p in bottles.items()}
+
+
+def full(s):
+    return s.values, {int(i): (int(x), int(z)) for i, x, z in zip(s.ids, s.x, s.z)}
+
+
+def test_delta_adds_moves_and_drops_bottles():
+    old = snap(1, [(1, 900, 0), (2, 500, 10), (3, 100, -10)])
+    new = snap(2, [(2, 510, 10), (3, 100, -10), (4, -500, 20)], count=1)
+    message = diff(old, new)
+    assert message["v"] == 2 and message["set"] == {"count": 1}
+    assert message["bottles"] == {"drop": [1], "add": [[4, -500, 20]], "move": [[2, 510]]}
+    assert patch(full(old), message) == full(new)
+
+
+def test_delta_of_a_belt_moving_as_one_is_a_shift():
+    old = snap(1, [(1, 900, 0), (2, 500, 10)])
+    new = snap(2, [(1, 910, 0), (2, 510, 10)])
+    assert diff(old, new)["bottles"] == {"shift": 10}
+    assert patch(full(old), diff(old, new)) == full(new)
+    assert diff(new, new) == {"type": "delta", "v": 2, "set": {}}
+
+
+def test_deltas_between_sim_snapshots_rebuild_the_newest():
+    sim, web = ConveyorSim(seed=0), WebDashboard(hz=1e9)
+    sim.observers.append(web.sample)
+    sim.run(1.0)
+    base = web.latest
+    state = full(base)
+    for status in ("NORMAL", "JAM", "NORMAL"):
+        sim.set_status(status)
+        for _ in range(10):
+            sim.run(0.5)
+            state = patch(state, diff(base, web.latest))  # Page coalescing one or more snapshots
+            base = web.latest
+            assert state == full(base)
+    assert web.latest.version == sim.tick